@@ -0,0 +1,226 @@
+"""
+Offline stand-ins for Kite, the news sources and FinBERT
+
+Serve deterministic synthetic instruments, quotes, day/minute bars, tick
+streams and headlines so the benchmarks never touch the network.
+"""
+
+import threading
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+MARKET_TZ = 'Asia/Kolkata'
+SESSION_MINUTES = 375  # 09:15 - 15:29
+
+
+def _seed(*parts):
+    return zlib.crc32('|'.join(map(str, parts)).encode('utf-8'))
+
+
+class FakeKiteConnect:
+    """Subset of KiteConnect used by ZerodhaClient, backed by synthetic data"""
+
+    VARIETY_REGULAR = 'regular'
+    EXCHANGE_NSE = 'NSE'
+
+    universe_size = 2000  # Set by the benchmark runner before use
+
+    def __init__(self, api_key=None, pool=None, **kwargs):
+        self.order_count = 0
+        self.lock = threading.Lock()
+
+    def set_access_token(self, access_token):
+        pass
+
+    def instruments(self, exchange='NSE'):
+        return [
+            {
+                'instrument_token': 100000 + i,
+                'exchange_token': i,
+                'tradingsymbol': f"SYM{i:05d}",
+                'name': f"SYNTHETIC {i}",
+                'instrument_type': 'EQ',
+                'segment': exchange,
+                'exchange': exchange,
+                'lot_size': 1,
+                'tick_size': 0.05,
+            }
+            for i in range(self.universe_size)
+        ]
+
+    def quote(self, symbols):
+        # Quotes are from the latest weekday session
+        session = pd.offsets.BDay().rollback(pd.Timestamp(datetime.now().date())).to_pydatetime()
+        quotes = {}
+        for key in symbols:
+            rng = np.random.default_rng(_seed('quote', key))
+            close = float(rng.uniform(20, 6000))
+            last_price = close * float(rng.normal(1, 0.02))
+            quotes[key] = {
+                'last_price': round(last_price, 2),
+                'volume': int(rng.integers(10_000, 5_000_000)),
+                'last_trade_time': session + timedelta(hours=15, minutes=29),
+                'ohlc': {
+                    'open': round(close * float(rng.normal(1, 0.01)), 2),
+                    'high': round(max(close, last_price) * 1.01, 2),
+                    'low': round(min(close, last_price) * 0.99, 2),
+                    'close': round(close, 2),
+                },
+            }
+        return quotes
+
+    def historical_data(self, instrument_token, from_date, to_date, interval='minute', **kwargs):
+        days = pd.bdate_range(pd.Timestamp(from_date).date(), pd.Timestamp(to_date).date())
+        if len(days) == 0:
+            return []
+
+        rng = np.random.default_rng(_seed('bars', instrument_token, interval, days[0].date()))
+        if interval == 'day':
+            stamps = [day + timedelta(hours=9, minutes=15) for day in days]
+        else:
+            stamps = [day + timedelta(hours=9, minutes=15 + m) for day in days for m in range(SESSION_MINUTES)]
+
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.001 if interval != 'day' else 0.02, len(stamps))))
+        spread = np.abs(rng.normal(0, 0.0008, len(stamps))) * closes
+        volumes = rng.integers(10_000, 5_000_000 if interval == 'day' else 20_000, len(stamps))
+        dates = pd.DatetimeIndex(stamps).tz_localize(MARKET_TZ)
+        return [
+            {
+                'date': date.to_pydatetime(),
+                'open': float(close),
+                'high': float(close + s),
+                'low': float(close - s),
+                'close': float(close),
+                'volume': int(volume),
+            }
+            for date, close, s, volume in zip(dates, closes, spread, volumes)
+        ]
+
+    def place_order(self, **kwargs):
+        with self.lock:
+            self.order_count += 1
+            return f"FAKE{self.order_count}"
+
+    def positions(self):
+        return {'net': [], 'day': []}
+
+
+class FakeKiteTicker:
+    """
+    KiteTicker stand-in that replays pre-built tick batches on connect
+
+    Set FakeKiteTicker.feed to a list of tick batches; `finished` is set
+    once every batch has been delivered to on_ticks.
+    """
+
+    MODE_LTP = 'ltp'
+    MODE_QUOTE = 'quote'
+    MODE_FULL = 'full'
+
+    feed = []
+    finished = threading.Event()
+
+    def __init__(self, api_key=None, access_token=None, **kwargs):
+        self.on_ticks = None
+        self.on_connect = None
+        self.on_close = None
+        self.subscribed = set()
+
+    def connect(self, threaded=False, **kwargs):
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        if not threaded:
+            thread.join()
+
+    def _run(self):
+        if self.on_connect:
+            self.on_connect(self, {'status': 'connected'})
+        for batch in FakeKiteTicker.feed:
+            self.on_ticks(self, batch)
+        FakeKiteTicker.finished.set()
+
+    def subscribe(self, tokens):
+        self.subscribed.update(tokens)
+
+    def unsubscribe(self, tokens):
+        self.subscribed.difference_update(tokens)
+
+    def set_mode(self, mode, tokens):
+        pass
+
+    def close(self, code=None, reason=None):
+        pass
+
+
+def tick_batches(tokens, ticks, batch_size=50, seed=0, volatility=0.00002):
+    """Random-walk LTP tick batches over `tokens` (about `ticks` ticks in total)"""
+    rng = np.random.default_rng(seed)
+    tokens = np.asarray(tokens)
+    prices = np.full(len(tokens), 100.0)
+
+    batches = []
+    for _ in range(max(1, ticks // batch_size)):
+        picked = rng.integers(0, len(tokens), batch_size)
+        prices[picked] *= 1 + rng.normal(0, volatility, batch_size)
+        batches.append([
+            {'instrument_token': int(tokens[i]), 'last_price': float(prices[i]), 'mode': 'ltp'}
+            for i in picked
+        ])
+    return batches
+
+
+class FakeSentimentPipeline:
+    """Transformers-pipeline-shaped scorer with a fixed per-text label"""
+
+    LABELS = ('positive', 'negative', 'neutral')
+
+    def __init__(self):
+        self.texts_scored = 0
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        if isinstance(texts, str):
+            texts = [texts]
+        self.texts_scored += len(texts)
+        return [
+            {'label': self.LABELS[_seed(text) % 3], 'score': 0.5 + (_seed('score', text) % 500) / 1000}
+            for text in texts
+        ]
+
+
+def synthetic_news(symbols, per_symbol=5, shared_fraction=0.2, seed=0):
+    """
+    fetch_news_batch-shaped headlines: `per_symbol` articles per symbol
+
+    About `shared_fraction` of the articles come from a common pool, so
+    the same story shows up under several symbols (as market news does).
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    pool = [f"Markets slide as sector {i} reports weak demand" for i in range(max(1, len(symbols) // 10))]
+
+    news = {}
+    for symbol in symbols:
+        items = []
+        for j in range(per_symbol):
+            if rng.random() < shared_fraction:
+                title = pool[rng.integers(len(pool))]
+            else:
+                title = f"{symbol} update {j}: quarterly numbers {'beat' if rng.random() < 0.5 else 'miss'} estimates"
+            items.append({
+                'symbol': symbol,
+                'title': title,
+                'description': f"Analysts react to {title.lower()}",
+                'published_at': now - timedelta(hours=float(rng.uniform(0, 72))),
+                'source': 'Synthetic',
+            })
+        news[symbol] = items
+    return news
+
+
+def business_days_back(days):
+    """(start, end) datetimes spanning the last `days` business days before today"""
+    end = pd.Timestamp.now().normalize() - pd.offsets.BDay(1)
+    start = end - pd.offsets.BDay(days - 1)
+    return start.to_pydatetime(), end.to_pydatetime()
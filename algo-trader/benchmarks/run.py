@@ -0,0 +1,360 @@
+"""
+Offline benchmark suite
+
+Times the backtester, screener, news scoring and the tick path against
+the stand-ins in benchmarks/fakes.py (no network, no Kite account) and
+compares each case's median with a saved baseline:
+
+    python -m benchmarks.run                   # run and compare
+    python -m benchmarks.run --save-baseline   # run and keep as the baseline
+    python -m benchmarks.run --only screener --instruments 5000
+
+Exits with status 1 if any case is slower than its baseline by more
+than the threshold.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+# Every store the modules write goes to a scratch directory (config reads
+# these on import, so they must be set first)
+SCRATCH_DIR = tempfile.mkdtemp(prefix='algo-bench-')
+os.environ.update({
+    'BAR_STORE_PATH': os.path.join(SCRATCH_DIR, 'bars'),
+    'INSTRUMENT_CACHE_PATH': os.path.join(SCRATCH_DIR, 'instruments'),
+    'INDICATOR_STATE_PATH': os.path.join(SCRATCH_DIR, 'indicators', 'daily.npz'),
+    'SENTIMENT_STORE_PATH': os.path.join(SCRATCH_DIR, 'sentiment.db'),
+    'NEWS_CACHE_PATH': os.path.join(SCRATCH_DIR, 'news_cache'),
+    'METRICS_SNAPSHOT_PATH': os.path.join(SCRATCH_DIR, 'metrics.json'),
+    'TICK_RECORD_PATH': os.path.join(SCRATCH_DIR, 'ticks'),
+    'HOLIDAYS_FILE': os.path.join(SCRATCH_DIR, 'holidays.txt'),
+    'DATABASE_URL': f"sqlite:///{os.path.join(SCRATCH_DIR, 'trades.db')}",
+})
+
+import pandas as pd
+from benchmarks import fakes
+import modules.zerodha_client as zerodha_client
+import modules.subscription_manager as subscription_manager
+from modules.rate_limiter import TokenBucket
+from modules.metrics import metrics
+from config import BENCHMARK_CONFIG, BENCHMARK_BASELINE_PATH, BENCHMARK_RESULTS_PATH
+
+logger = logging.getLogger(__name__)
+
+# (name, unit, function, optional); see @case
+CASES = []
+
+
+def case(name, unit, optional=False):
+    """
+    Register a benchmark
+
+    The function takes the parsed arguments and returns (samples, items):
+    seconds per timed run and the units of work in one run. Returning
+    None skips the case. Optional cases only run when asked for by name.
+    """
+    def register(func):
+        CASES.append((name, unit, func, optional))
+        return func
+    return register
+
+
+def timed(run, repeat, warmup=True):
+    """
+    Time `run` `repeat` times after one untimed warm-up call
+
+    If run() returns a number it is used as the sample instead of the
+    wall time (for runs with setup that should not be timed).
+    """
+    if warmup:
+        run()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        elapsed = run()
+        samples.append(elapsed if isinstance(elapsed, float) else time.perf_counter() - start)
+    return samples
+
+
+def install_fakes(instruments):
+    """Point the Kite client and ticker at the fakes"""
+    fakes.FakeKiteConnect.universe_size = instruments
+    zerodha_client.KiteConnect = fakes.FakeKiteConnect
+    zerodha_client._shared_kite = None
+    subscription_manager.KiteTicker = fakes.FakeKiteTicker
+    # The fake ticker has no Twisted reactor to hand calls to
+    subscription_manager.call_in_reactor = lambda func, *args: func(*args)
+
+    # Time our code, not waits on Kite's request limits
+    for endpoint in zerodha_client._rate_limiters:
+        zerodha_client._rate_limiters[endpoint] = TokenBucket(1e9)
+
+
+def use_fake_model(analyzer, version='bench'):
+    """Score with FakeSentimentPipeline under its own model version"""
+    analyzer._sentiment_analyzer = fakes.FakeSentimentPipeline()
+    analyzer._model_loaded = True
+    analyzer.model_version = version
+
+
+def use_fake_news(analyzer, symbols, per_symbol):
+    news = fakes.synthetic_news(symbols, per_symbol)
+    analyzer.fetch_news_batch = lambda batch, days_back=None: {symbol: news.get(symbol, []) for symbol in batch}
+
+
+def universe(args, limit=None):
+    count = min(args.instruments, limit or args.instruments)
+    return [f"SYM{i:05d}" for i in range(count)]
+
+
+@case('backtest.simulate_trade', 'sessions')
+def bench_simulate_trade(args):
+    from modules.backtester import Backtester
+
+    backtester = Backtester()
+    _, end = fakes.business_days_back(1)
+    bars = pd.DataFrame(fakes.FakeKiteConnect().historical_data(100000, end, end, 'minute'))
+    loops = 200
+
+    def run():
+        for _ in range(loops):
+            backtester.simulate_trade(bars, bars['open'].iloc[0])
+
+    return timed(run, args.repeat), loops
+
+
+@case('backtest.backtest_symbol', 'sessions')
+def bench_backtest_symbol(args):
+    from modules.backtester import Backtester
+
+    backtester = Backtester()
+    start, end = fakes.business_days_back(args.days)
+    symbol = universe(args)[-1]
+
+    # The warm-up call fills the bar store; timed runs read it from disk
+    sessions = []
+    samples = timed(lambda: sessions.append(len(backtester.backtest_symbol(symbol, start.date(), end.date()))),
+                    args.repeat)
+    return samples, sessions[-1]
+
+
+@case('screener.screen_stocks', 'symbols')
+def bench_screen_stocks(args):
+    from modules.screener import StockScreener
+
+    screener = StockScreener()
+    use_fake_model(screener.news_analyzer)
+    use_fake_news(screener.news_analyzer, universe(args), args.articles)
+
+    # The warm-up run downloads instruments, seeds indicators from daily
+    # bars and scores news; timed runs are the steady state of a daily run
+    return timed(screener.screen_stocks, args.repeat), args.instruments
+
+
+@case('news.sentiment_batch', 'symbols')
+def bench_sentiment_batch(args):
+    from modules.news_analyzer import NewsAnalyzer
+
+    analyzer = NewsAnalyzer()
+    symbols = universe(args, 500)
+    use_fake_news(analyzer, symbols, args.articles)
+    runs = iter(range(sys.maxsize))
+
+    def run():
+        # A new model version makes every article new: hash, score, store, aggregate
+        use_fake_model(analyzer, f"bench-{next(runs)}")
+        analyzer.get_sentiment_batch(symbols)
+
+    return timed(run, args.repeat), len(symbols)
+
+
+@case('news.sentiment_batch.cached', 'symbols')
+def bench_sentiment_batch_cached(args):
+    from modules.news_analyzer import NewsAnalyzer
+
+    analyzer = NewsAnalyzer()
+    symbols = universe(args, 500)
+    use_fake_news(analyzer, symbols, args.articles)
+    use_fake_model(analyzer, 'bench-cached')
+
+    return timed(lambda: analyzer.get_sentiment_batch(symbols), args.repeat), len(symbols)
+
+
+@case('news.finbert', 'headlines', optional=True)
+def bench_finbert(args):
+    from modules.news_analyzer import NewsAnalyzer
+
+    analyzer = NewsAnalyzer()
+    if analyzer.sentiment_analyzer is None:
+        return None
+
+    news = fakes.synthetic_news(universe(args, 64), 4)
+    texts = [f"{item['title']} {item['description']}" for items in news.values() for item in items]
+    return timed(lambda: analyzer.analyze_sentiment_batch(texts), args.repeat), len(texts)
+
+
+@case('executor.ticks', 'ticks')
+def bench_executor_ticks(args):
+    from modules.live_executor import LiveExecutor
+    from modules.instrument_master import InstrumentMaster
+
+    symbols = universe(args, args.positions)
+    tokens = list(InstrumentMaster(zerodha_client.ZerodhaClient(), 'NSE').get_tokens(symbols).values())
+    fakes.FakeKiteTicker.feed = fakes.tick_batches(tokens, args.ticks)
+    ticks = sum(len(batch) for batch in fakes.FakeKiteTicker.feed)
+
+    def run():
+        # Ticks flow ticker thread -> SubscriptionManager -> LiveExecutor.on_ticks
+        executor = LiveExecutor(simulation_mode=True)
+        for symbol in symbols:
+            executor.enter_short_position(symbol, price=100.0)
+
+        fakes.FakeKiteTicker.finished.clear()
+        start = time.perf_counter()
+        executor.start_tick_stream(symbols)
+        fakes.FakeKiteTicker.finished.wait()
+        elapsed = time.perf_counter() - start
+
+        executor.zerodha.stop_ticker()
+        executor.journal.close()
+        return elapsed
+
+    return timed(run, args.repeat), ticks
+
+
+def run_cases(args):
+    results = {}
+    for name, unit, func, optional in CASES:
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        if optional and not (args.only and any(pattern in name for pattern in args.only)):
+            continue
+
+        print(f"  {name:<32}", end='', flush=True)
+        outcome = func(args)
+        if outcome is None:
+            print("skipped")
+            continue
+
+        samples, items = outcome
+        median = statistics.median(samples)
+        results[name] = {
+            'unit': unit,
+            'items': items,
+            'median': median,
+            'min': min(samples),
+            'samples': samples,
+            'rate': items / median if median else None,
+        }
+        print(f"{median * 1000:10.2f} ms  {items / median:>14,.0f} {unit}/s")
+
+    tick_hist = metrics.histograms.get('tick.process')
+    if 'executor.ticks' in results and tick_hist:
+        results['executor.ticks']['p99_ms'] = tick_hist.summary()['p99_ms']
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change per case; returns the names of regressed cases"""
+    regressions = []
+    print(f"\n📊 VS BASELINE ({baseline['created']}, threshold {threshold:.0%}):")
+    for name, result in results.items():
+        base = baseline['cases'].get(name)
+        if base is None or base['items'] != result['items']:
+            print(f"  {name:<32}no comparable baseline")
+            continue
+
+        change = result['median'] / base['median'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️ REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<32}{base['median'] * 1000:10.2f} -> {result['median'] * 1000:.2f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks against a fake Kite')
+    parser.add_argument('--instruments', type=int, default=BENCHMARK_CONFIG['instruments'],
+                       help='Synthetic universe size')
+    parser.add_argument('--days', type=int, default=BENCHMARK_CONFIG['days'],
+                       help='Business days of minute bars per backtest')
+    parser.add_argument('--ticks', type=int, default=BENCHMARK_CONFIG['ticks'],
+                       help='Ticks streamed through the executor')
+    parser.add_argument('--positions', type=int, default=BENCHMARK_CONFIG['positions'],
+                       help='Open positions the ticks are spread over')
+    parser.add_argument('--articles', type=int, default=BENCHMARK_CONFIG['articles'],
+                       help='Headlines per symbol')
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_CONFIG['repeat'],
+                       help='Timed runs per case')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                       help='Run cases whose name contains any of these (e.g. news.finbert, which needs the model)')
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_CONFIG['threshold'],
+                       help='Slowdown vs baseline flagged as a regression (default: 0.2 = 20%%)')
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_PATH, help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Save this run as the baseline')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(name)s - %(message)s')
+    install_fakes(args.instruments)
+
+    params = {key: getattr(args, key) for key in ('instruments', 'days', 'ticks', 'positions', 'articles')}
+    print(f"\n⏱️  BENCHMARKS ({', '.join(f'{k}={v}' for k, v in params.items())}, repeat={args.repeat}):")
+    try:
+        results = run_cases(args)
+    finally:
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+    run = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'params': params,
+        'python': sys.version.split()[0],
+        'cases': results,
+    }
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    write_json(os.path.join(BENCHMARK_RESULTS_PATH, f"{stamp}.json"), run)
+    write_json(os.path.join(BENCHMARK_RESULTS_PATH, 'latest.json'), run)
+
+    regressions = []
+    baseline = read_json(args.baseline)
+    if baseline and baseline['params'] != params:
+        print(f"\n⚠️ Baseline sizes {baseline['params']} differ from this run; not compared")
+    elif baseline:
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        if baseline:
+            # Keep baseline entries for cases this run skipped
+            run['cases'] = {**baseline['cases'], **results} if baseline['params'] == params else results
+        write_json(args.baseline, run)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
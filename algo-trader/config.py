@@ -8,6 +8,29 @@ KITE_API_KEY = os.getenv('KITE_API_KEY')
 KITE_API_SECRET = os.getenv('KITE_API_SECRET')
 KITE_ACCESS_TOKEN = os.getenv('KITE_ACCESS_TOKEN')
 
+# Kite API limits (requests/sec per endpoint class, shared process-wide)
+KITE_RATE_LIMITS = {
+    'quote': 1,
+    'historical': 3,
+    'orders': 10,
+    'default': 10,
+}
+
+# Retries for rate-limited / transient API errors
+KITE_RETRY_CONFIG = {
+    'max_retries': 3,
+    'backoff_base': 0.5,  # Seconds, doubled per attempt (with jitter)
+    'backoff_max': 8,
+}
+
+# HTTP connection pool for the shared Kite session
+KITE_POOL_CONFIG = {
+    'pool_connections': 10,
+    'pool_maxsize': 20,
+    'max_retries': 0,
+    'pool_block': False,
+}
+
 # Trading Parameters
 STRATEGY_CONFIG = {
     'target_drop': 0.2 / 100,  # 0.2% drop target
@@ -16,6 +39,20 @@ STRATEGY_CONFIG = {
     'capital_per_trade': 500000,  # Capital per position
 }
 
+# WebSocket Ticker
+TICKER_CONFIG = {
+    'max_tokens_per_connection': 3000,  # Kite per-connection instrument limit
+    'max_connections': 3,  # Kite connections per API key
+}
+
+# Order Execution
+EXECUTION_CONFIG = {
+    'order_workers': 4,  # Threads placing orders off the tick thread
+    'cover_max_failures': 5,  # Failed cover orders before a position is left for manual exit
+    'cover_backoff_base': 1.0,  # Seconds before retrying a failed cover, doubled per failure
+    'cover_backoff_max': 30.0,
+}
+
 # Screener Parameters
 SCREENER_CONFIG = {
     'min_volume': 100000,  # Minimum daily volume
@@ -23,10 +60,129 @@ SCREENER_CONFIG = {
     'max_price': 5000,  # Maximum stock price
     'bearish_sentiment_threshold': -0.3,  # Negative sentiment score
     'top_n_stocks': 5,  # Number of stocks to suggest
+    'quote_batch_size': 500,  # Symbols per quote request (Kite max)
+    'quote_workers': 4,  # Concurrent quote requests (paced by KITE_RATE_LIMITS)
+    'sentiment_batch_multiple': 3,  # Sentiment batch size, as a multiple of top_n_stocks
+    'max_sentiment_candidates': 300,  # Most candidates scored for sentiment per screen (0 = no limit)
+}
+
+# Technical indicators (screener)
+INDICATOR_CONFIG = {
+    'ema_fast': 12,  # MACD fast EMA
+    'ema_slow': 26,  # MACD slow EMA
+    'macd_signal': 9,
+    'rsi_period': 14,
+    'rsi_overbought': 70,
+    'sma_fast': 20,  # Moving-average crossover
+    'sma_slow': 50,
+    'volume_window': 20,  # Average volume lookback (bars)
+    'volume_spike': 2.0,  # Volume above this multiple of the average is a spike
+    'history_days': 120,  # Calendar days of daily bars used to seed a symbol
+    'reseed_days': 14,  # Rebuild a symbol from history after this many days
+}
+
+# Backtest Parameters
+BACKTEST_CONFIG = {
+    'workers': os.cpu_count(),  # Processes for universe backtests
+}
+
+# Parameter sweep grid (optimize mode)
+SWEEP_CONFIG = {
+    'target_drop_range': (0.05 / 100, 1.0 / 100),  # Min/max target drop
+    'trailing_delta_range': (0.05 / 100, 0.5 / 100),  # Min/max trailing stop
+    'steps': 50,  # Grid points per parameter
+}
+
+# Sentiment Model
+SENTIMENT_CONFIG = {
+    'batch_size': 32,  # Headlines per FinBERT forward pass
+    'backend': os.getenv('SENTIMENT_BACKEND', 'torch'),  # 'torch' or 'onnx'
+    'onnx_model_dir': os.getenv('ONNX_MODEL_DIR', 'data/models/finbert-onnx'),
+    'onnx_threads': int(os.getenv('ONNX_THREADS', os.cpu_count() or 1)),  # Intra-op threads
+    'decay_half_life_hours': 48,  # Weight of an article halves every this many hours
+}
+
+# News sources (URLs can point at a local server for testing)
+NEWS_API_KEY = os.getenv('NEWS_API_KEY')
+NEWS_CONFIG = {
+    'news_api_url': os.getenv('NEWS_API_URL', 'https://newsapi.org/v2/everything'),
+    'nse_home_url': os.getenv('NSE_HOME_URL', 'https://www.nseindia.com'),
+    'nse_announcements_url': os.getenv('NSE_ANNOUNCEMENTS_URL', 'https://www.nseindia.com/api/corporate-announcements'),
+    'workers': 16,  # Concurrent requests overall
+    'per_host_limit': 4,  # Concurrent requests per host
+    'timeout': 10,  # Seconds per request
+    'max_age': 300,  # Seconds a cached response is used without revalidating
+    'days_back': 7,
 }
 
+# On-disk HTTP cache for news responses
+NEWS_CACHE_PATH = os.getenv('NEWS_CACHE_PATH', 'data/news_cache')
+
+# Scored articles and per-symbol sentiment
+SENTIMENT_STORE_PATH = os.getenv('SENTIMENT_STORE_PATH', 'data/sentiment.db')
+
 # Database
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///data/trades.db')
 
+# Trade journal (write-behind to DATABASE_URL)
+JOURNAL_CONFIG = {
+    'batch_size': 500,  # Rows per commit
+    'flush_interval': 0.5,  # Seconds to gather a batch
+}
+
 # Logging
 LOG_FILE = 'logs/trading.log'
+LOG_CONFIG = {
+    'format': os.getenv('LOG_FORMAT', 'json'),  # Log file format: 'json' (one object per line) or 'text'
+    'queue_size': 10000,  # Records buffered for the log thread; extra records are dropped
+    'rate_per_site': 20,  # INFO/DEBUG records per second per log call site
+    'burst_per_site': 100,
+}
+
+# Local historical bar store
+BAR_STORE_PATH = os.getenv('BAR_STORE_PATH', 'data/bars')
+
+# Daily instrument dump cache
+INSTRUMENT_CACHE_PATH = os.getenv('INSTRUMENT_CACHE_PATH', 'data/instruments')
+INSTRUMENT_RETRY_COOLDOWN = 60  # Seconds before retrying a failed download with no cached dump
+
+# Extra exchange holidays (one YYYY-MM-DD per line)
+HOLIDAYS_FILE = os.getenv('HOLIDAYS_FILE', 'data/nse_holidays.txt')
+
+# Saved indicator state for the screener universe
+INDICATOR_STATE_PATH = os.getenv('INDICATOR_STATE_PATH', 'data/indicators/daily.npz')
+
+# Metrics snapshot (read by `simulate` and the dashboard)
+METRICS_CONFIG = {
+    'interval': 5,  # Seconds between snapshot writes
+}
+METRICS_SNAPSHOT_PATH = os.getenv('METRICS_SNAPSHOT_PATH', 'data/metrics.json')
+
+# Recorded tick streams (binary, replayable with `simulate --replay`)
+TICK_RECORD_PATH = os.getenv('TICK_RECORD_PATH', 'data/ticks')
+
+# Stage profiling (main.py --profile)
+PROFILE_CONFIG = {
+    'sample_interval': 0.005,  # Seconds between stack samples for .folded output
+}
+PROFILE_OUTPUT_PATH = 'data/profiles'
+
+# Dashboard background jobs
+DASHBOARD_CONFIG = {
+    'job_workers': 2,  # Screener/backtest runs in parallel
+    'result_ttl': 900,  # Seconds a finished run is reused for the same inputs
+    'poll_interval': 1.0,  # Seconds between progress refreshes
+}
+
+# Offline benchmarks (python -m benchmarks.run)
+BENCHMARK_CONFIG = {
+    'instruments': 2000,  # Synthetic NSE universe size
+    'days': 20,  # Business days of minute bars per backtest
+    'ticks': 200000,  # Ticks streamed through the executor
+    'positions': 200,  # Open positions the ticks are spread over
+    'articles': 5,  # Headlines per symbol
+    'repeat': 5,  # Timed runs per case (the median is compared)
+    'threshold': 0.20,  # Slowdown vs baseline flagged as a regression
+}
+BENCHMARK_BASELINE_PATH = 'benchmarks/baseline.json'
+BENCHMARK_RESULTS_PATH = 'benchmarks/results'
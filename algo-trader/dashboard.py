@@ -3,16 +3,91 @@
 Trading Dashboard - Streamlit UI for monitoring and backtesting
 """
 
+import threading
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from modules.screener import StockScreener
 from modules.backtester import Backtester
 from modules.live_executor import LiveExecutor
+from modules.metrics import read_snapshot
+from modules.job_runner import JobRunner, DONE, FAILED
+from config import SCREENER_CONFIG, DASHBOARD_CONFIG, METRICS_CONFIG
 import plotly.graph_objects as go
 
 st.set_page_config(page_title="Algo Trading Dashboard", layout="wide")
 
+# Heavy objects are built once per server process and shared by every
+# session; each comes with a lock because jobs from different sessions
+# may use it at the same time
+
+@st.cache_resource
+def get_screener():
+    """Screener with its Kite client, instrument master, indicator state and FinBERT"""
+    screener = StockScreener()
+    # Load FinBERT in the background while the first run fetches quotes
+    screener.news_analyzer.prewarm()
+    return screener, threading.Lock()
+
+@st.cache_resource
+def get_backtester():
+    """Backtester with its Kite client and bar store"""
+    return Backtester(), threading.Lock()
+
+@st.cache_resource
+def get_job_runner():
+    """Background runs, shared so a rerun or another session picks up the same job"""
+    return JobRunner()
+
+@st.cache_data(ttl=METRICS_CONFIG['interval'])
+def load_metrics_snapshot():
+    return read_snapshot()
+
+@st.cache_data
+def backtest_metrics(results):
+    backtester, _ = get_backtester()
+    return backtester.calculate_metrics(results)
+
+def run_locked(lock, func, *args, on_progress, **kwargs):
+    """Job body: call a shared object's method, one job at a time"""
+    if lock.locked():
+        on_progress(0.0, "Waiting for another run to finish")
+    with lock:
+        return func(*args, on_progress=on_progress, **kwargs)
+
+@st.fragment(run_every=DASHBOARD_CONFIG['poll_interval'])
+def show_progress(key):
+    """Progress bar and Cancel button; only this fragment reruns while the job runs"""
+    job = runner.get(key)
+    if job is None or job.finished:
+        # Rerun the whole page to show the outcome
+        st.rerun()
+    
+    st.progress(job.progress, text=f"{job.name}: {job.message} ({job.elapsed:.0f}s)")
+    if st.button("Cancel", key=f"cancel-{key}"):
+        job.cancel()
+
+def job_result(key):
+    """Show a job's progress or outcome; returns its result once done"""
+    job = runner.get(key)
+    if job is None:
+        return None
+    if not job.finished:
+        show_progress(key)
+        return None
+    
+    if job.status == DONE:
+        st.caption(f"{job.name} finished at {datetime.fromtimestamp(job.finished_at).strftime('%H:%M:%S')} "
+                   f"in {job.elapsed:.1f}s")
+        return job.result
+    if job.status == FAILED:
+        st.error(f"{job.name} failed: {job.error}")
+    else:
+        st.warning(f"{job.name} was cancelled")
+    return None
+
+runner = get_job_runner()
+
 st.title("📈 Algo Trading Dashboard")
 
 # Sidebar
@@ -22,37 +97,48 @@ mode = st.sidebar.selectbox("Mode", ["Screener", "Backtest", "Live Monitor"])
 if mode == "Screener":
     st.header("🔍 Stock Screener")
     
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        top_n = st.number_input("Candidates", min_value=1, max_value=50, value=SCREENER_CONFIG['top_n_stocks'])
+    
+    with col2:
+        refresh = st.checkbox("Ignore cached results",
+                              help=f"Results are reused for {DASHBOARD_CONFIG['result_ttl'] // 60} minutes")
+    
+    key = ('screener', top_n)
     if st.button("Run Screener"):
-        with st.spinner("Analyzing stocks..."):
-            screener = StockScreener()
-            results = screener.screen_stocks()
+        screener, lock = get_screener()
+        runner.submit(key, run_locked, lock, screener.screen_stocks, top_n, name="Screener", force=refresh)
+    
+    results = job_result(key)
+    if results is not None:
+        if len(results) > 0:
+            st.success(f"Found {len(results)} candidates!")
             
-            if len(results) > 0:
-                st.success(f"Found {len(results)} candidates!")
-                
-                # Display results
-                st.dataframe(results, use_container_width=True)
-                
-                # Charts
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    fig = go.Figure(data=[
-                        go.Bar(x=results['symbol'], y=results['sentiment_score'], 
-                               name='Sentiment Score')
-                    ])
-                    fig.update_layout(title="Sentiment Analysis")
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    fig = go.Figure(data=[
-                        go.Bar(x=results['symbol'], y=results['combined_score'],
-                               name='Combined Score')
-                    ])
-                    fig.update_layout(title="Combined Score")
-                    st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.warning("No stocks met the criteria")
+            # Display results
+            st.dataframe(results, use_container_width=True)
+            
+            # Charts
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                fig = go.Figure(data=[
+                    go.Bar(x=results['symbol'], y=results['sentiment_score'], 
+                           name='Sentiment Score')
+                ])
+                fig.update_layout(title="Sentiment Analysis")
+                st.plotly_chart(fig, use_container_width=True)
+            
+            with col2:
+                fig = go.Figure(data=[
+                    go.Bar(x=results['symbol'], y=results['combined_score'],
+                           name='Combined Score')
+                ])
+                fig.update_layout(title="Combined Score")
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.warning("No stocks met the criteria")
 
 elif mode == "Backtest":
     st.header("📊 Backtesting")
@@ -65,54 +151,58 @@ elif mode == "Backtest":
     with col2:
         days = st.number_input("Days to Backtest", min_value=1, max_value=365, value=30)
     
+    # Dates (not times) so the same inputs map to the same job all day
+    symbol = symbol.strip().upper()
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days)
+    key = ('backtest', symbol, start_date, end_date)
+    
     if st.button("Run Backtest"):
-        with st.spinner(f"Backtesting {symbol}..."):
-            backtester = Backtester()
+        backtester, lock = get_backtester()
+        runner.submit(key, run_locked, lock, backtester.backtest_symbol, symbol, start_date, end_date,
+                      name=f"Backtest {symbol}")
+    
+    results = job_result(key)
+    if results is not None:
+        if len(results) > 0:
+            # Performance metrics
+            metrics = backtest_metrics(results)
             
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            col1, col2, col3, col4 = st.columns(4)
             
-            results = backtester.backtest_symbol(symbol, start_date, end_date)
+            col1.metric("Total Trades", metrics['total_trades'])
+            col2.metric("Win Rate", f"{metrics['win_rate']:.1f}%")
+            col3.metric("Total P&L", f"{metrics['total_pnl']:.2f}%")
+            col4.metric("Profit Factor", f"{metrics['profit_factor']:.2f}")
             
-            if len(results) > 0:
-                # Performance metrics
-                metrics = backtester.calculate_metrics(results)
-                
-                col1, col2, col3, col4 = st.columns(4)
-                
-                col1.metric("Total Trades", metrics['total_trades'])
-                col2.metric("Win Rate", f"{metrics['win_rate']:.1f}%")
-                col3.metric("Total P&L", f"{metrics['total_pnl']:.2f}%")
-                col4.metric("Profit Factor", f"{metrics['profit_factor']:.2f}")
-                
-                # Trade results
-                st.subheader("Trade Results")
-                st.dataframe(results[['date', 'entry_price', 'exit_price', 'exit_reason', 'pnl_percent']], 
-                           use_container_width=True)
-                
-                # P&L chart
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=results['date'],
-                    y=results['pnl_percent'].cumsum(),
-                    mode='lines+markers',
-                    name='Cumulative P&L'
-                ))
-                fig.update_layout(title="Cumulative P&L Over Time",
-                                xaxis_title="Date",
-                                yaxis_title="P&L %")
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Win/Loss distribution
-                fig = go.Figure(data=[
-                    go.Histogram(x=results['pnl_percent'], nbinsx=20)
-                ])
-                fig.update_layout(title="P&L Distribution",
-                                xaxis_title="P&L %",
-                                yaxis_title="Frequency")
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.warning("No trades found")
+            # Trade results
+            st.subheader("Trade Results")
+            st.dataframe(results[['date', 'entry_price', 'exit_price', 'exit_reason', 'pnl_percent']], 
+                       use_container_width=True)
+            
+            # P&L chart
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                x=results['date'],
+                y=results['pnl_percent'].cumsum(),
+                mode='lines+markers',
+                name='Cumulative P&L'
+            ))
+            fig.update_layout(title="Cumulative P&L Over Time",
+                            xaxis_title="Date",
+                            yaxis_title="P&L %")
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Win/Loss distribution
+            fig = go.Figure(data=[
+                go.Histogram(x=results['pnl_percent'], nbinsx=20)
+            ])
+            fig.update_layout(title="P&L Distribution",
+                            xaxis_title="P&L %",
+                            yaxis_title="Frequency")
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.warning("No trades found")
 
 elif mode == "Live Monitor":
     st.header("🎮 Live Trading Monitor")
@@ -127,6 +217,27 @@ elif mode == "Live Monitor":
     
     # This would be updated in real-time
     st.write("Connect to live trading executor to see real-time positions")
+    
+    # Hot-path metrics written by a running `main.py simulate`
+    st.subheader("Hot-Path Metrics")
+    snapshot = load_metrics_snapshot()
+    if snapshot:
+        st.caption(f"Snapshot from {datetime.fromtimestamp(snapshot['time']).strftime('%H:%M:%S')}")
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Ticks/sec", f"{snapshot['rates'].get('ticks', 0):.0f}")
+        col2.metric("Order Queue", snapshot['gauges'].get('order.queue_depth') or 0)
+        col3.metric("Journal Queue", snapshot['gauges'].get('journal.queue_depth') or 0)
+        
+        if snapshot['histograms']:
+            latencies = pd.DataFrame(snapshot['histograms']).T
+            st.dataframe(latencies[['count', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms']],
+                         use_container_width=True)
+        if snapshot['counters']:
+            st.dataframe(pd.DataFrame({'total': snapshot['counters'], 'per_sec': snapshot['rates']}),
+                         use_container_width=True)
+    else:
+        st.write("No metrics snapshot yet - start `python main.py simulate`")
 
 # Footer
 st.sidebar.markdown("---")
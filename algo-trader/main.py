@@ -5,27 +5,38 @@ Algo Trading Platform - Main Entry Point
 Modes:
 1. screener - Run stock screener
 2. backtest - Backtest strategy on historical data
-3. simulate - Run live simulation (paper trading)
-4. live - Execute real trades (⚠️ USE WITH CAUTION)
+3. optimize - Sweep target_drop / trailing_delta over historical data
+4. simulate - Run live simulation (paper trading), optionally recording or
+   replaying the tick stream
+5. live - Execute real trades (⚠️ USE WITH CAUTION)
+
+Any mode takes --profile for a per-stage time/memory breakdown.
 """
 
+import time
+
+_STARTED = time.perf_counter()
+
+import os
 import argparse
+import importlib
 import logging
 from datetime import datetime, timedelta
-from modules.screener import StockScreener
-from modules.backtester import Backtester
-from modules.live_executor import LiveExecutor
+from config import SWEEP_CONFIG, TICK_RECORD_PATH, PROFILE_OUTPUT_PATH
+from modules.log_setup import setup_logging
+from modules.profiler import profiler
 import sys
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/trading.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Modules are imported per mode so that e.g. backtest never loads
+# transformers/torch; see --import-report
+MODE_MODULES = {
+    'screener': ['modules.screener'],
+    'backtest': ['modules.backtester'],
+    'optimize': ['modules.backtester'],
+    'simulate': ['modules.live_executor'],
+    'live': ['modules.live_executor'],
+}
+HEAVY_PACKAGES = ['numpy', 'pandas', 'kiteconnect', 'transformers', 'torch']
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +46,11 @@ def run_screener():
     logger.info("RUNNING STOCK SCREENER")
     logger.info("=" * 50)
     
+    from modules.screener import StockScreener
+    
     screener = StockScreener()
+    # Load FinBERT while instruments and quotes are being fetched
+    screener.news_analyzer.prewarm()
     top_stocks = screener.screen_stocks()
     
     if len(top_stocks) > 0:
@@ -43,8 +58,9 @@ def run_screener():
         print(top_stocks.to_string(index=False))
         
         # Save to CSV
-        filename = f"data/screener_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        top_stocks.to_csv(filename, index=False)
+        with profiler.stage('save.results'):
+            filename = f"data/screener_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            top_stocks.to_csv(filename, index=False)
         logger.info(f"Results saved to {filename}")
     else:
         print("\n⚠️ No stocks met the criteria today")
@@ -55,39 +71,162 @@ def run_backtest(symbol, days=30):
     logger.info(f"BACKTESTING {symbol}")
     logger.info("=" * 50)
     
+    from modules.backtester import Backtester
+    from modules.zerodha_client import ZerodhaAPIError
+    
     backtester = Backtester()
     
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    results = backtester.backtest_symbol(symbol, start_date, end_date)
+    try:
+        results = backtester.backtest_symbol(symbol, start_date, end_date)
+    except ZerodhaAPIError as e:
+        print(f"\n⚠️ Backtest of {symbol} failed: {e}")
+        return
     
     if len(results) > 0:
         print(f"\n📈 BACKTEST RESULTS for {symbol}:")
         print(results[['date', 'entry_price', 'exit_price', 'exit_reason', 'pnl_percent']].to_string(index=False))
         
-        metrics = backtester.calculate_metrics(results)
+        with profiler.stage('backtest.metrics'):
+            metrics = backtester.calculate_metrics(results)
         print("\n📊 PERFORMANCE METRICS:")
         for key, value in metrics.items():
             print(f"  {key}: {value:.2f}")
         
         # Save results
-        filename = f"data/backtest_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        results.to_csv(filename, index=False)
+        with profiler.stage('save.results'):
+            filename = f"data/backtest_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            results.to_csv(filename, index=False)
         logger.info(f"Results saved to {filename}")
+        save_backtest_trades(results)
     else:
         print(f"\n⚠️ No trades executed for {symbol}")
 
-def run_simulation(symbols=None):
+def save_backtest_trades(results):
+    """Store backtest trades in the trade journal (DATABASE_URL)"""
+    from modules.trade_journal import TradeJournal
+    
+    with profiler.stage('save.journal'):
+        journal = TradeJournal()
+        journal.record_backtest(results)
+        journal.close()
+    logger.info(f"{len(results)} backtest trades saved to the trade journal")
+
+def run_universe_backtest(symbols=None, days=30, workers=None):
+    """Backtest many symbols in parallel (default: the filtered NSE universe)"""
+    logger.info("=" * 50)
+    logger.info("UNIVERSE BACKTEST")
+    logger.info("=" * 50)
+    
+    import pandas as pd
+    from modules.backtester import Backtester, backtest_universe
+    
+    if not symbols:
+        # Same price/volume filters as the screener
+        from modules.screener import StockScreener
+        with profiler.stage('universe.filter'):
+            screener = StockScreener()
+            filtered = screener.apply_basic_filters(screener.get_nse_stocks())
+        symbols = filtered['symbol'].tolist() if len(filtered) > 0 else []
+    
+    if not symbols:
+        logger.error("No symbols to backtest")
+        return
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
+    logger.info(f"Backtesting {len(symbols)} symbols with {workers or 'default'} workers")
+    # Worker processes are not profiled; this stage covers the whole pool
+    with profiler.stage('universe.backtest'):
+        results, failures = backtest_universe(symbols, start_date, end_date, workers=workers)
+    
+    if len(results) > 0:
+        backtester = Backtester()
+        with profiler.stage('backtest.metrics'):
+            per_symbol = pd.DataFrame({
+                symbol: backtester.calculate_metrics(group)
+                for symbol, group in results.groupby('symbol')
+            }).T.sort_values('total_pnl', ascending=False)
+            metrics = backtester.calculate_metrics(results)
+        
+        print(f"\n📈 UNIVERSE BACKTEST ({len(per_symbol)} symbols):")
+        print(per_symbol[['total_trades', 'win_rate', 'total_pnl', 'profit_factor']].to_string(float_format='%.2f'))
+        
+        print("\n📊 OVERALL METRICS:")
+        for key, value in metrics.items():
+            print(f"  {key}: {value:.2f}")
+        
+        # Save results
+        with profiler.stage('save.results'):
+            filename = f"data/backtest_universe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            results.to_csv(filename, index=False)
+        logger.info(f"Results saved to {filename}")
+        save_backtest_trades(results)
+    else:
+        print("\n⚠️ No trades executed")
+    
+    if failures:
+        print(f"\n⚠️ {len(failures)} symbols failed: {', '.join(sorted(failures))}")
+
+def run_optimizer(symbols, days=30, steps=None):
+    """Rank (target_drop, trailing_delta) pairs over historical data"""
+    logger.info("=" * 50)
+    logger.info(f"OPTIMIZING {', '.join(symbols)}")
+    logger.info("=" * 50)
+    
+    import numpy as np
+    from modules.backtester import Backtester
+    from modules.zerodha_client import ZerodhaAPIError
+    
+    steps = steps or SWEEP_CONFIG['steps']
+    target_drops = np.linspace(*SWEEP_CONFIG['target_drop_range'], steps)
+    trailing_deltas = np.linspace(*SWEEP_CONFIG['trailing_delta_range'], steps)
+    
+    backtester = Backtester()
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
+    try:
+        table = backtester.sweep_parameters(symbols, start_date, end_date, target_drops, trailing_deltas)
+    except ZerodhaAPIError as e:
+        print(f"\n⚠️ Optimization failed: {e}")
+        return
+    
+    if len(table) > 0:
+        display = table.head(20).copy()
+        display['target_drop'] *= 100
+        display['trailing_delta'] *= 100
+        print(f"\n🔧 TOP PARAMETERS ({len(table)} combinations, % values):")
+        print(display[['target_drop', 'trailing_delta', 'total_trades', 'win_rate',
+                       'total_pnl', 'profit_factor']].to_string(index=False, float_format='%.3f'))
+        
+        # Save results
+        with profiler.stage('save.results'):
+            filename = f"data/optimize_{'_'.join(symbols)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            table.to_csv(filename, index=False)
+        logger.info(f"Results saved to {filename}")
+    else:
+        print("\n⚠️ No historical data to optimize on")
+
+def run_simulation(symbols=None, record=False):
     """Run live simulation (paper trading)"""
     logger.info("=" * 50)
     logger.info("STARTING SIMULATION MODE")
     logger.info("=" * 50)
     
+    from modules.live_executor import LiveExecutor
+    from modules.metrics import MetricsReporter, read_snapshot
+    
     if not symbols:
         # Run screener first
-        screener = StockScreener()
-        top_stocks = screener.screen_stocks()
+        from modules.screener import StockScreener
+        with profiler.stage('simulate.screener'):
+            screener = StockScreener()
+            top_stocks = screener.screen_stocks()
         symbols = top_stocks['symbol'].tolist()
     
     if not symbols:
@@ -97,36 +236,97 @@ def run_simulation(symbols=None):
     executor = LiveExecutor(simulation_mode=True)
     
     # Enter short positions for all symbols
-    for symbol in symbols:
-        executor.enter_short_position(symbol)
+    with profiler.stage('simulate.entries'):
+        for symbol in symbols:
+            executor.enter_short_position(symbol)
+    
+    recorder = None
+    if record:
+        from modules.tick_recorder import TickRecorder
+        path = os.path.join(TICK_RECORD_PATH, f"ticks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.bin")
+        recorder = TickRecorder(path)
+        logger.info(f"Recording ticks to {path}")
     
     # Start tick streaming
     logger.info(f"Starting tick stream for {len(symbols)} symbols...")
-    executor.start_tick_stream(symbols)
+    executor.start_tick_stream(symbols, recorder=recorder)
+    
+    # Hot-path metrics snapshot (also shown in the dashboard's Live Monitor)
+    reporter = MetricsReporter().start()
     
     print("\n🎮 SIMULATION RUNNING...")
     print("Press Ctrl+C to stop\n")
     
     try:
         while True:
-            import time
             time.sleep(10)
             
             # Show portfolio summary every 10 seconds
             summary = executor.get_portfolio_summary()
+            snapshot = read_snapshot(reporter.path) or {}
+            ticks_per_sec = snapshot.get('rates', {}).get('ticks', 0.0)
+            tick_p99 = snapshot.get('histograms', {}).get('tick.process', {}).get('p99_ms', 0.0)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] "
                   f"Open: {summary['open_positions']} | "
                   f"Closed: {summary['closed_positions']} | "
-                  f"P&L: ₹{summary['total_pnl']:.2f}")
+                  f"P&L: ₹{summary['total_pnl']:.2f} | "
+                  f"Ticks/s: {ticks_per_sec:.0f} | Tick p99: {tick_p99:.3f}ms")
     
     except KeyboardInterrupt:
         logger.info("Stopping simulation...")
-        executor.close_all_positions_eod()
+        executor.zerodha.stop_ticker()
+        if recorder:
+            recorder.close()
+        with profiler.stage('simulate.eod_close'):
+            executor.close_all_positions_eod()
+        reporter.stop()
         
         final_summary = executor.get_portfolio_summary()
         print("\n📊 FINAL SUMMARY:")
         print(f"  Total P&L: ₹{final_summary['total_pnl']:.2f}")
 
+def run_replay(path, speed=1.0):
+    """Replay a recorded tick stream through the simulation executor"""
+    logger.info("=" * 50)
+    logger.info(f"REPLAYING {path} ({f'{speed}x' if speed else 'max speed'})")
+    logger.info("=" * 50)
+    
+    from modules.live_executor import LiveExecutor
+    from modules.tick_recorder import TickReplayer
+    from modules.metrics import metrics
+    
+    replayer = TickReplayer(path)
+    if not replayer.symbols:
+        logger.error(f"No symbol map found for {path}")
+        return
+    
+    executor = LiveExecutor(simulation_mode=True)
+    executor.instruments.register(replayer.symbols)
+    
+    # Enter every recorded symbol at its first recorded price
+    with profiler.stage('replay.entries'):
+        for token, price in replayer.first_prices().items():
+            symbol = replayer.symbols.get(token)
+            if symbol:
+                executor.enter_short_position(symbol, price)
+    
+    with profiler.stage('replay.ticks'):
+        stats = replayer.replay(executor.on_ticks, speed=speed)
+    
+    last_prices = {replayer.symbols[t]: p for t, p in replayer.last_prices().items() if t in replayer.symbols}
+    with profiler.stage('replay.eod_close'):
+        executor.close_all_positions_eod(last_prices)
+    
+    summary = executor.get_portfolio_summary()
+    print("\n📼 REPLAY SUMMARY:")
+    print(f"  Ticks: {stats['ticks']} in {stats['batches']} batches")
+    print(f"  Elapsed: {stats['elapsed']:.3f}s ({stats['ticks_per_sec']:,.0f} ticks/sec)")
+    tick_latency = metrics.histogram('tick.process').summary()
+    print(f"  Tick batch processing: p50 {tick_latency['p50_ms']:.3f}ms | "
+          f"p99 {tick_latency['p99_ms']:.3f}ms | max {tick_latency['max_ms']:.3f}ms")
+    print(f"  Positions: {summary['total_positions']} | Closed: {summary['closed_positions']}")
+    print(f"  Total P&L: ₹{summary['total_pnl']:.2f}")
+
 def run_live(symbols=None):
     """⚠️ Execute REAL trades - USE WITH EXTREME CAUTION"""
     print("\n" + "=" * 50)
@@ -141,6 +341,8 @@ def run_live(symbols=None):
     
     logger.warning("LIVE TRADING MODE ACTIVATED")
     
+    from modules.live_executor import LiveExecutor
+    
     # Same as simulation but with simulation_mode=False
     executor = LiveExecutor(simulation_mode=False)
     
@@ -148,30 +350,103 @@ def run_live(symbols=None):
     print("\n🔴 LIVE TRADING - Not fully implemented yet")
     print("Complete the integration and add safety checks before using!")
 
-def main():
-    parser = argparse.ArgumentParser(description='Algo Trading Platform')
-    parser.add_argument('mode', choices=['screener', 'backtest', 'simulate', 'live'],
-                       help='Mode to run')
-    parser.add_argument('--symbol', help='Stock symbol (for backtest)')
-    parser.add_argument('--symbols', nargs='+', help='List of symbols (for simulate/live)')
-    parser.add_argument('--days', type=int, default=30, help='Days to backtest (default: 30)')
+def print_import_report(mode):
+    """Import a mode's modules and report how long startup took"""
+    print(f"\n⏱️  IMPORT REPORT ({mode}):")
+    for name in MODE_MODULES[mode]:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        print(f"  {name}: {time.perf_counter() - start:.3f}s")
     
-    args = parser.parse_args()
+    loaded = [pkg for pkg in HEAVY_PACKAGES if pkg in sys.modules]
+    print(f"  Heavy packages loaded: {', '.join(loaded) or 'none'}")
+    print(f"  Startup total: {time.perf_counter() - _STARTED:.3f}s")
+    print("  (use 'python -X importtime main.py ...' for a per-module breakdown)\n")
+
+def print_profile_report(mode, output=None):
+    """Stop profiling and print the stage breakdown (and write profile files if asked)"""
+    total = profiler.stop()
+    print(f"\n🔬 STAGE PROFILE ({mode}):")
+    print(profiler.report(total))
     
+    if output is not None:
+        prefix = output or os.path.join(PROFILE_OUTPUT_PATH, f"{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        for path in profiler.write_outputs(prefix):
+            print(f"  Wrote {path}")
+        print("  (open .prof with snakeviz or pstats, .folded with flamegraph.pl or speedscope)")
+
+def run_mode(args):
+    """Dispatch to the selected mode"""
     if args.mode == 'screener':
         run_screener()
     
     elif args.mode == 'backtest':
-        if not args.symbol:
-            print("Error: --symbol required for backtest mode")
+        if args.universe or args.symbols:
+            run_universe_backtest(args.symbols, args.days, args.workers)
+        elif args.symbol:
+            run_backtest(args.symbol, args.days)
+        else:
+            print("Error: --symbol, --symbols or --universe required for backtest mode")
             sys.exit(1)
-        run_backtest(args.symbol, args.days)
+    
+    elif args.mode == 'optimize':
+        symbols = args.symbols or ([args.symbol] if args.symbol else None)
+        if not symbols:
+            print("Error: --symbol or --symbols required for optimize mode")
+            sys.exit(1)
+        run_optimizer(symbols, args.days, args.steps)
     
     elif args.mode == 'simulate':
-        run_simulation(args.symbols)
+        if args.replay:
+            run_replay(args.replay, args.speed or None)
+        else:
+            run_simulation(args.symbols, args.record)
     
     elif args.mode == 'live':
         run_live(args.symbols)
 
+def main():
+    parser = argparse.ArgumentParser(description='Algo Trading Platform')
+    parser.add_argument('mode', choices=['screener', 'backtest', 'optimize', 'simulate', 'live'],
+                       help='Mode to run')
+    parser.add_argument('--symbol', help='Stock symbol (for backtest/optimize)')
+    parser.add_argument('--symbols', nargs='+', help='List of symbols (for backtest/optimize/simulate/live)')
+    parser.add_argument('--universe', action='store_true',
+                       help='Backtest the filtered NSE universe in parallel')
+    parser.add_argument('--workers', type=int, help='Worker processes for multi-symbol backtests')
+    parser.add_argument('--days', type=int, default=30, help='Days to backtest (default: 30)')
+    parser.add_argument('--steps', type=int, help='Grid points per parameter (for optimize)')
+    parser.add_argument('--record', action='store_true',
+                       help='Record the simulation tick stream (for simulate)')
+    parser.add_argument('--replay', metavar='FILE', help='Replay a recorded tick file (for simulate)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                       help='Replay speed multiple; 0 = as fast as possible (default: 1)')
+    parser.add_argument('--import-report', action='store_true',
+                       help='Report startup/import time for the selected mode')
+    parser.add_argument('--profile', action='store_true',
+                       help='Print time and peak memory (tracemalloc) per stage at the end; slows allocation-heavy code')
+    parser.add_argument('--profile-output', nargs='?', const='', metavar='PREFIX',
+                       help='Also write PREFIX.prof (cProfile) and PREFIX.folded (collapsed stacks); '
+                            'implies --profile (default prefix: data/profiles/<mode>_<time>)')
+    
+    args = parser.parse_args()
+    
+    # Setup logging: file/console I/O runs on a background thread (in main()
+    # so spawned backtest workers re-importing this module don't start one)
+    setup_logging()
+    
+    if args.import_report:
+        print_import_report(args.mode)
+    
+    profiling = args.profile or args.profile_output is not None
+    if profiling:
+        profiler.start(cprofile=args.profile_output is not None, sample=args.profile_output is not None)
+    
+    try:
+        run_mode(args)
+    finally:
+        if profiling:
+            print_profile_report(args.mode, args.profile_output)
+
 if __name__ == '__main__':
     main()
@@ -1,8 +1,19 @@
 import pandas as pd
+import numpy as np
 import logging
-from datetime import datetime, timedelta
-from modules.zerodha_client import ZerodhaClient
-from config import STRATEGY_CONFIG
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from modules.zerodha_client import ZerodhaClient, reset_process_state
+from modules.bar_store import BarStore
+from modules.instrument_master import InstrumentMaster
+from modules.trading_calendar import TradingCalendar
+from modules.profiler import profiler
+from modules.log_setup import start_worker_logging, init_worker_logging
+from modules.trade_engine import (
+    EXIT_REASONS, pad_sessions, session_lengths, simulate_sessions, sweep_sessions, sweep_metrics
+)
+from config import STRATEGY_CONFIG, BACKTEST_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +21,11 @@ class Backtester:
     """Backtest the short strategy on historical data"""
     
     def __init__(self):
-        self.zerodha = ZerodhaClient()
+        # Strict: a failed history fetch must not look like an empty (holiday) day
+        self.zerodha = ZerodhaClient(strict=True)
+        self.calendar = TradingCalendar()
+        self.bar_store = BarStore(self.zerodha, calendar=self.calendar)
+        self.instruments = InstrumentMaster(self.zerodha, 'NSE')
         self.target_drop = STRATEGY_CONFIG['target_drop']
         self.trailing_delta = STRATEGY_CONFIG['trailing_delta']
     
@@ -18,27 +33,22 @@ class Backtester:
         """Fetch minute-level data for a specific date"""
         try:
             # Get instrument token
-            instruments = self.zerodha.get_instruments('NSE')
-            instrument = next((i for i in instruments if i['tradingsymbol'] == symbol), None)
+            token = self.instruments.get_token(symbol)
             
-            if not instrument:
+            if token is None:
                 logger.error(f"Instrument {symbol} not found")
                 return None
             
-            token = instrument['instrument_token']
-            
-            # Fetch historical data
+            # Fetch historical data (local bar store first, Kite for gaps)
             from_date = datetime.combine(date, datetime.min.time())
             to_date = datetime.combine(date, datetime.max.time())
             
-            data = self.zerodha.get_historical_data(
+            df = self.bar_store.get_historical_data(
                 instrument_token=token,
                 from_date=from_date,
                 to_date=to_date,
                 interval=interval
             )
-            
-            df = pd.DataFrame(data)
             return df
         
         except Exception as e:
@@ -57,94 +67,158 @@ class Backtester:
         if df is None or len(df) == 0:
             return None
         
-        target_price = entry_price * (1 - self.target_drop)
-        current_stop_loss = entry_price * (1 + self.trailing_delta)
-        lowest_price_seen = entry_price
-        
-        trade_result = {
-            'entry_price': entry_price,
-            'exit_price': None,
-            'exit_time': None,
-            'exit_reason': None,
-            'pnl_percent': 0,
-            'max_profit_percent': 0
-        }
+        return self.simulate_sessions([df], [entry_price])[0]
+    
+    def simulate_sessions(self, frames, entry_prices=None):
+        """
+        Simulate one trade per session in a single vectorized pass
         
-        for idx, row in df.iterrows():
-            current_price = row['close']
-            current_low = row['low']
-            current_high = row['high']
-            current_time = row['date']
-            
-            # Update lowest price seen
-            if current_low < lowest_price_seen:
-                lowest_price_seen = current_low
-                # Update trailing stop loss
-                current_stop_loss = lowest_price_seen * (1 + self.trailing_delta)
-            
-            # Check if target hit
-            if current_low <= target_price:
-                trade_result['exit_price'] = target_price
-                trade_result['exit_time'] = current_time
-                trade_result['exit_reason'] = 'TARGET_HIT'
-                trade_result['pnl_percent'] = ((entry_price - target_price) / entry_price) * 100
-                break
-            
-            # Check if stop loss hit
-            if current_high >= current_stop_loss:
-                trade_result['exit_price'] = current_stop_loss
-                trade_result['exit_time'] = current_time
-                trade_result['exit_reason'] = 'STOP_LOSS'
-                trade_result['pnl_percent'] = ((entry_price - current_stop_loss) / entry_price) * 100
-                break
-            
-            # Track max profit
-            max_profit = ((entry_price - current_low) / entry_price) * 100
-            if max_profit > trade_result['max_profit_percent']:
-                trade_result['max_profit_percent'] = max_profit
-        
-        # If no exit, close at end of day
-        if trade_result['exit_price'] is None:
-            last_row = df.iloc[-1]
-            trade_result['exit_price'] = last_row['close']
-            trade_result['exit_time'] = last_row['date']
-            trade_result['exit_reason'] = 'EOD_CLOSE'
-            trade_result['pnl_percent'] = ((entry_price - last_row['close']) / entry_price) * 100
-        
-        return trade_result
-    
-    def backtest_symbol(self, symbol, start_date, end_date):
-        """Backtest strategy on a symbol over a date range"""
+        frames is a list of non-empty per-session minute DataFrames; entry
+        prices default to each session's opening price.
+        """
+        if not frames:
+            return []
+        
+        lengths = [len(df) for df in frames]
+        return self._simulate_stacked(pd.concat(frames, ignore_index=True), lengths, entry_prices)
+    
+    def _simulate_stacked(self, bars, lengths, entry_prices=None):
+        """Simulate back-to-back sessions stored in one DataFrame"""
+        lengths = np.asarray(lengths, dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        
+        if entry_prices is None:
+            entry_prices = bars['open'].to_numpy(dtype=np.float64)[starts]
+        
+        out = simulate_sessions(
+            pad_sessions(bars['high'].to_numpy(dtype=np.float64), lengths),
+            pad_sessions(bars['low'].to_numpy(dtype=np.float64), lengths),
+            pad_sessions(bars['close'].to_numpy(dtype=np.float64), lengths),
+            lengths, entry_prices, self.target_drop, self.trailing_delta
+        )
+        exit_times = bars['date'].iloc[starts + out['exit_idx']].tolist()
+        
+        trades = []
+        for s in range(len(lengths)):
+            trades.append({
+                'entry_price': entry_prices[s],
+                'exit_price': float(out['exit_price'][s]),
+                'exit_time': exit_times[s],
+                'exit_reason': str(EXIT_REASONS[out['exit_reason'][s]]),
+                'pnl_percent': float(out['pnl_percent'][s]),
+                'max_profit_percent': float(out['max_profit_percent'][s])
+            })
+        
+        return trades
+    
+    def load_sessions(self, symbol, start_date, end_date, on_progress=None):
+        """
+        Load minute bars for a date range, split into daily sessions
+        
+        Returns (bars, lengths, session_days), or None if no data.
+        on_progress(fraction, message) follows the Kite fetches, if any.
+        """
+        token = self.instruments.get_token(symbol)
+        if token is None:
+            logger.error(f"Instrument {symbol} not found")
+            return None
+        
+        # One store read for the whole range; gaps are fetched from Kite in
+        # the largest windows allowed, skipping weekends and exchange holidays
+        with profiler.stage('backtest.load_bars'):
+            bars = self.bar_store.get_historical_data(
+                instrument_token=token,
+                from_date=datetime.combine(start_date, datetime.min.time()),
+                to_date=datetime.combine(end_date, datetime.max.time()),
+                interval='minute',
+                on_progress=on_progress
+            )
+        
+        if len(bars) == 0:
+            return None
+        
+        # Split into daily sessions (bars are sorted by time)
+        session_days = bars['date'].dt.tz_localize(None).to_numpy('datetime64[D]')
+        lengths = session_lengths(session_days)
+        starts = np.cumsum(lengths) - lengths
+        
+        return bars, lengths, session_days[starts]
+    
+    def backtest_symbol(self, symbol, start_date, end_date, on_progress=None):
+        """
+        Backtest strategy on a symbol over a date range
+        
+        on_progress(fraction, message) is called as bars load (the
+        dashboard cancels a job by raising from it).
+        """
         logger.info(f"Backtesting {symbol} from {start_date} to {end_date}")
         
-        results = []
-        current_date = start_date
+        loading = None
+        if on_progress:
+            on_progress(0.0, f"Loading {symbol} bars")
+            loading = lambda fraction, message: on_progress(0.9 * fraction, message)
         
-        while current_date <= end_date:
-            # Skip weekends
-            if current_date.weekday() >= 5:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Fetch intraday data
-            df = self.fetch_intraday_data(symbol, current_date)
-            
-            if df is not None and len(df) > 0:
-                # Entry price is the open of the day
-                entry_price = df.iloc[0]['open']
-                
-                # Simulate trade
-                trade = self.simulate_trade(df, entry_price)
-                
-                if trade:
-                    trade['date'] = current_date
-                    trade['symbol'] = symbol
-                    results.append(trade)
-            
-            current_date += timedelta(days=1)
+        sessions = self.load_sessions(symbol, start_date, end_date, on_progress=loading)
+        if sessions is None:
+            return pd.DataFrame()
+        
+        bars, lengths, session_days = sessions
+        if on_progress:
+            on_progress(0.9, f"Simulating {len(lengths)} sessions")
+        
+        # Simulate every session in one batch (entry at each day's open)
+        with profiler.stage('backtest.simulate'):
+            results = self._simulate_stacked(bars, lengths)
+        for trade, day in zip(results, session_days.tolist()):
+            trade['date'] = day
+            trade['symbol'] = symbol
         
         return pd.DataFrame(results)
     
+    def sweep_parameters(self, symbols, start_date, end_date, target_drops, trailing_deltas):
+        """
+        Evaluate a (target_drop x trailing_delta) grid in one vectorized pass
+        
+        Bars for each symbol are loaded once; every parameter pair is
+        scored with the calculate_metrics fields. Returns a DataFrame
+        ranked by total_pnl.
+        """
+        highs, lows, closes, all_lengths, entries = [], [], [], [], []
+        for symbol in symbols:
+            sessions = self.load_sessions(symbol, start_date, end_date)
+            if sessions is None:
+                continue
+            bars, lengths, _ = sessions
+            highs.append(bars['high'].to_numpy(dtype=np.float64))
+            lows.append(bars['low'].to_numpy(dtype=np.float64))
+            closes.append(bars['close'].to_numpy(dtype=np.float64))
+            all_lengths.append(lengths)
+            # Entry is each session's open
+            entries.append(bars['open'].to_numpy(dtype=np.float64)[np.cumsum(lengths) - lengths])
+        
+        if not all_lengths:
+            return pd.DataFrame()
+        
+        lengths = np.concatenate(all_lengths)
+        entry_prices = np.concatenate(entries)
+        
+        with profiler.stage('optimize.sweep'):
+            out = sweep_sessions(
+                pad_sessions(np.concatenate(highs), lengths),
+                pad_sessions(np.concatenate(lows), lengths),
+                pad_sessions(np.concatenate(closes), lengths),
+                lengths, entry_prices, target_drops, trailing_deltas
+            )
+            metrics = sweep_metrics(out['pnl_percent'])
+        
+        grid_targets, grid_deltas = np.meshgrid(target_drops, trailing_deltas, indexing='ij')
+        
+        table = pd.DataFrame({'target_drop': grid_targets.ravel(), 'trailing_delta': grid_deltas.ravel()})
+        for key, values in metrics.items():
+            table[key] = values.ravel()
+        
+        return table.sort_values('total_pnl', ascending=False).reset_index(drop=True)
+    
     def calculate_metrics(self, results_df):
         """Calculate performance metrics"""
         if len(results_df) == 0:
@@ -177,3 +251,82 @@ class Backtester:
         }
         
         return metrics
+
+
+# Per-process Backtester used by universe backtest workers
+_worker_backtester = None
+
+
+def _init_worker(workers, log_queue, log_level):
+    global _worker_backtester
+    # Worker records go to the parent's log handlers
+    init_worker_logging(log_queue, log_level)
+    # Workers share the Kite rate limits instead of each using all of them
+    reset_process_state(rate_share=workers)
+    _worker_backtester = Backtester()
+
+
+def _backtest_worker(symbol, start_date, end_date):
+    """Backtest one symbol inside a worker process; never raises"""
+    try:
+        return symbol, _worker_backtester.backtest_symbol(symbol, start_date, end_date), None
+    except Exception as e:
+        return symbol, None, str(e)
+
+
+def backtest_universe(symbols, start_date, end_date, workers=None, on_result=None):
+    """
+    Backtest many symbols across a process pool
+    
+    Each worker process builds its own Backtester once and streams back
+    per-symbol trade results as they finish; on_result(symbol, results_df)
+    is called in the parent for every completed symbol. A failing symbol
+    is logged and skipped without stopping the run.
+    
+    Workers are spawned, not forked, so none inherits the parent's pooled
+    Kite connections or background threads; each gets 1/workers of the
+    Kite rate limits and logs through the parent's handlers.
+    
+    Returns (combined results DataFrame, {symbol: error}).
+    """
+    workers = max(1, min(workers or BACKTEST_CONFIG['workers'], len(symbols)))
+    
+    # Warm the shared on-disk instrument dump so workers don't all download it
+    InstrumentMaster(ZerodhaClient(), 'NSE').load()
+    
+    results = []
+    failures = {}
+    
+    context = multiprocessing.get_context('spawn')
+    log_queue, log_listener = start_worker_logging(context)
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(workers, log_queue, logging.getLogger().level)) as pool:
+            futures = {
+                pool.submit(_backtest_worker, symbol, start_date, end_date): symbol
+                for symbol in symbols
+            }
+            
+            for done, future in enumerate(as_completed(futures), 1):
+                symbol = futures[future]
+                try:
+                    symbol, symbol_results, error = future.result()
+                except Exception as e:
+                    symbol_results, error = None, str(e)
+                
+                if error:
+                    logger.error(f"Backtest failed for {symbol}: {error}")
+                    failures[symbol] = error
+                    continue
+                
+                logger.info(f"[{done}/{len(futures)}] {symbol}: {len(symbol_results)} trades")
+                if len(symbol_results) > 0:
+                    results.append(symbol_results)
+                if on_result:
+                    on_result(symbol, symbol_results)
+    finally:
+        log_listener.stop()
+    
+    combined = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    return combined, failures
@@ -0,0 +1,220 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime, time, timedelta
+from config import BAR_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = 'Asia/Kolkata'
+
+# Market time after which today's session is closed and its bars are final
+SESSION_SETTLED = time(15, 45)
+
+# One record per bar; dates are stored as UTC epoch nanoseconds
+BAR_DTYPE = np.dtype([
+    ('date', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8'),
+])
+
+# Largest date range (in days) Kite serves per historical_data call
+HISTORICAL_MAX_DAYS = {
+    'minute': 60,
+    '3minute': 100,
+    '5minute': 100,
+    '10minute': 100,
+    '15minute': 200,
+    '30minute': 200,
+    '60minute': 400,
+    'day': 2000,
+}
+
+
+class BarStore:
+    """
+    Local columnar OHLCV store in front of ZerodhaClient.get_historical_data
+
+    Bars are kept as memory-mapped NumPy files partitioned as
+    <root>/<instrument_token>/<interval>/<YYYY-MM-DD>.npy. Only days
+    missing from the store are requested from Kite, in the largest
+    windows the API allows; completed days (including empty ones) are
+    never fetched twice. Today is only stored once the session has
+    closed. With a trading calendar, non-trading days are skipped
+    entirely.
+    """
+
+    def __init__(self, zerodha, root=BAR_STORE_PATH, calendar=None):
+        self.zerodha = zerodha
+        self.root = root
+        self.calendar = calendar
+
+    def _partition_path(self, instrument_token, interval, day):
+        return os.path.join(self.root, str(instrument_token), interval, f"{day.isoformat()}.npy")
+
+    def has_day(self, instrument_token, interval, day):
+        """Check whether a day is already in the store"""
+        return os.path.exists(self._partition_path(instrument_token, interval, day))
+
+    def read_day(self, instrument_token, interval, day):
+        """Memory-map one stored day (zero-copy); None if not stored"""
+        path = self._partition_path(instrument_token, interval, day)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def write_day(self, instrument_token, interval, day, records):
+        """Atomically write one day's bar records"""
+        path = self._partition_path(instrument_token, interval, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval='minute', on_progress=None):
+        """
+        Fetch bars as a DataFrame, reading the store first and filling gaps from Kite
+
+        on_progress(fraction, message) is called after each Kite fetch.
+        """
+        if self.calendar:
+            days = self.calendar.trading_days(from_date, to_date)
+        else:
+            days = self._days_between(from_date, to_date)
+        missing = [d for d in days if not self.has_day(instrument_token, interval, d)]
+
+        fetched = {}
+        max_days = HISTORICAL_MAX_DAYS.get(interval, 60)
+        windows = self._fetch_windows(days, missing, max_days)
+        for i, (start, end) in enumerate(windows, 1):
+            fetched.update(self._fetch_and_store(instrument_token, interval, start, end))
+            if on_progress:
+                on_progress(i / len(windows), f"Fetched {interval} bars {start} -> {end}")
+
+        parts = []
+        for day in days:
+            records = fetched.get(day)
+            if records is None:
+                records = self.read_day(instrument_token, interval, day)
+            if records is not None and len(records) > 0:
+                parts.append(records)
+
+        if not parts:
+            return pd.DataFrame()
+
+        bars = np.concatenate(parts)
+        df = self._to_frame(bars)
+
+        # Trim partial first/last days to the requested window
+        start_ts = self._as_market_ts(from_date)
+        end_ts = self._as_market_ts(to_date)
+        mask = (df['date'] >= start_ts) & (df['date'] <= end_ts)
+        return df[mask].reset_index(drop=True) if not mask.all() else df
+
+    def _fetch_and_store(self, instrument_token, interval, start_day, end_day):
+        """Fetch a run of missing days from Kite and persist the completed ones"""
+        logger.info(f"Fetching {interval} bars for {instrument_token}: {start_day} -> {end_day}")
+
+        data = self.zerodha.get_historical_data(
+            instrument_token=instrument_token,
+            from_date=datetime.combine(start_day, datetime.min.time()),
+            to_date=datetime.combine(end_day, datetime.max.time()),
+            interval=interval
+        )
+
+        records = self._to_records(data)
+        record_days = self._record_days(records)
+
+        # A non-strict client returns [] on API failure, which would look
+        # like a holiday run, so empty days are only persisted alongside
+        # days that had bars
+        persist_empty = len(records) > 0
+
+        # Today's session is only persisted once it has closed
+        now = self._market_now()
+        last_final = now.date() if now.time() >= SESSION_SETTLED else now.date() - timedelta(days=1)
+        by_day = {}
+        day = start_day
+        while day <= end_day:
+            day_records = records[record_days == np.datetime64(day, 'D')]
+            by_day[day] = day_records
+
+            if day <= last_final and (len(day_records) > 0 or persist_empty):
+                self.write_day(instrument_token, interval, day, day_records)
+
+            day += timedelta(days=1)
+
+        return by_day
+
+    @staticmethod
+    def _market_now():
+        """Current market-local time (naive)"""
+        return pd.Timestamp.now(tz=MARKET_TZ).tz_localize(None).to_pydatetime()
+
+    @staticmethod
+    def _to_records(data):
+        """Convert Kite's list of bar dicts into a BAR_DTYPE array"""
+        if not data:
+            return np.empty(0, dtype=BAR_DTYPE)
+
+        df = pd.DataFrame(data)
+        dates = pd.to_datetime(df['date'])
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize(MARKET_TZ)
+
+        records = np.empty(len(df), dtype=BAR_DTYPE)
+        records['date'] = dates.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy('datetime64[ns]').view('i8')
+        for col in ('open', 'high', 'low', 'close'):
+            records[col] = df[col].to_numpy(dtype=np.float64)
+        records['volume'] = df['volume'].to_numpy(dtype=np.int64) if 'volume' in df else 0
+        return records
+
+    @staticmethod
+    def _record_days(records):
+        """Market-local calendar day of each record"""
+        local = pd.to_datetime(records['date'], unit='ns', utc=True).tz_convert(MARKET_TZ)
+        return local.tz_localize(None).to_numpy('datetime64[D]')
+
+    @staticmethod
+    def _to_frame(records):
+        """Build the DataFrame callers expect from stored records"""
+        df = pd.DataFrame({name: records[name] for name in BAR_DTYPE.names if name != 'date'})
+        df.insert(0, 'date', pd.to_datetime(records['date'], unit='ns', utc=True).tz_convert(MARKET_TZ))
+        return df
+
+    @staticmethod
+    def _as_market_ts(value):
+        ts = pd.Timestamp(value)
+        return ts.tz_localize(MARKET_TZ) if ts.tzinfo is None else ts.tz_convert(MARKET_TZ)
+
+    @staticmethod
+    def _days_between(from_date, to_date):
+        start = from_date.date() if isinstance(from_date, datetime) else from_date
+        end = to_date.date() if isinstance(to_date, datetime) else to_date
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    @staticmethod
+    def _fetch_windows(days, missing, max_days):
+        """
+        Group missing days into (start, end) fetch windows
+
+        A window covers a run of missing days that are adjacent in `days`
+        (so gaps of non-trading days don't split it) and spans at most
+        max_days calendar days.
+        """
+        position = {day: i for i, day in enumerate(days)}
+        windows = []
+        for day in missing:
+            if (windows
+                    and position[day] == position[windows[-1][1]] + 1
+                    and (day - windows[-1][0]).days < max_days):
+                windows[-1][1] = day
+            else:
+                windows.append([day, day])
+        return [tuple(w) for w in windows]
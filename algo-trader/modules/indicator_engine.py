@@ -0,0 +1,333 @@
+import os
+import logging
+import numpy as np
+from config import INDICATOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Bearish signals counted by IndicatorEngine.score (its maximum)
+SIGNAL_COUNT = 5
+
+# Saved alongside the state; a mismatch means the state must be rebuilt
+PARAMETERS = ('ema_fast', 'ema_slow', 'macd_signal', 'rsi_period', 'sma_fast', 'sma_slow', 'volume_window')
+
+
+class IndicatorEngine:
+    """
+    Incremental technical indicators for a whole universe
+
+    Each symbol owns one row of every state array: EMA/MACD and Wilder
+    RSI accumulators, plus ring buffers (2-D arrays) of recent closes and
+    volumes for the moving averages. Bars committed without a volume
+    leave the volume ring untouched, so avg_volume stays an average of
+    real volumes. update() advances any subset of rows
+    by one bar in a single vectorized step, so nothing is recomputed from
+    history; score() evaluates the forming bar for the whole universe at
+    once without committing it.
+
+    One engine holds one bar interval: resolution 'D' for daily bars or
+    'm' for minute bars, which sets the unit of the bar times passed to
+    update() and seed(). Keep a separate engine (and state file) per
+    interval.
+    """
+
+    def __init__(self, capacity=256, resolution='D', **params):
+        settings = {name: INDICATOR_CONFIG[name] for name in PARAMETERS}
+        settings.update(params)
+        for name, value in settings.items():
+            setattr(self, name, int(value))
+
+        self.resolution = resolution
+        self.symbols = []
+        self.index = {}
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.volume_count = np.zeros(capacity, dtype=np.int64)
+        self.last_date = np.full(capacity, np.datetime64('NaT'), dtype=f'datetime64[{resolution}]')
+        self.seeded_on = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.prev_close = np.full(capacity, np.nan)
+        self.ema_fast_value = np.zeros(capacity)
+        self.ema_slow_value = np.zeros(capacity)
+        self.signal_value = np.zeros(capacity)
+        self.avg_gain = np.zeros(capacity)
+        self.avg_loss = np.zeros(capacity)
+        self.closes = np.full((capacity, self.sma_slow), np.nan)
+        self.volumes = np.full((capacity, self.volume_window), np.nan)
+
+    @classmethod
+    def load(cls, path, resolution='D', **params):
+        """Load saved state, or start empty if missing or built with other parameters"""
+        engine = cls(resolution=resolution, **params)
+        if not os.path.exists(path):
+            return engine
+
+        with np.load(path, allow_pickle=False) as data:
+            saved = dict(zip(PARAMETERS, data['parameters'].tolist()))
+            saved_resolution = str(data['resolution']) if 'resolution' in data.files else 'D'
+            if (saved != {name: getattr(engine, name) for name in PARAMETERS} or saved_resolution != resolution
+                    or not set(engine._state_names()) <= set(data.files)):
+                logger.warning(f"Indicator parameters or state format changed; rebuilding {path}")
+                return engine
+
+            n = len(data['symbols'])
+            engine._resize(max(n, 1))
+            engine.symbols = data['symbols'].tolist()
+            engine.index = {symbol: i for i, symbol in enumerate(engine.symbols)}
+            for name in engine._state_names():
+                getattr(engine, name)[:n] = data[name]
+
+        logger.info(f"Loaded indicator state for {n} symbols")
+        return engine
+
+    def save(self, path):
+        """Atomically write the state to an .npz file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        n = len(self.symbols)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            parameters=np.array([getattr(self, name) for name in PARAMETERS]),
+            resolution=np.array(self.resolution),
+            symbols=np.array(self.symbols, dtype=str),
+            **{name: getattr(self, name)[:n] for name in self._state_names()}
+        )
+        os.replace(tmp_path, path)
+
+    def last_dates(self, symbols):
+        """Time of each symbol's latest committed bar, at the engine's resolution (NaT if unknown)"""
+        rows = self._lookup(symbols)
+        dates = np.full(len(rows), np.datetime64('NaT'), dtype=self.last_date.dtype)
+        known = rows >= 0
+        dates[known] = self.last_date[rows[known]]
+        return dates
+
+    def seeded_dates(self, symbols):
+        """Date each symbol was last rebuilt from history (NaT if never)"""
+        rows = self._lookup(symbols)
+        dates = np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[D]')
+        known = rows >= 0
+        dates[known] = self.seeded_on[rows[known]]
+        return dates
+
+    def update(self, symbols, closes, volumes=None, date=None):
+        """
+        Commit one bar for each symbol (NaN closes are skipped)
+
+        Without volumes (or for NaN ones) only the close is committed.
+
+        With a date, bars at or before a symbol's latest bar are ignored,
+        so replaying the same bar twice is harmless.
+        """
+        rows = self._rows(symbols)
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.full(len(rows), np.nan) if volumes is None else np.asarray(volumes, dtype=np.float64)
+        self._commit(rows, closes, volumes, date)
+
+    def _commit(self, rows, closes, volumes, date=None):
+        keep = ~np.isnan(closes)
+        if date is not None:
+            date = np.datetime64(date, self.resolution)
+            last = self.last_date[rows]
+            keep &= np.isnat(last) | (last < date)
+        rows, closes, volumes = rows[keep], closes[keep], volumes[keep]
+        if len(rows) == 0:
+            return
+
+        state = self._step(rows, closes)
+        self.ema_fast_value[rows] = state['ema_fast']
+        self.ema_slow_value[rows] = state['ema_slow']
+        self.signal_value[rows] = state['signal']
+        self.avg_gain[rows] = state['avg_gain']
+        self.avg_loss[rows] = state['avg_loss']
+
+        n = self.count[rows]
+        self.closes[rows, n % self.sma_slow] = closes
+        self.prev_close[rows] = closes
+
+        # Volumes have their own ring position so bars without one are skipped
+        has_volume = ~np.isnan(volumes)
+        volume_rows = rows[has_volume]
+        v = self.volume_count[volume_rows]
+        self.volumes[volume_rows, v % self.volume_window] = volumes[has_volume]
+        self.volume_count[volume_rows] = v + 1
+        self.count[rows] = n + 1
+        if date is not None:
+            self.last_date[rows] = date
+
+    def seed(self, symbols, closes, volumes, last_dates, seeded_on=None):
+        """
+        Rebuild symbols from history
+
+        closes/volumes are (len(symbols), T) arrays with the latest bar in
+        the last column and NaN padding on the left; all symbols advance
+        together one column at a time.
+        """
+        rows = self._rows(symbols)
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+
+        self.count[rows] = 0
+        self.volume_count[rows] = 0
+        self.prev_close[rows] = np.nan
+        self.closes[rows] = np.nan
+        self.volumes[rows] = np.nan
+
+        for t in range(closes.shape[1]):
+            self._commit(rows, closes[:, t], volumes[:, t])
+
+        self.last_date[rows] = np.asarray(last_dates, dtype=self.last_date.dtype)
+        if seeded_on is not None:
+            self.seeded_on[rows] = np.datetime64(seeded_on, 'D')
+
+    def snapshot(self, symbols, prices=None):
+        """
+        Indicator values per symbol as a dict of arrays
+
+        With prices, values include the forming bar at those prices
+        (state is not changed). Unknown or short-history symbols get NaN.
+        """
+        rows = self._lookup(symbols)
+        size = len(rows)
+        known = rows >= 0
+        r = rows[known]
+
+        out = {name: np.full(size, np.nan) for name in
+               ('rsi', 'macd', 'macd_signal', 'sma_fast', 'sma_slow', 'avg_volume', 'prev_close')}
+        if len(r) == 0:
+            return out
+
+        n = self.count[r]
+        out['avg_volume'][known] = self._window_mean(self.volumes, r, self.volume_count[r],
+                                                     self.volume_window, self.volume_window // 2)
+
+        if prices is None:
+            out['prev_close'][known] = np.where(n > 1, self._last_close(r, 2), np.nan)
+            ema_fast, ema_slow = self.ema_fast_value[r], self.ema_slow_value[r]
+            signal, gain, loss = self.signal_value[r], self.avg_gain[r], self.avg_loss[r]
+            sma_fast = self._window_mean(self.closes, r, n, self.sma_fast, self.sma_fast)
+            sma_slow = self._window_mean(self.closes, r, n, self.sma_slow, self.sma_slow)
+        else:
+            price = np.asarray(prices, dtype=np.float64)[known]
+            out['prev_close'][known] = self.prev_close[r]
+            state = self._step(r, price)
+            ema_fast, ema_slow = state['ema_fast'], state['ema_slow']
+            signal, gain, loss = state['signal'], state['avg_gain'], state['avg_loss']
+            sma_fast = self._forming_mean(r, n, self.sma_fast, price)
+            sma_slow = self._forming_mean(r, n, self.sma_slow, price)
+            n = n + 1
+
+        macd = ema_fast - ema_slow
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+
+        out['rsi'][known] = np.where(n > self.rsi_period, rsi, np.nan)
+        out['macd'][known] = np.where(n >= self.ema_slow, macd, np.nan)
+        out['macd_signal'][known] = np.where(n >= self.ema_slow + self.macd_signal, signal, np.nan)
+        out['sma_fast'][known] = sma_fast
+        out['sma_slow'][known] = sma_slow
+        return out
+
+    def score(self, symbols, prices, opens, volumes):
+        """
+        Bearish points per symbol for the forming bar, in one vectorized pass
+
+        One point each for: trading below the open, RSI overbought, MACD
+        below its signal line, a volume spike on a falling price, and the
+        fast moving average below the slow one.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        opens = np.asarray(opens, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        ind = self.snapshot(symbols, prices)
+
+        with np.errstate(invalid='ignore'):
+            points = (
+                (prices < opens).astype(np.int64)
+                + (ind['rsi'] > INDICATOR_CONFIG['rsi_overbought'])
+                + (ind['macd'] < ind['macd_signal'])
+                + ((volumes > INDICATOR_CONFIG['volume_spike'] * ind['avg_volume']) & (prices < ind['prev_close']))
+                + (ind['sma_fast'] < ind['sma_slow'])
+            )
+        return points
+
+    def _step(self, rows, closes):
+        """Accumulators after one more close (pure; nothing is stored)"""
+        n = self.count[rows]
+        first = n == 0
+
+        alpha_fast = 2 / (self.ema_fast + 1)
+        alpha_slow = 2 / (self.ema_slow + 1)
+        alpha_signal = 2 / (self.macd_signal + 1)
+
+        ema_fast = np.where(first, closes, self.ema_fast_value[rows] + alpha_fast * (closes - self.ema_fast_value[rows]))
+        ema_slow = np.where(first, closes, self.ema_slow_value[rows] + alpha_slow * (closes - self.ema_slow_value[rows]))
+        macd = ema_fast - ema_slow
+        signal = np.where(first, macd, self.signal_value[rows] + alpha_signal * (macd - self.signal_value[rows]))
+
+        # Wilder smoothing; the first rsi_period deltas are a plain average
+        delta = np.where(first, 0.0, closes - self.prev_close[rows])
+        k = np.clip(n, 1, self.rsi_period)
+        avg_gain = np.where(first, 0.0, (self.avg_gain[rows] * (k - 1) + np.maximum(delta, 0)) / k)
+        avg_loss = np.where(first, 0.0, (self.avg_loss[rows] * (k - 1) + np.maximum(-delta, 0)) / k)
+
+        return {
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'signal': signal,
+            'avg_gain': avg_gain,
+            'avg_loss': avg_loss,
+        }
+
+    @staticmethod
+    def _window_mean(window, rows, n, length, min_samples):
+        """Mean of each row's last `length` ring entries (NaN below min_samples)"""
+        width = window.shape[1]
+        idx = (n[:, None] - 1 - np.arange(length)[None, :]) % width
+        values = window[rows[:, None], idx]
+        values[np.arange(length)[None, :] >= n[:, None]] = np.nan
+
+        valid = (~np.isnan(values)).sum(axis=1)
+        total = np.nansum(values, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(valid >= min_samples, total / valid, np.nan)
+
+    def _forming_mean(self, rows, n, length, prices):
+        """Mean of the last length-1 committed closes plus the forming price"""
+        if length == 1:
+            return prices.copy()
+        previous = self._window_mean(self.closes, rows, n, length - 1, length - 1)
+        return np.where(n >= length - 1, (previous * (length - 1) + prices) / length, np.nan)
+
+    def _last_close(self, rows, back):
+        """Close `back` bars ago (1 = latest)"""
+        return self.closes[rows, (self.count[rows] - back) % self.sma_slow]
+
+    def _lookup(self, symbols):
+        return np.array([self.index.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+
+    def _rows(self, symbols):
+        """Rows for symbols, adding unknown ones"""
+        rows = []
+        for symbol in symbols:
+            row = self.index.get(symbol)
+            if row is None:
+                row = len(self.symbols)
+                if row == len(self.count):
+                    self._resize(row * 2)
+                self.symbols.append(symbol)
+                self.index[symbol] = row
+            rows.append(row)
+        return np.array(rows, dtype=np.int64)
+
+    def _state_names(self):
+        return ('count', 'volume_count', 'last_date', 'seeded_on', 'prev_close', 'ema_fast_value', 'ema_slow_value',
+                'signal_value', 'avg_gain', 'avg_loss', 'closes', 'volumes')
+
+    def _resize(self, capacity):
+        for name in self._state_names():
+            old = getattr(self, name)
+            if len(old) >= capacity:
+                continue
+            fill = np.datetime64('NaT') if old.dtype.kind == 'M' else (np.nan if old.dtype.kind == 'f' else 0)
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
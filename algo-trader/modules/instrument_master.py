@@ -0,0 +1,153 @@
+import os
+import glob
+import time
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from modules.zerodha_client import ZerodhaAPIError
+from config import INSTRUMENT_CACHE_PATH, INSTRUMENT_RETRY_COOLDOWN
+
+logger = logging.getLogger(__name__)
+
+# Instrument fields kept in the on-disk cache
+INSTRUMENT_FIELDS = {
+    'instrument_token': np.int64,
+    'exchange_token': np.int64,
+    'tradingsymbol': str,
+    'name': str,
+    'instrument_type': str,
+    'segment': str,
+    'exchange': str,
+    'lot_size': np.int64,
+    'tick_size': np.float64,
+}
+
+
+class InstrumentMaster:
+    """
+    Daily instrument dump with O(1) symbol <-> token lookups
+
+    The exchange dump is downloaded at most once per day and cached as a
+    compressed columnar .npz file; lookups go through hash indexes built
+    once on load instead of scanning the instrument list. If the download
+    fails with nothing cached, lookups return None without retrying for
+    INSTRUMENT_RETRY_COOLDOWN seconds.
+    """
+
+    def __init__(self, zerodha, exchange='NSE', cache_dir=INSTRUMENT_CACHE_PATH):
+        self.zerodha = zerodha
+        self.exchange = exchange
+        self.cache_dir = cache_dir
+        self.columns = None
+        self.loaded_for = None
+        self.failed_at = None  # time.monotonic() of the last download that left nothing loaded
+        self.symbol_to_token = {}
+        self.token_to_symbol = {}
+
+    def _cache_path(self, day):
+        return os.path.join(self.cache_dir, f"instruments_{self.exchange}_{day.isoformat()}.npz")
+
+    def load(self, force=False):
+        """Load today's dump from disk, downloading it if not cached yet"""
+        today = datetime.now().date()
+        if self.loaded_for == today and not force:
+            return
+        if (self.failed_at is not None and not force
+                and time.monotonic() - self.failed_at < INSTRUMENT_RETRY_COOLDOWN):
+            return
+
+        path = self._cache_path(today)
+        if os.path.exists(path) and not force:
+            columns = self._read(path)
+        else:
+            columns = self._download()
+            if columns is not None:
+                self._write(path, columns)
+            else:
+                # Fall back to the most recent cached dump
+                cached = sorted(glob.glob(os.path.join(self.cache_dir, f"instruments_{self.exchange}_*.npz")))
+                if not cached:
+                    logger.error(f"No instrument dump available for {self.exchange}; "
+                                 f"retrying in {INSTRUMENT_RETRY_COOLDOWN}s")
+                    self.failed_at = time.monotonic()
+                    return
+                logger.warning(f"Using stale instrument dump {cached[-1]}")
+                columns = self._read(cached[-1])
+
+        self.columns = columns
+        self.symbol_to_token = dict(zip(columns['tradingsymbol'].tolist(), columns['instrument_token'].tolist()))
+        self.token_to_symbol = dict(zip(columns['instrument_token'].tolist(), columns['tradingsymbol'].tolist()))
+        self.loaded_for = today
+        self.failed_at = None
+        logger.info(f"Instrument master loaded: {len(self.symbol_to_token)} {self.exchange} instruments")
+
+    def register(self, token_to_symbol):
+        """Add known token -> symbol pairs (e.g. from a tick recording) without a download"""
+        for token, symbol in token_to_symbol.items():
+            self.symbol_to_token[symbol] = token
+            self.token_to_symbol[token] = symbol
+        if self.loaded_for is None:
+            self.loaded_for = datetime.now().date()
+    
+    def get_token(self, symbol):
+        """Instrument token for a tradingsymbol, or None"""
+        self.load()
+        return self.symbol_to_token.get(symbol)
+
+    def get_symbol(self, token):
+        """Tradingsymbol for an instrument token, or None"""
+        self.load()
+        return self.token_to_symbol.get(token)
+
+    def get_tokens(self, symbols):
+        """Map symbols to tokens, skipping unknown symbols"""
+        self.load()
+        tokens = {}
+        for symbol in symbols:
+            token = self.symbol_to_token.get(symbol)
+            if token is None:
+                logger.warning(f"Instrument {symbol} not found")
+            else:
+                tokens[symbol] = token
+        return tokens
+
+    def to_frame(self):
+        """All cached instruments as a DataFrame"""
+        self.load()
+        if self.columns is None:
+            return pd.DataFrame()
+        return pd.DataFrame(self.columns)
+
+    def _download(self):
+        try:
+            instruments = self.zerodha.get_instruments(self.exchange)
+        except ZerodhaAPIError:
+            return None
+        if not instruments:
+            return None
+
+        columns = {}
+        for field, dtype in INSTRUMENT_FIELDS.items():
+            values = [inst.get(field) for inst in instruments]
+            if dtype is str:
+                columns[field] = np.array(['' if v is None else str(v) for v in values])
+            else:
+                columns[field] = np.array([0 if v is None else v for v in values], dtype=dtype)
+        return columns
+
+    def _write(self, path, columns):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **columns)
+        os.replace(tmp_path, path)
+
+        # Keep only the latest dump on disk
+        for old in glob.glob(os.path.join(self.cache_dir, f"instruments_{self.exchange}_*.npz")):
+            if old != path:
+                os.remove(old)
+
+    @staticmethod
+    def _read(path):
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import DASHBOARD_CONFIG
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+CANCELLED = 'CANCELLED'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress report after cancel()"""
+
+
+class Job:
+    """A background run with progress, result and cooperative cancellation"""
+
+    def __init__(self, key, name):
+        self.key = key
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = 'Queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    def update(self, progress=None, message=None):
+        """
+        Progress callback handed to the job function as on_progress
+
+        Raises JobCancelled once cancel() has been called, which is how a
+        running job stops.
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.message = 'Cancelling'
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobRunner:
+    """
+    Thread pool for long dashboard runs, keyed by their inputs
+
+    submit() returns the running job for the same key, or its result if
+    it finished less than result_ttl seconds ago, so reruns and other
+    sessions share work instead of starting it again. Finished jobs are
+    dropped result_ttl seconds after they end, so a long-lived runner
+    only holds recent results.
+    """
+
+    def __init__(self, workers=None, result_ttl=None):
+        self.result_ttl = result_ttl or DASHBOARD_CONFIG['result_ttl']
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers or DASHBOARD_CONFIG['job_workers'],
+            thread_name_prefix='dashboard-job'
+        )
+        self.jobs = {}  # key -> latest Job
+        self.lock = threading.Lock()
+
+    def submit(self, key, func, *args, name=None, force=False, **kwargs):
+        """
+        Run func(*args, on_progress=job.update, **kwargs) in the background
+
+        With force, a fresh run replaces any cached or running job for key.
+        """
+        with self.lock:
+            self._evict(time.time())
+            job = self.jobs.get(key)
+            if job is not None and not force:
+                if not job.finished:
+                    return job
+                if job.status == DONE:
+                    return job
+            if job is not None and not job.finished:
+                job.cancel()
+
+            job = Job(key, name or str(key))
+            self.jobs[key] = job
+        self.pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, key):
+        return self.jobs.get(key)
+
+    def cancel(self, key):
+        job = self.jobs.get(key)
+        if job is not None and not job.finished:
+            job.cancel()
+
+    def _evict(self, now):
+        """Drop finished jobs older than result_ttl (caller holds the lock)"""
+        expired = [key for key, job in self.jobs.items()
+                   if job.finished and now - job.finished_at >= self.result_ttl]
+        for key in expired:
+            del self.jobs[key]
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled:
+            self._finish(job, CANCELLED, 'Cancelled')
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.message = 'Starting'
+        try:
+            job.result = func(*args, on_progress=job.update, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED, 'Cancelled')
+            logger.info(f"Job {job.name} cancelled after {job.elapsed:.1f}s")
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, FAILED, f"Failed: {e}")
+            logger.exception(f"Job {job.name} failed")
+        else:
+            job.progress = 1.0
+            self._finish(job, DONE, 'Done')
+            logger.info(f"Job {job.name} finished in {job.elapsed:.1f}s")
+
+    @staticmethod
+    def _finish(job, status, message):
+        job.finished_at = time.time()
+        job.message = message
+        job.status = status
@@ -1,9 +1,15 @@
 import logging
+import threading
 from datetime import datetime
 from modules.zerodha_client import ZerodhaClient
-from config import STRATEGY_CONFIG
+from modules.instrument_master import InstrumentMaster
+from modules.position_book import PositionBook, OPEN, EXITING, CLOSED
+from modules.order_dispatcher import OrderDispatcher
+from modules.trade_journal import TradeJournal
+from modules.metrics import metrics
+from modules.subscription_manager import MODE_LTP
+from config import STRATEGY_CONFIG, EXECUTION_CONFIG
 import time
-import threading
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +18,23 @@ class LiveExecutor:
     
     def __init__(self, simulation_mode=True):
         self.zerodha = ZerodhaClient()
+        self.instruments = InstrumentMaster(self.zerodha, 'NSE')
         self.simulation_mode = simulation_mode
-        self.active_positions = {}  # symbol -> position_data
+        self.active_positions = {}  # symbol -> position_data (entry/exit details)
+        self.book = PositionBook()  # token-indexed hot state for the tick path
+        self.journal = TradeJournal()  # write-behind; never blocks the tick path
+        self.mode = 'SIMULATION' if simulation_mode else 'LIVE'
         self.target_drop = STRATEGY_CONFIG['target_drop']
         self.trailing_delta = STRATEGY_CONFIG['trailing_delta']
         self.capital_per_trade = STRATEGY_CONFIG['capital_per_trade']
+        self.cover_failures = {}  # symbol -> consecutive failed cover orders
+        
+        # Cover orders are placed by worker threads, never on the tick thread
+        self.dispatcher = OrderDispatcher(
+            self.zerodha,
+            workers=EXECUTION_CONFIG['order_workers'],
+            on_done=self._on_order_done
+        )
         
         logger.info(f"LiveExecutor initialized (simulation={simulation_mode})")
     
@@ -31,19 +49,21 @@ class LiveExecutor:
             logger.warning(f"{symbol} already has an active position")
             return False
         
-        # Get current quote
-        quote = self.zerodha.get_quote([f"NSE:{symbol}"])
-        if not quote:
-            logger.error(f"Could not get quote for {symbol}")
-            return False
+        entry_price = price
+        if not entry_price:
+            # Get current quote
+            quote = self.zerodha.get_quote([f"NSE:{symbol}"])
+            if not quote:
+                logger.error(f"Could not get quote for {symbol}")
+                return False
+            entry_price = quote[f"NSE:{symbol}"]['last_price']
         
-        entry_price = price if price else quote[f"NSE:{symbol}"]['last_price']
         quantity = int(self.capital_per_trade / entry_price)
         
         if self.simulation_mode:
             # Simulated trade
             order_id = f"SIM_{symbol}_{int(time.time())}"
-            logger.info(f"[SIMULATION] Short {symbol}: {quantity} @ {entry_price}")
+            logger.info("[SIMULATION] Short %s: %s @ %s", symbol, quantity, entry_price)
         else:
             # Real trade
             order_id = self.zerodha.place_order(
@@ -58,138 +78,194 @@ class LiveExecutor:
                 logger.error(f"Failed to place order for {symbol}")
                 return False
             
-            logger.info(f"[LIVE] Short {symbol}: {quantity} @ {entry_price}, Order: {order_id}")
+            logger.info("[LIVE] Short %s: %s @ %s, Order: %s", symbol, quantity, entry_price, order_id)
+            self.journal.record_fill(symbol, 'SELL', quantity, order_id)
         
         # Track position
-        target_price = entry_price * (1 - self.target_drop)
-        stop_loss = entry_price * (1 + self.trailing_delta)
+        token = self.instruments.get_token(symbol)
+        self.book.add(symbol, token, entry_price, self.target_drop, self.trailing_delta)
+        
+        # Positions opened after the stream started need their ticks too
+        if token is not None:
+            self.zerodha.subscribe([token], MODE_LTP)
         
         self.active_positions[symbol] = {
             'entry_price': entry_price,
             'entry_time': datetime.now(),
             'quantity': quantity,
-            'target_price': target_price,
-            'stop_loss': stop_loss,
-            'lowest_price_seen': entry_price,
+            'target_price': entry_price * (1 - self.target_drop),
             'order_id': order_id,
             'status': 'OPEN'
         }
+        self.journal.record_entry(symbol, entry_price, quantity, order_id, self.mode)
         
         return True
     
     def update_position(self, symbol, current_price):
         """Update position based on current tick price"""
+        token = self.book.token_of(symbol)
+        if token is not None:
+            self.process_ticks([token], [current_price])
+    
+    def process_ticks(self, tokens, prices, tick_time=None):
+        """Apply a tick batch to the position book and exit triggered positions"""
+        for symbol, exit_price, reason in self.book.update(tokens, prices):
+            self.exit_position(symbol, exit_price, reason, tick_time=tick_time)
+    
+    def exit_position(self, symbol, exit_price, reason, tick_time=None):
+        """
+        Exit a position
+        
+        In simulation: log the exit
+        In live mode: queue a BUY order to cover short (placed off the tick thread)
+        """
         if symbol not in self.active_positions:
+            logger.warning("No active position for %s", symbol)
             return
         
         position = self.active_positions[symbol]
+        quantity = position['quantity']
         
-        if position['status'] != 'OPEN':
+        if self.simulation_mode:
+            self._close_position(symbol, exit_price, reason)
+            # Arguments are formatted on the logging thread
+            logger.info(
+                "[SIMULATION] Cover %s: %s @ %s | Reason: %s | P&L: ₹%.2f (%.2f%%)",
+                symbol, quantity, exit_price, reason, position['pnl_amount'], position['pnl_percent'],
+                extra={'event': 'exit', 'symbol': symbol, 'reason': reason, 'pnl_amount': position['pnl_amount']}
+            )
             return
         
-        # Update trailing stop loss
-        if current_price < position['lowest_price_seen']:
-            position['lowest_price_seen'] = current_price
-            new_stop_loss = current_price * (1 + self.trailing_delta)
-            position['stop_loss'] = new_stop_loss
-            logger.debug(f"{symbol}: New trailing stop loss @ {new_stop_loss:.2f}")
+        # Place BUY order to cover
+        queued = self.dispatcher.submit(
+            symbol, 'BUY', quantity,
+            tick_time=tick_time, exit_price=exit_price, reason=reason
+        )
+        if queued:
+            position['status'] = 'EXITING'
+    
+    def _on_order_done(self, intent, order_id):
+        """Dispatcher callback (worker thread) once a cover order returns"""
+        symbol = intent['symbol']
+        position = self.active_positions[symbol]
         
-        # Check if target hit
-        if current_price <= position['target_price']:
-            self.exit_position(symbol, position['target_price'], 'TARGET_HIT')
+        if not order_id:
+            self._cover_failed(symbol, position)
             return
         
-        # Check if stop loss hit
-        if current_price >= position['stop_loss']:
-            self.exit_position(symbol, position['stop_loss'], 'STOP_LOSS')
-            return
+        self.cover_failures.pop(symbol, None)
+        self.journal.record_fill(symbol, 'BUY', position['quantity'], order_id)
+        self._close_position(symbol, intent['exit_price'], intent['reason'])
+        logger.info(
+            "[LIVE] Cover %s: %s @ %s | Reason: %s | P&L: ₹%.2f (%.2f%%) | Order: %s",
+            symbol, position['quantity'], intent['exit_price'], intent['reason'],
+            position['pnl_amount'], position['pnl_percent'], order_id,
+            extra={'event': 'exit', 'symbol': symbol, 'reason': intent['reason'],
+                   'pnl_amount': position['pnl_amount'], 'order_id': order_id}
+        )
     
-    def exit_position(self, symbol, exit_price, reason):
+    def _cover_failed(self, symbol, position):
         """
-        Exit a position
+        Back off before re-arming a position whose cover order failed
         
-        In simulation: log the exit
-        In live mode: place BUY order to cover short
+        The position stays out of the tick path (EXITING in the book) until
+        the backoff ends, then the next triggering tick retries. After
+        cover_max_failures in a row it is left for a manual exit.
         """
-        if symbol not in self.active_positions:
-            logger.warning(f"No active position for {symbol}")
+        failures = self.cover_failures.get(symbol, 0) + 1
+        self.cover_failures[symbol] = failures
+        metrics.inc('order.cover_failures')
+        
+        if failures >= EXECUTION_CONFIG['cover_max_failures']:
+            position['status'] = 'COVER_FAILED'
+            logger.error(f"[LIVE] Cover order failed {failures} times for {symbol}; "
+                         f"giving up, position must be closed manually")
             return
         
+        delay = min(EXECUTION_CONFIG['cover_backoff_max'],
+                    EXECUTION_CONFIG['cover_backoff_base'] * 2 ** (failures - 1))
+        logger.error(f"[LIVE] Cover order failed for {symbol} ({failures} of "
+                     f"{EXECUTION_CONFIG['cover_max_failures']}); position still open, retrying in {delay:.1f}s")
+        # Open again (so an EOD close covers it), but not re-armed for ticks yet
+        position['status'] = 'OPEN'
+        timer = threading.Timer(delay, self._rearm, args=(symbol, failures))
+        timer.daemon = True
+        timer.start()
+    
+    def _rearm(self, symbol, failures):
+        """Put a position back on the tick path after its cover backoff"""
+        # Skip if another exit (e.g. EOD close) has been attempted since
+        if self.cover_failures.get(symbol) != failures or self.active_positions[symbol]['status'] != 'OPEN':
+            return
+        self.book.set_status(symbol, OPEN)
+    
+    def _close_position(self, symbol, exit_price, reason):
+        """Mark position as closed and record P&L"""
         position = self.active_positions[symbol]
-        quantity = position['quantity']
         entry_price = position['entry_price']
         
-        pnl_percent = ((entry_price - exit_price) / entry_price) * 100
-        pnl_amount = (entry_price - exit_price) * quantity
+        self.book.set_status(symbol, CLOSED)
         
-        if self.simulation_mode:
-            logger.info(
-                f"[SIMULATION] Cover {symbol}: {quantity} @ {exit_price} | "
-                f"Reason: {reason} | P&L: ₹{pnl_amount:.2f} ({pnl_percent:.2f}%)"
-            )
-        else:
-            # Place BUY order to cover
-            order_id = self.zerodha.place_order(
-                tradingsymbol=symbol,
-                transaction_type='BUY',
-                quantity=quantity,
-                order_type='MARKET',
-                product='MIS'
-            )
-            
-            logger.info(
-                f"[LIVE] Cover {symbol}: {quantity} @ {exit_price} | "
-                f"Reason: {reason} | P&L: ₹{pnl_amount:.2f} ({pnl_percent:.2f}%) | "
-                f"Order: {order_id}"
-            )
+        # No more ticks needed for a closed position
+        token = self.book.token_of(symbol)
+        if token is not None and token >= 0:
+            self.zerodha.unsubscribe([token])
         
-        # Mark position as closed
         position['status'] = 'CLOSED'
         position['exit_price'] = exit_price
         position['exit_time'] = datetime.now()
         position['exit_reason'] = reason
-        position['pnl_percent'] = pnl_percent
-        position['pnl_amount'] = pnl_amount
+        position['pnl_percent'] = ((entry_price - exit_price) / entry_price) * 100
+        position['pnl_amount'] = (entry_price - exit_price) * position['quantity']
+        
+        self.journal.record_exit(
+            symbol, exit_price, position['quantity'], reason,
+            position['pnl_amount'], position['pnl_percent'], self.mode
+        )
+    
+    def on_ticks(self, ticks):
+        """Ticker callback (also driven by TickReplayer): one vectorized pass per batch"""
+        tick_time = time.perf_counter()
+        self.process_ticks(
+            [tick['instrument_token'] for tick in ticks],
+            [tick['last_price'] for tick in ticks],
+            tick_time=tick_time
+        )
+        metrics.observe('tick.process', time.perf_counter() - tick_time)
     
-    def start_tick_stream(self, symbols):
-        """Start live tick streaming for active positions"""
-        instruments = self.zerodha.get_instruments('NSE')
-        tokens = []
-        
-        for symbol in symbols:
-            inst = next((i for i in instruments if i['tradingsymbol'] == symbol), None)
-            if inst:
-                tokens.append(inst['instrument_token'])
-        
-        def on_ticks(ticks):
-            for tick in ticks:
-                # Find symbol from token
-                inst = next((i for i in instruments if i['instrument_token'] == tick['instrument_token']), None)
-                if inst:
-                    symbol = inst['tradingsymbol']
-                    current_price = tick['last_price']
-                    self.update_position(symbol, current_price)
+    def start_tick_stream(self, symbols, recorder=None):
+        """Start live tick streaming for active positions (optionally recording it)"""
+        symbol_tokens = self.instruments.get_tokens(symbols)
+        tokens = list(symbol_tokens.values())
+        
+        if recorder is not None:
+            recorder.add_symbols({token: symbol for symbol, token in symbol_tokens.items()})
         
         def on_connect(ws, response):
             logger.info(f"WebSocket connected. Subscribed to {len(tokens)} instruments.")
         
-        # Start ticker in separate thread
-        ticker_thread = threading.Thread(
-            target=self.zerodha.start_ticker,
-            args=(tokens, on_ticks, on_connect)
-        )
-        ticker_thread.daemon = True
-        ticker_thread.start()
+        # Only last_price is used, so LTP mode is enough; the ticker runs in
+        # its own thread
+        self.zerodha.start_ticker(tokens, self.on_ticks, on_connect, mode=MODE_LTP, recorder=recorder)
     
-    def close_all_positions_eod(self):
-        """Close all open positions at end of day"""
+    def close_all_positions_eod(self, prices=None):
+        """Close all open positions at end of day (at `prices` if given, e.g. on replay)"""
         for symbol, position in self.active_positions.items():
             if position['status'] == 'OPEN':
-                # Get current quote
-                quote = self.zerodha.get_quote([f"NSE:{symbol}"])
-                if quote:
-                    current_price = quote[f"NSE:{symbol}"]['last_price']
+                if prices is not None:
+                    current_price = prices.get(symbol)
+                else:
+                    # Get current quote
+                    quote = self.zerodha.get_quote([f"NSE:{symbol}"])
+                    current_price = quote[f"NSE:{symbol}"]['last_price'] if quote else None
+                if current_price:
+                    self.book.set_status(symbol, EXITING)
                     self.exit_position(symbol, current_price, 'EOD_CLOSE')
+        
+        # Wait for queued cover orders to be placed
+        if not self.dispatcher.wait_idle(timeout=30):
+            logger.error("Timed out waiting for cover orders to complete")
+        self.journal.flush(timeout=30)
     
     def get_portfolio_summary(self):
         """Get summary of all positions"""
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from modules.metrics import metrics
+from config import LOG_FILE, LOG_CONFIG
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields are included as keys"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-call-site token bucket for records below WARNING
+
+    A log line in a tick loop can fire thousands of times a second; each
+    call site may emit `rate` records per second (bursts up to `burst`),
+    and the next record that passes reports how many were dropped.
+    """
+
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sites = {}  # (pathname, lineno) -> [tokens, last_time, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None:
+                site = self.sites[key] = [self.burst, now, 0]
+            site[0] = min(self.burst, site[0] + (now - site[1]) * self.rate)
+            site[1] = now
+
+            if site[0] < 1:
+                site[2] += 1
+                return False
+
+            site[0] -= 1
+            if site[2]:
+                record.suppressed = site[2]
+                site[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them
+
+    Message formatting and all I/O happen on the listener thread; if the
+    queue is full the record is dropped (and counted) instead of blocking.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting is deferred to the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=logging.INFO, log_file=LOG_FILE):
+    """
+    Route all logging through a queue to the log file and stdout
+
+    The file gets JSON lines unless LOG_CONFIG['format'] is 'text'.
+
+    Returns the QueueListener (stopped automatically at exit).
+    """
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(JsonLinesFormatter() if LOG_CONFIG['format'] == 'json' else logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_CONFIG['queue_size'])
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(LOG_CONFIG['rate_per_site'], LOG_CONFIG['burst_per_site']))
+    metrics.gauge('log.queue_depth', log_queue.qsize)
+    metrics.gauge('log.dropped', lambda: queue_handler.dropped)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def start_worker_logging(context):
+    """
+    Collect log records from worker processes into this process's handlers
+    
+    Returns (queue, listener): pass the queue to init_worker_logging in
+    each worker, and stop the listener once the workers have exited.
+    """
+    log_queue = context.Queue()
+    root = logging.getLogger()
+    listener = QueueListener(log_queue, *root.handlers)
+    listener.start()
+    return log_queue, listener
+
+
+def init_worker_logging(log_queue, level=logging.INFO):
+    """Worker initializer: send every record to the parent's queue"""
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+
+def _stop_listener(listener):
+    """Flush queued records at exit (no-op if already stopped)"""
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from config import METRICS_CONFIG, METRICS_SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds: 1us .. ~100s, 4 per decade
+BUCKETS = tuple(10 ** (exponent / 4) * 1e-6 for exponent in range(33))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two adds"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (seconds)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.quantile(0.5) * 1000,
+            'p90_ms': self.quantile(0.9) * 1000,
+            'p99_ms': self.quantile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters, gauges and latency histograms
+
+    Updates are plain arithmetic without locks so they are cheap enough
+    for the tick path (a concurrent update can occasionally be lost);
+    snapshot() adds per-second rates since the previous snapshot.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}  # name -> zero-argument callable
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self._last_counts = {}
+        self._last_time = time.monotonic()
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self.lock:
+                hist = self.histograms.setdefault(name, Histogram())
+        return hist
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def inc(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        """Register a callable read at snapshot time (e.g. a queue's qsize)"""
+        self.gauges[name] = func
+
+    def snapshot(self):
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-9)
+        counters = dict(self.counters)
+
+        gauges = {}
+        for name, func in list(self.gauges.items()):
+            try:
+                gauges[name] = func()
+            except Exception as e:
+                gauges[name] = None
+                logger.debug("Gauge %s failed: %s", name, e)
+
+        snapshot = {
+            'time': time.time(),
+            'uptime': time.time() - self.started,
+            'counters': counters,
+            'rates': {
+                name: (value - self._last_counts.get(name, 0)) / elapsed
+                for name, value in counters.items()
+            },
+            'gauges': gauges,
+            'histograms': {name: hist.summary() for name, hist in list(self.histograms.items())},
+        }
+        self._last_counts = counters
+        self._last_time = now
+        return snapshot
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsReporter:
+    """Writes metrics snapshots to a JSON file every `interval` seconds"""
+
+    def __init__(self, path=METRICS_SNAPSHOT_PATH, interval=None, registry=metrics):
+        self.path = path
+        self.interval = interval or METRICS_CONFIG['interval']
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        self.write()
+
+    def write(self):
+        """Write one snapshot now (atomically); returns it"""
+        snapshot = self.registry.snapshot()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp_path, self.path)
+        return snapshot
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Could not write metrics snapshot: {e}")
+
+
+def read_snapshot(path=METRICS_SNAPSHOT_PATH):
+    """Latest snapshot written by a MetricsReporter, or None"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
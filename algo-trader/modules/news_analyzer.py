@@ -1,9 +1,12 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import logging
+import threading
 from datetime import datetime, timedelta
-from transformers import pipeline
-import pandas as pd
+from modules.news_fetcher import NewsFetcher
+from modules.sentiment_store import SentimentStore, article_hash
+from modules.profiler import profiler
+from modules.sentiment_backends import OnnxSentimentPipeline, load_torch_pipeline, FINBERT_MODEL, ONNX_MODEL_FILE
+from config import SENTIMENT_CONFIG, NEWS_CONFIG, NEWS_API_KEY
 
 logger = logging.getLogger(__name__)
 
@@ -11,47 +14,148 @@ class NewsAnalyzer:
     """Fetch and analyze news for sentiment"""
     
     def __init__(self):
-        # Load FinBERT for financial sentiment analysis
-        try:
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="ProsusAI/finbert",
-                device=-1  # CPU, use 0 for GPU
-            )
-            logger.info("FinBERT model loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load FinBERT: {e}. Using fallback.")
-            self.sentiment_analyzer = None
+        self.batch_size = SENTIMENT_CONFIG['batch_size']
+        self.fetcher = NewsFetcher()
+        self.store = SentimentStore()
+        
+        # FinBERT is loaded on first use (or by prewarm) to keep startup fast
+        self._sentiment_analyzer = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
+        self.model_version = None  # Stored with every score; set when a model loads
+    
+    @property
+    def sentiment_analyzer(self):
+        """FinBERT pipeline, loaded on first access (None if unavailable)"""
+        if not self._model_loaded:
+            self._load_model()
+        return self._sentiment_analyzer
+    
+    def _load_model(self):
+        """Load FinBERT for financial sentiment analysis"""
+        with self._model_lock, profiler.stage('news.model_load'):
+            if self._model_loaded:
+                return
+            
+            if SENTIMENT_CONFIG['backend'] == 'onnx':
+                try:
+                    self._sentiment_analyzer = OnnxSentimentPipeline(
+                        SENTIMENT_CONFIG['onnx_model_dir'],
+                        threads=SENTIMENT_CONFIG['onnx_threads']
+                    )
+                    self.model_version = f"{FINBERT_MODEL}:{ONNX_MODEL_FILE}"
+                    logger.info("FinBERT (ONNX int8) model loaded successfully")
+                except Exception as e:
+                    logger.warning(f"Could not load ONNX FinBERT: {e}. Falling back to PyTorch.")
+            
+            if self._sentiment_analyzer is None:
+                try:
+                    self._sentiment_analyzer = load_torch_pipeline()
+                    self.model_version = f"{FINBERT_MODEL}:torch"
+                    logger.info("FinBERT model loaded successfully")
+                except Exception as e:
+                    logger.warning(f"Could not load FinBERT: {e}. Using fallback.")
+                    self._sentiment_analyzer = None
+            
+            self._model_loaded = True
+    
+    def prewarm(self):
+        """Start loading the model in the background"""
+        if not self._model_loaded:
+            threading.Thread(target=self._load_model, daemon=True).start()
     
     def fetch_nse_announcements(self):
-        """Scrape NSE corporate announcements"""
-        url = "https://www.nseindia.com/companies-listing/corporate-filings-announcements"
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            # Parse announcements (structure may vary)
-            # This is a placeholder - actual parsing depends on NSE structure
-            announcements = []
-            return announcements
-        except Exception as e:
-            logger.error(f"Error fetching NSE announcements: {e}")
+        """Fetch NSE corporate announcements (equities)"""
+        # NSE's API only answers sessions that have visited the site first
+        data = self.fetcher.get_json(
+            NEWS_CONFIG['nse_announcements_url'],
+            params={'index': 'equities'},
+            headers={'Accept': 'application/json', 'Referer': NEWS_CONFIG['nse_home_url']},
+            prime=NEWS_CONFIG['nse_home_url']
+        )
+        if not isinstance(data, list):
             return []
+        
+        announcements = []
+        for item in data:
+            try:
+                published_at = datetime.strptime(item['an_dt'], '%d-%b-%Y %H:%M:%S')
+            except (KeyError, TypeError, ValueError):
+                published_at = None
+            announcements.append({
+                'symbol': item.get('symbol'),
+                'title': item.get('desc', ''),
+                'description': item.get('attchmntText') or '',
+                'published_at': published_at,
+                'source': 'NSE'
+            })
+        return announcements
     
-    def fetch_news_for_stock(self, symbol, days_back=7):
+    def fetch_news_for_stock(self, symbol, days_back=None):
         """Fetch news articles for a specific stock"""
-        # Using NewsAPI or similar service
-        # This is a placeholder - implement with actual news API
+        return self.fetch_news_batch([symbol], days_back)[symbol]
+    
+    def fetch_news_batch(self, symbols, days_back=None):
+        """
+        Fetch news for many stocks concurrently
+        
+        NewsAPI is queried per symbol in parallel (when NEWS_API_KEY is
+        set); NSE announcements are fetched once and split by symbol.
+        """
+        days_back = days_back or NEWS_CONFIG['days_back']
+        since = datetime.now() - timedelta(days=days_back)
+        news = {symbol: [] for symbol in symbols}
+        if not symbols:
+            return news
+        
+        if NEWS_API_KEY:
+            params = {
+                'from': since.strftime('%Y-%m-%d'),
+                'language': 'en',
+                'sortBy': 'publishedAt',
+                'apiKey': NEWS_API_KEY
+            }
+            responses = self.fetcher.get_json_many({
+                symbol: (NEWS_CONFIG['news_api_url'], {**params, 'q': symbol})
+                for symbol in symbols
+            })
+            for symbol, data in responses.items():
+                for article in (data or {}).get('articles', []):
+                    news[symbol].append({
+                        'symbol': symbol,
+                        'title': article.get('title') or '',
+                        'description': article.get('description') or '',
+                        'published_at': self._parse_iso(article.get('publishedAt')),
+                        'source': (article.get('source') or {}).get('name', 'NewsAPI')
+                    })
+        
+        for item in self.fetch_nse_announcements():
+            if item['symbol'] in news and (item['published_at'] is None or item['published_at'] >= since):
+                news[item['symbol']].append(item)
+        
+        return news
+    
+    @staticmethod
+    def _parse_iso(value):
+        """ISO timestamp as naive local time, like the NSE timestamps and `since`"""
         try:
-            # Example: search for company name in news
-            # You'd need to map stock symbols to company names
-            news_items = []
-            return news_items
-        except Exception as e:
-            logger.error(f"Error fetching news for {symbol}: {e}")
-            return []
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone().replace(tzinfo=None)
+        except (AttributeError, ValueError):
+            return None
+    
+    @staticmethod
+    def _label_to_score(result):
+        """Map a FinBERT label/score to a signed sentiment score"""
+        # FinBERT returns: positive, negative, neutral
+        label = result['label'].lower()
+        score = result['score']
+        
+        if label == 'positive':
+            return score
+        elif label == 'negative':
+            return -score
+        else:
+            return 0.0
     
     def analyze_sentiment(self, text):
         """Analyze sentiment of text"""
@@ -62,34 +166,101 @@ class NewsAnalyzer:
             # Truncate text if too long
             text = text[:512]
             result = self.sentiment_analyzer(text)[0]
-            
-            # FinBERT returns: positive, negative, neutral
-            label = result['label'].lower()
-            score = result['score']
-            
-            if label == 'positive':
-                return score
-            elif label == 'negative':
-                return -score
-            else:
-                return 0.0
+            return self._label_to_score(result)
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
             return 0.0
     
+    def analyze_sentiment_batch(self, texts, batch_size=None):
+        """
+        Analyze many texts in padded, length-bucketed batches
+        
+        Texts are sorted by length so each batch pads to a similar size,
+        then scores are returned in the original order.
+        """
+        return [0.0 if score is None else score for score in self._score_texts(texts, batch_size)]
+    
+    def _score_texts(self, texts, batch_size=None):
+        """Batched scores in input order; None where scoring failed"""
+        if not texts:
+            return []
+        if not self.sentiment_analyzer:
+            return [None] * len(texts)
+        
+        batch_size = batch_size or self.batch_size
+        texts = [text[:512] for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        scores = [None] * len(texts)
+        
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            try:
+                results = self.sentiment_analyzer(
+                    [texts[i] for i in batch_idx],
+                    batch_size=len(batch_idx),
+                    truncation=True
+                )
+            except Exception as e:
+                logger.error(f"Error analyzing sentiment batch: {e}")
+                continue
+            
+            for i, result in zip(batch_idx, results):
+                scores[i] = self._label_to_score(result)
+        
+        return scores
+    
     def get_stock_sentiment(self, symbol):
         """Get overall sentiment score for a stock"""
-        news_items = self.fetch_news_for_stock(symbol)
+        return self.get_sentiment_batch([symbol])[symbol]
+    
+    def get_sentiment_batch(self, symbols, batch_size=None):
+        """
+        Time-decayed sentiment for many stocks
         
-        if not news_items:
-            return 0.0
+        Articles are de-duplicated by normalized text hash; only ones the
+        store has no score for (under the current model) go to FinBERT,
+        in one batched pass. Per-symbol aggregates are updated with newly
+        seen articles and read back from the store.
+        """
+        texts = {}
+        links = []
+        with profiler.stage('news.fetch'):
+            news = self.fetch_news_batch(symbols)
+        for symbol, items in news.items():
+            for item in items:
+                h = article_hash(item.get('title', ''), item.get('description', ''))
+                texts[h] = f"{item.get('title', '')} {item.get('description', '')}"
+                published_at = item.get('published_at')
+                links.append((symbol, h, published_at.timestamp() if published_at else None))
         
-        sentiments = []
-        for item in news_items:
-            text = f"{item.get('title', '')} {item.get('description', '')}"
-            sentiment = self.analyze_sentiment(text)
-            sentiments.append(sentiment)
+        # Known articles are looked up before the model is even loaded
+        version = self.model_version or self._expected_model_version()
+        known = self.store.known_scores(texts, version)
+        new_hashes = [h for h in texts if h not in known]
         
-        # Average sentiment
-        avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0.0
-        return avg_sentiment
+        if new_hashes and self.sentiment_analyzer:
+            if self.model_version != version:
+                # A different backend loaded than configured (e.g. ONNX fallback)
+                version = self.model_version
+                known = self.store.known_scores(texts, version)
+                new_hashes = [h for h in texts if h not in known]
+            
+            with profiler.stage('news.inference'):
+                scores = self._score_texts([texts[h] for h in new_hashes], batch_size)
+            self.store.add_scores(
+                {h: score for h, score in zip(new_hashes, scores) if score is not None},
+                version
+            )
+        logger.info(f"Sentiment: {len(texts)} articles, {len(new_hashes)} new")
+        
+        with profiler.stage('news.store'):
+            self.store.link_articles(links, version)
+            return self.store.aggregates(symbols, version)
+    
+    @staticmethod
+    def _expected_model_version():
+        """Model version the configured backend will load"""
+        onnx_path = os.path.join(SENTIMENT_CONFIG['onnx_model_dir'], ONNX_MODEL_FILE)
+        if SENTIMENT_CONFIG['backend'] == 'onnx' and os.path.exists(onnx_path):
+            return f"{FINBERT_MODEL}:{ONNX_MODEL_FILE}"
+        return f"{FINBERT_MODEL}:torch"
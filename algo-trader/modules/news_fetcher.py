@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+from requests.adapters import HTTPAdapter
+from config import NEWS_CONFIG, NEWS_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class NewsFetcher:
+    """
+    Concurrent HTTP client for news sources
+
+    One keep-alive session is shared by a thread pool, with a cap on
+    concurrent requests per host. Responses are cached on disk with their
+    ETag / Last-Modified headers: within max_age the cached body is used
+    as-is, after that the request is revalidated conditionally and a 304
+    reuses the cached body.
+    """
+
+    def __init__(self, cache_dir=NEWS_CACHE_PATH, workers=None, per_host_limit=None,
+                 timeout=None, max_age=None):
+        self.cache_dir = cache_dir
+        self.workers = workers or NEWS_CONFIG['workers']
+        self.per_host_limit = per_host_limit or NEWS_CONFIG['per_host_limit']
+        self.timeout = timeout or NEWS_CONFIG['timeout']
+        self.max_age = NEWS_CONFIG['max_age'] if max_age is None else max_age
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.host_limits = {}
+        self.primed = set()
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, prime=None):
+        """
+        GET a URL through the cache; returns the body text or None
+
+        prime is a page to visit first (once per session) if a request
+        actually has to go out.
+        """
+        full_url = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        path = self._cache_path(full_url)
+        cached = self._read_cache(path)
+
+        if cached and time.time() - cached['fetched_at'] < self.max_age:
+            return cached['body']
+
+        request_headers = dict(headers or {})
+        if cached:
+            if cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        if prime:
+            self.prime(prime)
+
+        try:
+            with self._host_limit(url):
+                response = self.session.get(full_url, headers=request_headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"Error fetching {url}: {e}")
+            return cached['body'] if cached else None
+
+        if response.status_code == 304 and cached:
+            cached['fetched_at'] = time.time()
+            self._write_cache(path, cached)
+            return cached['body']
+
+        if response.status_code != 200:
+            logger.error(f"Error fetching {url}: HTTP {response.status_code}")
+            return cached['body'] if cached else None
+
+        self._write_cache(path, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'body': response.text,
+        })
+        return response.text
+
+    def get_json(self, url, params=None, headers=None, prime=None):
+        """GET and decode JSON; None on failure"""
+        body = self.get(url, params, headers, prime)
+        if body is None:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            logger.error(f"Invalid JSON from {url}: {e}")
+            return None
+
+    def get_json_many(self, requests_by_key):
+        """
+        Fetch many JSON documents concurrently
+
+        requests_by_key maps a caller key to (url, params); returns
+        key -> decoded JSON (None on failure).
+        """
+        if not requests_by_key:
+            return {}
+
+        keys = list(requests_by_key)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as pool:
+            results = pool.map(lambda key: self.get_json(*requests_by_key[key]), keys)
+            return dict(zip(keys, results))
+
+    def prime(self, url):
+        """Visit a page once per session (for sites that require cookies first)"""
+        with self.lock:
+            if url in self.primed:
+                return
+            self.primed.add(url)
+        try:
+            with self._host_limit(url):
+                self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Could not prime session with {url}: {e}")
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            limit = self.host_limits.get(host)
+            if limit is None:
+                limit = self.host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return limit
+
+    def _cache_path(self, full_url):
+        key = hashlib.sha256(full_url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    @staticmethod
+    def _read_cache(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_cache(path, entry):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
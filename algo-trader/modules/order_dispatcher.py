@@ -0,0 +1,117 @@
+import logging
+import queue
+import threading
+import time
+from modules.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OrderDispatcher:
+    """
+    Places orders on a worker pool, off the WebSocket tick thread
+
+    Tick handling submits order intents and returns immediately; worker
+    threads call ZerodhaClient.place_order concurrently and report back
+    through on_done(intent, order_id). At most one order per
+    (symbol, transaction_type) can be in flight, so a symbol can't get two
+    exits at once. Each intent records tick -> decision -> order latency
+    in the shared metrics registry (order.* histograms).
+    """
+
+    def __init__(self, zerodha, workers=4, on_done=None):
+        self.zerodha = zerodha
+        self.workers = workers
+        self.on_done = on_done
+        self.queue = queue.Queue()
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.threads = []
+        metrics.gauge('order.queue_depth', self.queue.qsize)
+
+    def submit(self, symbol, transaction_type, quantity, tick_time=None, **details):
+        """
+        Queue an order intent; returns False if one is already in flight
+
+        tick_time is the time.perf_counter() value when the triggering tick
+        arrived; extra keyword details are passed back to on_done.
+        """
+        key = (symbol, transaction_type)
+        with self.lock:
+            if key in self.in_flight:
+                logger.warning("%s order for %s already in flight", transaction_type, symbol)
+                return False
+            self.in_flight.add(key)
+            if not self.threads:
+                self._start()
+
+        intent = {
+            'symbol': symbol,
+            'transaction_type': transaction_type,
+            'quantity': quantity,
+            'tick_time': tick_time,
+            'decision_time': time.perf_counter(),
+            **details
+        }
+        self.queue.put(intent)
+        return True
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued order has been placed; returns True if idle"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if not self.in_flight:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def latency_summary(self):
+        """p50/p99/max latency in milliseconds for each stage"""
+        summary = {}
+        for stage in ('tick_to_decision', 'decision_to_order', 'tick_to_order'):
+            hist = metrics.histogram(f"order.{stage}")
+            if hist.count:
+                summary[stage] = hist.summary()
+        return summary
+
+    def _start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"order-dispatch-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _worker(self):
+        while True:
+            intent = self.queue.get()
+            order_id = None
+            try:
+                order_id = self.zerodha.place_order(
+                    tradingsymbol=intent['symbol'],
+                    transaction_type=intent['transaction_type'],
+                    quantity=intent['quantity'],
+                    order_type='MARKET',
+                    product='MIS'
+                )
+            except Exception as e:
+                logger.error(f"Order dispatch failed for {intent['symbol']}: {e}")
+
+            self._record_latency(intent, time.perf_counter())
+
+            try:
+                if self.on_done:
+                    self.on_done(intent, order_id)
+            except Exception as e:
+                logger.error(f"Order callback failed for {intent['symbol']}: {e}")
+            finally:
+                with self.lock:
+                    self.in_flight.discard((intent['symbol'], intent['transaction_type']))
+                self.queue.task_done()
+
+    def _record_latency(self, intent, order_time):
+        decision_time = intent['decision_time']
+        metrics.observe('order.decision_to_order', order_time - decision_time)
+        if intent['tick_time'] is not None:
+            metrics.observe('order.tick_to_decision', decision_time - intent['tick_time'])
+            metrics.observe('order.tick_to_order', order_time - intent['tick_time'])
@@ -0,0 +1,164 @@
+import numpy as np
+
+# Position status codes
+EMPTY = 0
+OPEN = 1
+EXITING = 2  # Exit triggered, cover order not yet confirmed
+CLOSED = 3
+
+TARGET_HIT = 0
+STOP_LOSS = 1
+EXIT_REASONS = ('TARGET_HIT', 'STOP_LOSS')
+
+
+class PositionBook:
+    """
+    Array-backed book of short positions indexed by instrument token
+
+    Hot fields (entry, lowest seen, stop, target, trailing delta, status)
+    live in parallel NumPy arrays so a whole tick batch is applied in one
+    vectorized pass; tokens are resolved to slots with a sorted index.
+    """
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.symbols = []
+        self.slot_by_symbol = {}
+        self.tokens = np.zeros(capacity, dtype=np.int64)
+        self.entry = np.zeros(capacity)
+        self.lowest = np.zeros(capacity)
+        self.stop = np.zeros(capacity)
+        self.target = np.zeros(capacity)
+        self.trail = np.zeros(capacity)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self._sorted_tokens = np.empty(0, dtype=np.int64)
+        self._sorted_slots = np.empty(0, dtype=np.int64)
+
+    def add(self, symbol, token, entry_price, target_drop, trailing_delta):
+        """Open a position; returns its slot (unknown tokens get a private negative key)"""
+        if self.count == len(self.tokens):
+            self._grow()
+
+        slot = self.count
+        if token is None:
+            token = -(slot + 1)
+        self.count += 1
+        self.symbols.append(symbol)
+        self.slot_by_symbol[symbol] = slot
+
+        self.tokens[slot] = token
+        self.entry[slot] = entry_price
+        self.lowest[slot] = entry_price
+        self.stop[slot] = entry_price * (1 + trailing_delta)
+        self.target[slot] = entry_price * (1 - target_drop)
+        self.trail[slot] = trailing_delta
+        self.status[slot] = OPEN
+
+        self._reindex()
+        return slot
+
+    def get(self, symbol):
+        """Snapshot of one position's hot fields, or None"""
+        slot = self.slot_by_symbol.get(symbol)
+        if slot is None:
+            return None
+        return {
+            'entry_price': float(self.entry[slot]),
+            'lowest_price_seen': float(self.lowest[slot]),
+            'stop_loss': float(self.stop[slot]),
+            'target_price': float(self.target[slot]),
+            'status': int(self.status[slot]),
+        }
+
+    def set_status(self, symbol, status):
+        slot = self.slot_by_symbol.get(symbol)
+        if slot is not None:
+            self.status[slot] = status
+
+    def token_of(self, symbol):
+        slot = self.slot_by_symbol.get(symbol)
+        return None if slot is None else int(self.tokens[slot])
+
+    def status_of(self, symbol):
+        slot = self.slot_by_symbol.get(symbol)
+        return EMPTY if slot is None else int(self.status[slot])
+
+    def open_tokens(self):
+        """Tokens of positions still open"""
+        return self.tokens[:self.count][self.status[:self.count] == OPEN].tolist()
+
+    def update(self, tokens, prices):
+        """
+        Apply a batch of (token, last_price) ticks
+
+        Same rules as the per-tick logic: a new low moves the trailing
+        stop, then the target is checked before the stop. Triggered
+        positions are marked EXITING so they fire only once. Returns a
+        list of (symbol, exit_price, reason) for positions that crossed
+        a threshold.
+        """
+        tokens = np.asarray(tokens, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(tokens) == 0 or self.count == 0:
+            return []
+
+        pos = np.searchsorted(self._sorted_tokens, tokens)
+        pos = np.minimum(pos, len(self._sorted_tokens) - 1)
+        known = self._sorted_tokens[pos] == tokens
+        slots = self._sorted_slots[pos[known]]
+        prices = prices[known]
+
+        # Ticks for the same token must apply in order: split them into
+        # rounds (normally just one) of at most one tick per token
+        order = np.argsort(slots, kind='stable')
+        sorted_slots = slots[order]
+        group_start = np.r_[0, np.flatnonzero(sorted_slots[1:] != sorted_slots[:-1]) + 1]
+        rank = np.empty(len(slots), dtype=np.int64)
+        rank[order] = np.arange(len(slots)) - np.repeat(group_start, np.diff(np.r_[group_start, len(slots)]))
+
+        triggered = []
+        for r in range(int(rank.max()) + 1 if len(rank) else 0):
+            in_round = rank == r
+            triggered.extend(self._apply(slots[in_round], prices[in_round]))
+        return triggered
+
+    def _apply(self, slots, prices):
+        """One vectorized pass over ticks with unique slots"""
+        is_open = self.status[slots] == OPEN
+        slots = slots[is_open]
+        prices = prices[is_open]
+
+        new_low = prices < self.lowest[slots]
+        low_slots = slots[new_low]
+        self.lowest[low_slots] = prices[new_low]
+        self.stop[low_slots] = prices[new_low] * (1 + self.trail[low_slots])
+
+        hit_target = prices <= self.target[slots]
+        hit_stop = ~hit_target & (prices >= self.stop[slots])
+        fired = hit_target | hit_stop
+        if not fired.any():
+            return []
+
+        fired_slots = slots[fired]
+        self.status[fired_slots] = EXITING
+        exit_prices = np.where(hit_target[fired], self.target[fired_slots], self.stop[fired_slots])
+        reasons = np.where(hit_target[fired], TARGET_HIT, STOP_LOSS)
+
+        return [
+            (self.symbols[slot], float(price), EXIT_REASONS[reason])
+            for slot, price, reason in zip(fired_slots.tolist(), exit_prices.tolist(), reasons.tolist())
+        ]
+
+    def _grow(self):
+        size = len(self.tokens) * 2
+        for name in ('tokens', 'entry', 'lowest', 'stop', 'target', 'trail', 'status'):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _reindex(self):
+        """Rebuild the sorted token -> slot index (cold path, on add)"""
+        order = np.argsort(self.tokens[:self.count], kind='stable')
+        self._sorted_tokens = self.tokens[:self.count][order]
+        self._sorted_slots = order.astype(np.int64)
@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+from config import PROFILE_CONFIG
+
+
+class StageProfiler:
+    """
+    Named-stage wall/CPU time and tracemalloc peaks for a run
+
+    Code marks stages with `with profiler.stage('screener.quotes'):`;
+    when profiling is off a stage is a shared no-op context, so the marks
+    stay in place in production code. Stages may nest and repeat; calls
+    are aggregated by name. tracemalloc has one process-wide peak
+    counter, so only stages on the thread that called start() are
+    recorded; on other threads (e.g. a background model load) a stage is
+    the no-op context.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}  # name -> {'calls', 'wall', 'cpu', 'peak', 'net', 'depth'}
+        self.stack = []
+        self.thread_id = None
+        self.started = None
+        self.cprofile = None
+        self.sampler = None
+        self._null = contextlib.nullcontext()
+
+    def start(self, cprofile=False, sample=False):
+        """Begin profiling (optionally with cProfile and stack sampling)"""
+        self.enabled = True
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if sample:
+            self.sampler = StackSampler(PROFILE_CONFIG['sample_interval']).start()
+
+    def stop(self):
+        """Stop collecting; returns total wall seconds since start()"""
+        if not self.enabled:
+            return 0.0
+        self.enabled = False
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.sampler:
+            self.sampler.stop()
+        tracemalloc.stop()
+        return time.perf_counter() - self.started
+
+    def stage(self, name):
+        if not self.enabled or threading.get_ident() != self.thread_id:
+            return self._null
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        stack = self.stack
+
+        # Fold the peak so far into the enclosing stage before resetting it
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [name, current]
+        stack.append(frame)
+
+        # Created on entry so the report lists stages in the order they start
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak': 0, 'net': 0,
+                                         'depth': len(stack) - 1}
+
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            end, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (current, current)
+            stack.pop()
+            peak = max(frame[1], peak)
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+
+            stats['calls'] += 1
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+            stats['peak'] = max(stats['peak'], peak)
+            stats['net'] += end - current
+
+    def report(self, total=None):
+        """Stage breakdown table (stages in first-seen order, nested ones indented)"""
+        total = total or (time.perf_counter() - self.started if self.started else 0.0)
+        lines = [
+            f"{'Stage':<34}{'Calls':>7}{'Wall s':>10}{'%':>7}{'CPU s':>10}{'Peak MB':>10}{'Net MB':>10}",
+            '-' * 88,
+        ]
+        for name, stats in self.stages.items():
+            label = '  ' * stats['depth'] + name
+            share = stats['wall'] / total * 100 if total else 0.0
+            lines.append(
+                f"{label:<34}{stats['calls']:>7}{stats['wall']:>10.3f}{share:>7.1f}{stats['cpu']:>10.3f}"
+                f"{stats['peak'] / 2**20:>10.1f}{stats['net'] / 2**20:>10.1f}"
+            )
+        untracked = total - sum(s['wall'] for s in self.stages.values() if s['depth'] == 0)
+        lines.append('-' * 88)
+        lines.append(f"{'(outside stages)':<34}{'':>7}{untracked:>10.3f}"
+                     f"{untracked / total * 100 if total else 0.0:>7.1f}")
+        lines.append(f"{'Total':<34}{'':>7}{total:>10.3f}{100.0 if total else 0.0:>7.1f}")
+        return '\n'.join(lines)
+
+    def write_outputs(self, prefix):
+        """Write <prefix>.prof (cProfile) and <prefix>.folded (collapsed stacks); returns paths"""
+        os.makedirs(os.path.dirname(prefix) or '.', exist_ok=True)
+        paths = []
+        if self.cprofile:
+            path = f"{prefix}.prof"
+            pstats.Stats(self.cprofile).dump_stats(path)
+            paths.append(path)
+        if self.sampler:
+            path = f"{prefix}.folded"
+            self.sampler.write(path)
+            paths.append(path)
+        return paths
+
+
+class StackSampler:
+    """
+    Samples every thread's Python stack on an interval
+
+    Output is collapsed-stack text ("thread;outer;...;inner count" per
+    line), the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.counts = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+
+profiler = StageProfiler()
@@ -1,131 +1,294 @@
+import heapq
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from modules.zerodha_client import ZerodhaClient
 from modules.news_analyzer import NewsAnalyzer
-from config import SCREENER_CONFIG
+from modules.instrument_master import InstrumentMaster
+from modules.trading_calendar import TradingCalendar
+from modules.bar_store import BarStore
+from modules.indicator_engine import IndicatorEngine, SIGNAL_COUNT
+from modules.profiler import profiler
+from config import SCREENER_CONFIG, INDICATOR_CONFIG, INDICATOR_STATE_PATH
 
 logger = logging.getLogger(__name__)
 
+# Combined score weights (technical score and |sentiment| are both in [0, 1])
+TECHNICAL_WEIGHT = 0.4
+SENTIMENT_WEIGHT = 0.6
+
 class StockScreener:
     """Screen stocks for short opportunities"""
     
     def __init__(self):
         self.zerodha = ZerodhaClient()
+        self.instruments = InstrumentMaster(self.zerodha, 'NSE')
         self.news_analyzer = NewsAnalyzer()
+        self.calendar = TradingCalendar()
+        self.bar_store = BarStore(self.zerodha, calendar=self.calendar)
+        self.indicators = IndicatorEngine.load(INDICATOR_STATE_PATH)
     
     def get_nse_stocks(self):
         """Fetch all NSE equity stocks"""
-        instruments = self.zerodha.get_instruments('NSE')
+        instruments = self.instruments.to_frame()
+        if len(instruments) == 0:
+            return instruments
         
         # Filter for equity stocks
-        stocks = [
-            inst for inst in instruments 
-            if inst['segment'] == 'NSE' and inst['instrument_type'] == 'EQ'
+        stocks = instruments[
+            (instruments['segment'] == 'NSE') & (instruments['instrument_type'] == 'EQ')
         ]
         
-        return pd.DataFrame(stocks)
+        return stocks.reset_index(drop=True)
     
     def apply_basic_filters(self, df):
         """Apply volume and price filters"""
         # Get quotes for all symbols (in batches to avoid API limits)
         symbols = [f"NSE:{symbol}" for symbol in df['tradingsymbol'].tolist()]
         
-        filtered_stocks = []
+        # Send batches concurrently; the client paces them to the quote rate limit
+        batch_size = SCREENER_CONFIG['quote_batch_size']
+        batches = [symbols[i:i+batch_size] for i in range(0, len(symbols), batch_size)]
         
-        # Process in batches of 500
-        batch_size = 500
-        for i in range(0, len(symbols), batch_size):
-            batch = symbols[i:i+batch_size]
-            quotes = self.zerodha.get_quote(batch)
-            
-            for symbol, data in quotes.items():
-                ltp = data.get('last_price', 0)
-                volume = data.get('volume', 0)
-                
-                # Apply filters
-                if (SCREENER_CONFIG['min_price'] <= ltp <= SCREENER_CONFIG['max_price'] and
-                    volume >= SCREENER_CONFIG['min_volume']):
-                    
-                    filtered_stocks.append({
-                        'symbol': symbol.replace('NSE:', ''),
-                        'price': ltp,
-                        'volume': volume,
-                        'ohlc': data.get('ohlc', {})
-                    })
-        
-        return pd.DataFrame(filtered_stocks)
+        quotes = {}
+        with ThreadPoolExecutor(max_workers=SCREENER_CONFIG['quote_workers']) as pool:
+            for batch_quotes in pool.map(self.zerodha.get_quote, batches):
+                quotes.update(batch_quotes)
+        
+        if not quotes:
+            return pd.DataFrame()
+        
+        quotes_df = pd.DataFrame({
+            'symbol': [symbol.replace('NSE:', '') for symbol in quotes],
+            'price': [data.get('last_price', 0) for data in quotes.values()],
+            'volume': [data.get('volume', 0) for data in quotes.values()],
+            'ohlc': [data.get('ohlc', {}) for data in quotes.values()],
+            'last_trade_time': [data.get('last_trade_time') for data in quotes.values()]
+        })
+        
+        # Apply filters
+        mask = (
+            quotes_df['price'].between(SCREENER_CONFIG['min_price'], SCREENER_CONFIG['max_price']) &
+            (quotes_df['volume'] >= SCREENER_CONFIG['min_volume'])
+        )
+        
+        return quotes_df[mask].reset_index(drop=True)
     
-    def calculate_technical_indicators(self, stock_data):
-        """Calculate bearish technical indicators"""
-        score = 0
+    def refresh_indicators(self, quotes_df, on_progress=None):
+        """
+        Bring the indicator state up to the previous trading day
+        
+        Symbols one bar behind take yesterday's close from today's quote
+        (ohlc.close, the close of the session before the quote's) when the
+        quote is from today's session. The quote has no volume for that
+        day, so only the close is committed. Symbols still short of the
+        previous trading day, new ones and ones due a reseed are rebuilt
+        from daily bars, which the bar store keeps on disk after the first
+        fetch.
+        """
+        if len(quotes_df) == 0:
+            return
         
-        # Price vs Open (bearish if trading below open)
-        ohlc = stock_data.get('ohlc', {})
-        open_price = ohlc.get('open', 0)
-        current_price = stock_data.get('price', 0)
+        today = datetime.now().date()
+        recent = self.calendar.trading_days(today - timedelta(days=15), today - timedelta(days=1))
+        prev_day, day_before = np.datetime64(recent[-1], 'D'), np.datetime64(recent[-2], 'D')
         
-        if current_price < open_price:
-            score += 1
+        symbols = quotes_df['symbol'].to_numpy()
+        last = self.indicators.last_dates(symbols)
+        seeded = self.indicators.seeded_dates(symbols)
         
-        # You can add more indicators:
-        # - RSI (overbought)
-        # - MACD bearish crossover
-        # - Volume spike with price drop
-        # - Moving average crossovers
+        # On a weekend or holiday the quote is from an earlier session and
+        # its ohlc.close is the day before prev_day
+        quote_days = pd.to_datetime(quotes_df['last_trade_time'], errors='coerce').to_numpy(dtype='datetime64[D]')
+        behind = (last == day_before) & (quote_days > prev_day)
+        if behind.any():
+            prev_close = quotes_df['ohlc'].map(lambda ohlc: ohlc.get('close', np.nan)).to_numpy(dtype=np.float64)
+            self.indicators.update(symbols[behind], prev_close[behind], date=prev_day)
+            last = self.indicators.last_dates(symbols)
         
-        return score
+        reseed_before = np.datetime64(today - timedelta(days=INDICATOR_CONFIG['reseed_days']), 'D')
+        current = (last >= prev_day) & ~(seeded < reseed_before)
+        stale = symbols[~current].tolist()
+        if stale:
+            logger.info(f"Rebuilding indicators for {len(stale)} symbols from daily bars")
+            self._seed_indicators(stale, today, prev_day, on_progress)
+        
+        self.indicators.save(INDICATOR_STATE_PATH)
     
-    def screen_stocks(self, top_n=None):
-        """Main screening function"""
+    def _seed_indicators(self, symbols, today, prev_day, on_progress=None):
+        from_date = today - timedelta(days=INDICATOR_CONFIG['history_days'])
+        to_date = datetime.combine(prev_day.item(), datetime.max.time())
+        
+        histories = {}
+        tokens = self.instruments.get_tokens(symbols)
+        for i, (symbol, token) in enumerate(tokens.items()):
+            if on_progress and i % 50 == 0:
+                on_progress(i / len(tokens), f"Loading daily bars ({i} of {len(tokens)} symbols)")
+            bars = self.bar_store.get_historical_data(token, from_date, to_date, interval='day')
+            if len(bars) > 0:
+                histories[symbol] = bars
+        if not histories:
+            return
+        
+        # Right-align histories so the latest bar is in the last column
+        width = max(len(bars) for bars in histories.values())
+        closes = np.full((len(histories), width), np.nan)
+        volumes = np.full((len(histories), width), np.nan)
+        last_dates = []
+        for i, bars in enumerate(histories.values()):
+            closes[i, width - len(bars):] = bars['close'].to_numpy()
+            volumes[i, width - len(bars):] = bars['volume'].to_numpy()
+            last_dates.append(bars['date'].iloc[-1].date())
+        
+        self.indicators.seed(list(histories), closes, volumes, last_dates, seeded_on=today)
+    
+    def calculate_technical_indicators(self, quotes_df):
+        """
+        Bearish technical score in [0, 1] for every row of a quotes frame
+        
+        Scored in one vectorized call: below the open, RSI overbought,
+        MACD bearish, volume spike with price drop, and fast MA under slow,
+        as the fraction of those signals present (so TECHNICAL_WEIGHT and
+        SENTIMENT_WEIGHT weigh like against like).
+        """
+        if len(quotes_df) == 0:
+            return np.zeros(0, dtype=np.float64)
+        
+        opens = quotes_df['ohlc'].map(lambda ohlc: ohlc.get('open', 0)).to_numpy(dtype=np.float64)
+        points = self.indicators.score(
+            quotes_df['symbol'].tolist(),
+            quotes_df['price'].to_numpy(dtype=np.float64),
+            opens,
+            quotes_df['volume'].to_numpy(dtype=np.float64)
+        )
+        return points / SIGNAL_COUNT
+    
+    def screen_stocks(self, top_n=None, on_progress=None):
+        """
+        Main screening function
+        
+        on_progress(fraction, message) is called between steps and
+        sentiment batches (the dashboard cancels a job by raising from it).
+        """
         if top_n is None:
             top_n = SCREENER_CONFIG['top_n_stocks']
+        report = on_progress or (lambda fraction, message: None)
         
         logger.info("Starting stock screening...")
         
         # Step 1: Get all NSE stocks
-        all_stocks = self.get_nse_stocks()
+        report(0.0, "Fetching instruments")
+        with profiler.stage('screener.instruments'):
+            all_stocks = self.get_nse_stocks()
         logger.info(f"Fetched {len(all_stocks)} NSE stocks")
         
         # Step 2: Apply basic filters (price, volume)
-        filtered = self.apply_basic_filters(all_stocks)
+        report(0.1, f"Fetching quotes for {len(all_stocks)} stocks")
+        with profiler.stage('screener.quotes'):
+            filtered = self.apply_basic_filters(all_stocks)
         logger.info(f"After basic filters: {len(filtered)} stocks")
         
-        # Step 3: Score each stock
-        scored_stocks = []
+        # Step 3: Technical scores for the whole filtered universe at once
+        report(0.3, f"Scoring indicators for {len(filtered)} stocks")
+        with profiler.stage('screener.indicators'):
+            self.refresh_indicators(
+                filtered,
+                on_progress=lambda fraction, message: report(0.3 + 0.2 * fraction, message)
+            )
+            tech_scores = self.calculate_technical_indicators(filtered)
         
-        for idx, stock in filtered.iterrows():
-            symbol = stock['symbol']
-            
-            # Technical score
-            tech_score = self.calculate_technical_indicators(stock)
-            
-            # Sentiment score
-            sentiment_score = self.news_analyzer.get_stock_sentiment(symbol)
-            
-            # Combined score (weighted)
-            # Higher negative sentiment + bearish technicals = better short candidate
-            combined_score = (tech_score * 0.4) + (abs(sentiment_score) * 0.6)
-            
-            # Only consider stocks with negative sentiment
-            if sentiment_score < SCREENER_CONFIG['bearish_sentiment_threshold']:
-                scored_stocks.append({
-                    'symbol': symbol,
-                    'price': stock['price'],
-                    'volume': stock['volume'],
-                    'technical_score': tech_score,
-                    'sentiment_score': sentiment_score,
-                    'combined_score': combined_score
-                })
+        # Step 4: Sentiment only while a candidate can still reach the top N
+        if len(filtered) == 0 or top_n <= 0:
+            logger.warning("No stocks met the criteria")
+            return pd.DataFrame()
         
-        # Sort by combined score (descending)
-        scored_df = pd.DataFrame(scored_stocks)
-        if len(scored_df) > 0:
-            scored_df = scored_df.sort_values('combined_score', ascending=False)
-            top_stocks = scored_df.head(top_n)
-            
+        candidates = pd.DataFrame({
+            'symbol': filtered['symbol'].to_numpy(),
+            'price': filtered['price'].to_numpy(),
+            'volume': filtered['volume'].to_numpy(),
+            # Signal count (0-SIGNAL_COUNT) as well, since technical_score is now a fraction
+            'technical_signals': np.rint(tech_scores * SIGNAL_COUNT).astype(np.int64),
+            'technical_score': tech_scores,
+        })
+        # |sentiment| <= 1, so this bounds each stock's combined score
+        candidates['upper_bound'] = candidates['technical_score'] * TECHNICAL_WEIGHT + SENTIMENT_WEIGHT
+        candidates = candidates.sort_values('upper_bound', ascending=False, kind='stable').reset_index(drop=True)
+        
+        with profiler.stage('screener.sentiment'):
+            top_stocks = self._rank_candidates(
+                candidates, top_n,
+                on_progress=lambda fraction, message: report(0.5 + 0.5 * fraction, message)
+            )
+        
+        if len(top_stocks) > 0:
             logger.info(f"Top {top_n} short candidates identified")
             return top_stocks
         else:
             logger.warning("No stocks met the criteria")
             return pd.DataFrame()
+    
+    def _rank_candidates(self, candidates, top_n, on_progress=None):
+        """
+        Score sentiment in batches, best upper bound first, keeping a top-N heap
+        
+        Stops once the heap is full and no remaining candidate's upper
+        bound can beat its weakest entry. While few candidates clear the
+        sentiment threshold the heap may never fill, so at most
+        max_sentiment_candidates (best bounds first) are scored; a warning
+        says when that cut-off leaves the top N unproven.
+        """
+        batch_size = max(1, top_n * SCREENER_CONFIG['sentiment_batch_multiple'])
+        threshold = SCREENER_CONFIG['bearish_sentiment_threshold']
+        budget = SCREENER_CONFIG['max_sentiment_candidates']
+        limit = min(len(candidates), budget) if budget else len(candidates)
+        heap = []  # (combined_score, -rank, row): weakest entry on top
+        scored = 0
+        
+        for start in range(0, limit, batch_size):
+            batch = candidates.iloc[start:min(start + batch_size, limit)]
+            if len(heap) == top_n and batch['upper_bound'].iloc[0] <= heap[0][0]:
+                break
+            if on_progress:
+                on_progress(start / limit, f"Scoring sentiment ({scored} of {limit} done)")
+            
+            sentiments = self.news_analyzer.get_sentiment_batch(batch['symbol'].tolist())
+            scored += len(batch)
+            
+            for rank, stock in enumerate(batch.itertuples(index=False), start):
+                sentiment_score = sentiments[stock.symbol]
+                
+                # Only consider stocks with negative sentiment
+                if sentiment_score >= threshold:
+                    continue
+                
+                # Higher negative sentiment + bearish technicals = better short candidate
+                combined_score = stock.technical_score * TECHNICAL_WEIGHT + abs(sentiment_score) * SENTIMENT_WEIGHT
+                entry = (combined_score, -rank, {
+                    'symbol': stock.symbol,
+                    'price': stock.price,
+                    'volume': stock.volume,
+                    'technical_signals': stock.technical_signals,
+                    'technical_score': stock.technical_score,
+                    'sentiment_score': sentiment_score,
+                    'combined_score': combined_score
+                })
+                if len(heap) < top_n:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+        
+        logger.info(f"Sentiment scored for {scored} of {len(candidates)} candidates")
+        if scored == limit < len(candidates):
+            # Unscored candidates could still place unless the heap is full
+            # and the best of them can't beat its weakest entry
+            next_bound = candidates['upper_bound'].iloc[limit]
+            if len(heap) < top_n or next_bound > heap[0][0]:
+                logger.warning(
+                    f"Sentiment budget of {budget} candidates reached with {len(heap)} of {top_n} found; "
+                    f"{len(candidates) - limit} unscored candidates could still rank, results may be incomplete"
+                )
+        
+        ranked = sorted(heap, key=lambda entry: entry[:2], reverse=True)
+        return pd.DataFrame([row for _, _, row in ranked])
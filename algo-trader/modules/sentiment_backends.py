@@ -0,0 +1,167 @@
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FINBERT_MODEL = "ProsusAI/finbert"
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+
+def load_torch_pipeline(model_name=FINBERT_MODEL):
+    """FinBERT through the PyTorch transformers pipeline"""
+    from transformers import pipeline
+    return pipeline(
+        "sentiment-analysis",
+        model=model_name,
+        device=-1  # CPU, use 0 for GPU
+    )
+
+
+class OnnxSentimentPipeline:
+    """
+    Drop-in replacement for the transformers sentiment pipeline running an
+    int8-quantized ONNX export of FinBERT on ONNX Runtime
+
+    Called like the pipeline: a string or list of strings in, a list of
+    {'label', 'score'} dicts out.
+    """
+
+    def __init__(self, model_dir, threads=None, max_length=512):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE),
+            options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.id2label = AutoConfig.from_pretrained(model_dir).id2label
+        self.max_length = max_length
+
+    def __call__(self, texts, batch_size=None, truncation=True, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        batch_size = batch_size or len(texts) or 1
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=truncation,
+                max_length=self.max_length,
+                return_tensors='np'
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            logits = self.session.run(None, feeds)[0]
+
+            # Softmax over labels, matching the pipeline's top-1 output
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            best = probs.argmax(axis=1)
+
+            results.extend(
+                {'label': self.id2label[int(i)], 'score': float(probs[row, i])}
+                for row, i in enumerate(best)
+            )
+
+        return results
+
+
+def export_onnx_model(model_dir, model_name=FINBERT_MODEL):
+    """Export FinBERT to ONNX and quantize its weights to int8"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["Company reports quarterly results"], return_tensors='pt')
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    fp32_path = os.path.join(model_dir, "model.fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(model_dir, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    tokenizer.save_pretrained(model_dir)
+    model.config.save_pretrained(model_dir)
+    logger.info(f"Quantized ONNX model written to {model_dir}")
+
+
+def check_parity(texts, model_dir, threads=None, batch_size=32):
+    """
+    Compare ONNX and PyTorch signed sentiment scores on the same texts
+
+    Returns a dict with label agreement and max/mean absolute score
+    difference.
+    """
+    from modules.news_analyzer import NewsAnalyzer
+
+    torch_results = load_torch_pipeline()(texts, batch_size=batch_size, truncation=True)
+    onnx_results = OnnxSentimentPipeline(model_dir, threads)(texts, batch_size=batch_size)
+
+    torch_scores = np.array([NewsAnalyzer._label_to_score(r) for r in torch_results])
+    onnx_scores = np.array([NewsAnalyzer._label_to_score(r) for r in onnx_results])
+    diff = np.abs(torch_scores - onnx_scores)
+
+    return {
+        'texts': len(texts),
+        'label_agreement': float(np.mean([
+            a['label'].lower() == b['label'].lower() for a, b in zip(torch_results, onnx_results)
+        ])) if texts else 1.0,
+        'max_abs_diff': float(diff.max()) if texts else 0.0,
+        'mean_abs_diff': float(diff.mean()) if texts else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from config import SENTIMENT_CONFIG
+
+    parser = argparse.ArgumentParser(description='FinBERT ONNX backend tools')
+    parser.add_argument('command', choices=['export', 'parity'])
+    parser.add_argument('--model-dir', default=SENTIMENT_CONFIG['onnx_model_dir'])
+    parser.add_argument('--texts', help='File with one headline per line (for parity)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'export':
+        export_onnx_model(args.model_dir)
+    else:
+        if args.texts:
+            with open(args.texts) as f:
+                texts = [line.strip() for line in f if line.strip()]
+        else:
+            texts = [
+                "Company reports record quarterly profit, beats estimates",
+                "Shares plunge after regulator orders probe into accounts",
+                "Board meeting scheduled to consider routine matters",
+            ]
+        report = check_parity(texts, args.model_dir, SENTIMENT_CONFIG['onnx_threads'])
+        print(json.dumps(report, indent=2))
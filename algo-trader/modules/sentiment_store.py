@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from config import SENTIMENT_STORE_PATH, SENTIMENT_CONFIG, NEWS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS article_scores (
+    article_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    score REAL NOT NULL,
+    scored_at REAL NOT NULL,
+    PRIMARY KEY (article_hash, model)
+);
+CREATE TABLE IF NOT EXISTS symbol_articles (
+    symbol TEXT NOT NULL,
+    article_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    PRIMARY KEY (symbol, article_hash, model)
+);
+CREATE TABLE IF NOT EXISTS symbol_sentiment (
+    symbol TEXT NOT NULL,
+    model TEXT NOT NULL,
+    weighted_sum REAL NOT NULL,
+    weight REAL NOT NULL,
+    ref_time REAL NOT NULL,
+    articles INTEGER NOT NULL,
+    PRIMARY KEY (symbol, model)
+);
+"""
+
+
+def article_hash(title, description=''):
+    """Hash of an article's normalized text (case, punctuation and spacing ignored)"""
+    text = f"{title or ''} {description or ''}".lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = ' '.join(text.split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SentimentStore:
+    """
+    SQLite store of article scores and per-symbol sentiment
+
+    Scores are kept per (article hash, model version), so an article is
+    sent to the model once no matter how many runs or symbols see it.
+    Each symbol keeps a time-decayed running average (half-life
+    decay_half_life_hours) that is updated as new articles are linked to
+    it, never recomputed from scratch.
+    """
+
+    def __init__(self, path=SENTIMENT_STORE_PATH, half_life_hours=None):
+        self.path = path
+        self.half_life = (half_life_hours or SENTIMENT_CONFIG['decay_half_life_hours']) * 3600
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def known_scores(self, hashes, model):
+        """article hash -> stored score for this model"""
+        hashes = list(hashes)
+        scores = {}
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT article_hash, score FROM article_scores WHERE model = ? "
+                    f"AND article_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                )
+                scores.update(rows.fetchall())
+        return scores
+
+    def add_scores(self, scores, model):
+        """Save newly scored articles (hash -> score)"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO article_scores VALUES (?, ?, ?, ?)",
+                [(h, model, score, now) for h, score in scores.items()]
+            )
+
+    def link_articles(self, links, model):
+        """
+        Attach scored articles to symbols and fold new ones into the aggregates
+
+        links is a list of (symbol, article_hash, published_at epoch
+        seconds); pairs seen before or articles without a score are
+        ignored. Returns how many links were new.
+        """
+        if not links:
+            return 0
+
+        scores = self.known_scores({h for _, h, _ in links}, model)
+        now = time.time()
+        added = 0
+
+        with self.lock, self.conn:
+            for symbol, h, published_at in links:
+                if h not in scores:
+                    continue
+                published_at = min(published_at or now, now)
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO symbol_articles VALUES (?, ?, ?, ?)",
+                    (symbol, h, model, published_at)
+                )
+                if cursor.rowcount == 0:
+                    continue
+
+                row = self.conn.execute(
+                    "SELECT weighted_sum, weight, ref_time, articles FROM symbol_sentiment "
+                    "WHERE symbol = ? AND model = ?",
+                    (symbol, model)
+                ).fetchone()
+                weighted_sum, weight, ref_time, articles = row or (0.0, 0.0, now, 0)
+
+                # Re-reference the running sums to now, then add the article
+                decay = self._decay(now - ref_time)
+                article_weight = self._decay(now - published_at)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO symbol_sentiment VALUES (?, ?, ?, ?, ?, ?)",
+                    (symbol, model,
+                     weighted_sum * decay + scores[h] * article_weight,
+                     weight * decay + article_weight,
+                     now, articles + 1)
+                )
+                added += 1
+        return added
+
+    def aggregates(self, symbols, model, days_back=None):
+        """
+        Time-decayed average sentiment per symbol
+
+        Symbols whose news has all decayed past days_back (or that have
+        none) score 0.0.
+        """
+        days_back = days_back or NEWS_CONFIG['days_back']
+        min_weight = self._decay(days_back * 86400)
+        now = time.time()
+        symbols = list(symbols)
+
+        result = {symbol: 0.0 for symbol in symbols}
+        with self.lock:
+            for start in range(0, len(symbols), 500):
+                chunk = symbols[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT symbol, weighted_sum, weight, ref_time FROM symbol_sentiment "
+                    f"WHERE model = ? AND symbol IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                )
+                for symbol, weighted_sum, weight, ref_time in rows:
+                    if weight * self._decay(now - ref_time) >= min_weight:
+                        result[symbol] = weighted_sum / weight
+        return result
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _decay(self, seconds):
+        return 0.5 ** (max(seconds, 0) / self.half_life)
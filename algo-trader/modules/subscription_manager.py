@@ -0,0 +1,173 @@
+import logging
+import threading
+from kiteconnect import KiteTicker
+from twisted.internet import reactor
+from modules.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MODE_LTP = KiteTicker.MODE_LTP
+MODE_QUOTE = KiteTicker.MODE_QUOTE
+MODE_FULL = KiteTicker.MODE_FULL
+
+# Richer modes carry more data (FULL adds market depth)
+MODE_RANK = {MODE_LTP: 0, MODE_QUOTE: 1, MODE_FULL: 2}
+
+
+def call_in_reactor(func, *args):
+    """Run a KiteTicker call on the Twisted reactor thread (its WebSocket is not thread-safe)"""
+    reactor.callFromThread(func, *args)
+
+
+class SubscriptionManager:
+    """
+    Runtime WebSocket subscriptions with per-token tick modes
+
+    Consumers subscribe and unsubscribe tokens while the ticker runs; each
+    token is streamed in the richest mode any consumer asked for (LTP,
+    QUOTE or FULL) and dropped once no consumer needs it. Tokens are
+    spread over several KiteTicker connections when one connection's
+    instrument limit is reached. Subscribe/unsubscribe may be called from
+    any thread; the WebSocket calls they make are handed to the reactor
+    thread.
+    """
+
+    def __init__(self, api_key, access_token, on_ticks, on_connect=None,
+                 max_tokens_per_connection=3000, max_connections=3):
+        self.api_key = api_key
+        self.access_token = access_token
+        self.on_ticks = on_ticks
+        self.on_connect = on_connect
+        self.max_tokens_per_connection = max_tokens_per_connection
+        self.max_connections = max_connections
+
+        self.requests = {}  # token -> {consumer: mode}
+        self.connections = []  # [{'ticker', 'tokens': {token: mode}, 'connected'}]
+        self.lock = threading.RLock()
+        self.running = False
+
+    def start(self):
+        """Open connections for everything subscribed so far"""
+        with self.lock:
+            self.running = True
+            for conn in self.connections:
+                self._connect(conn)
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            for conn in self.connections:
+                if conn['ticker'] is not None:
+                    call_in_reactor(conn['ticker'].close)
+                    conn['ticker'] = None
+                conn['connected'] = False
+
+    def subscribe(self, tokens, mode=MODE_LTP, consumer='default'):
+        """Stream tokens in at least `mode` for a consumer"""
+        with self.lock:
+            for token in tokens:
+                self.requests.setdefault(token, {})[consumer] = mode
+                self._place(token, self.effective_mode(token))
+
+    def unsubscribe(self, tokens, consumer='default'):
+        """Drop a consumer's interest; tokens nobody needs are unsubscribed"""
+        with self.lock:
+            for token in tokens:
+                consumers = self.requests.get(token)
+                if not consumers:
+                    continue
+                consumers.pop(consumer, None)
+
+                if consumers:
+                    self._place(token, self.effective_mode(token))
+                else:
+                    del self.requests[token]
+                    self._remove(token)
+
+    def effective_mode(self, token):
+        consumers = self.requests.get(token)
+        if not consumers:
+            return None
+        return max(consumers.values(), key=MODE_RANK.get)
+
+    def subscribed(self):
+        """Current token -> mode across all connections"""
+        with self.lock:
+            merged = {}
+            for conn in self.connections:
+                merged.update(conn['tokens'])
+            return merged
+
+    def _place(self, token, mode):
+        conn = next((c for c in self.connections if token in c['tokens']), None)
+        if conn is not None:
+            if conn['tokens'][token] != mode:
+                conn['tokens'][token] = mode
+                if conn['connected']:
+                    call_in_reactor(conn['ticker'].set_mode, mode, [token])
+            return
+
+        conn = next((c for c in self.connections if len(c['tokens']) < self.max_tokens_per_connection), None)
+        if conn is None:
+            if len(self.connections) >= self.max_connections:
+                logger.error(f"Subscription limit reached; cannot stream {token}")
+                return
+            conn = {'ticker': None, 'tokens': {}, 'connected': False}
+            self.connections.append(conn)
+            if self.running:
+                self._connect(conn)
+
+        conn['tokens'][token] = mode
+        if conn['connected']:
+            call_in_reactor(conn['ticker'].subscribe, [token])
+            call_in_reactor(conn['ticker'].set_mode, mode, [token])
+
+    def _remove(self, token):
+        for conn in self.connections:
+            if token in conn['tokens']:
+                del conn['tokens'][token]
+                if conn['connected']:
+                    call_in_reactor(conn['ticker'].unsubscribe, [token])
+                return
+
+    def _connect(self, conn):
+        if conn['ticker'] is not None:
+            return
+
+        ticker = KiteTicker(self.api_key, self.access_token)
+
+        def on_ticks(ws, ticks):
+            metrics.inc('ticks', len(ticks))
+            metrics.inc('tick_batches')
+            self.on_ticks(ticks)
+
+        # Ticker callbacks already run on the reactor thread
+        def on_connect(ws, response):
+            with self.lock:
+                conn['connected'] = True
+                self._subscribe_all(ws, conn['tokens'])
+            if self.on_connect:
+                self.on_connect(ws, response)
+
+        def on_close(ws, code, reason):
+            with self.lock:
+                conn['connected'] = False
+            logger.warning(f"Ticker connection closed: {code} {reason}")
+
+        ticker.on_ticks = on_ticks
+        ticker.on_connect = on_connect
+        ticker.on_close = on_close
+        conn['ticker'] = ticker
+        ticker.connect(threaded=True)
+
+    @staticmethod
+    def _subscribe_all(ws, tokens):
+        """(Re)subscribe a connection's tokens, grouped by mode"""
+        if not tokens:
+            return
+        ws.subscribe(list(tokens))
+        by_mode = {}
+        for token, mode in tokens.items():
+            by_mode.setdefault(mode, []).append(token)
+        for mode, mode_tokens in by_mode.items():
+            ws.set_mode(mode, mode_tokens)
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b'TICKREC1'
+HEADER_SIZE = 16  # magic + reserved
+
+# Fixed little-endian record layout, 40 bytes per tick
+TICK_DTYPE = np.dtype([
+    ('recv_ns', '<i8'),  # Wall-clock receive time (epoch ns)
+    ('batch', '<u4'),  # Callback batch the tick arrived in
+    ('token', '<u4'),
+    ('last_price', '<f8'),
+    ('volume', '<i8'),
+    ('last_quantity', '<i4'),
+    ('reserved', '<i4'),
+])
+
+
+def read_ticks(path):
+    """Memory-map a recorded tick file as a TICK_DTYPE array"""
+    with open(path, 'rb') as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a tick recording")
+
+    size = os.path.getsize(path) - HEADER_SIZE
+    count = size // TICK_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=TICK_DTYPE)
+    return np.memmap(path, dtype=TICK_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+def read_symbols(path):
+    """token -> symbol map saved alongside a recording ({} if none)"""
+    sidecar = f"{path}.symbols.json"
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar) as f:
+        return {int(token): symbol for token, symbol in json.load(f).items()}
+
+
+class TickRecorder:
+    """
+    Append-only binary recorder for raw ticks
+
+    record() packs a callback's ticks into fixed-size records and hands
+    them to a writer thread, so the tick thread never waits on disk.
+    """
+
+    def __init__(self, path, symbols=None):
+        self.path = path
+        self.batch = 0
+        self.queue = queue.Queue()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            # Keep batch numbers increasing when appending to a recording
+            existing = read_ticks(path)
+            self.batch = int(existing['batch'][-1]) + 1 if len(existing) else 0
+            del existing
+
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(FILE_MAGIC.ljust(HEADER_SIZE, b'\0'))
+
+        if symbols:
+            self.add_symbols(symbols)
+
+        self.thread = threading.Thread(target=self._writer, name="tick-recorder", daemon=True)
+        self.thread.start()
+
+    def add_symbols(self, symbols):
+        """Save the token -> symbol map used to replay this recording"""
+        mapping = read_symbols(self.path)
+        mapping.update(symbols)
+        with open(f"{self.path}.symbols.json", 'w') as f:
+            json.dump({str(token): symbol for token, symbol in mapping.items()}, f)
+
+    def record(self, ticks):
+        """Pack one callback's ticks and queue them for writing"""
+        if not ticks:
+            return
+
+        records = np.zeros(len(ticks), dtype=TICK_DTYPE)
+        records['recv_ns'] = time.time_ns()
+        records['batch'] = self.batch
+        records['token'] = [tick['instrument_token'] for tick in ticks]
+        records['last_price'] = [tick.get('last_price', 0.0) for tick in ticks]
+        records['volume'] = [tick.get('volume_traded', 0) for tick in ticks]
+        records['last_quantity'] = [tick.get('last_traded_quantity', 0) for tick in ticks]
+        self.batch += 1
+
+        self.queue.put(records.tobytes())
+
+    def close(self):
+        """Flush pending ticks and close the file"""
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+    def _writer(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            self.file.write(chunk)
+            if self.queue.empty():
+                self.file.flush()
+
+
+class TickReplayer:
+    """
+    Feed a recorded tick file through an on_ticks(ticks) callback
+
+    Ticks are replayed in their original callback batches; speed=1 keeps
+    real time, speed=N runs N times faster and speed=None runs flat out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = read_ticks(path)
+        self.symbols = read_symbols(path)
+
+    def first_prices(self):
+        """token -> first recorded price"""
+        tokens, first = np.unique(self.records['token'], return_index=True)
+        return dict(zip(tokens.tolist(), self.records['last_price'][first].tolist()))
+
+    def last_prices(self):
+        """token -> last recorded price"""
+        reversed_tokens = self.records['token'][::-1]
+        tokens, last = np.unique(reversed_tokens, return_index=True)
+        return dict(zip(tokens.tolist(), self.records['last_price'][::-1][last].tolist()))
+
+    def replay(self, on_ticks, speed=1.0):
+        """Replay all batches; returns throughput stats"""
+        records = self.records
+        if len(records) == 0:
+            return {'ticks': 0, 'batches': 0, 'elapsed': 0.0, 'ticks_per_sec': 0.0}
+
+        batch_ids = records['batch']
+        starts = np.r_[0, np.flatnonzero(batch_ids[1:] != batch_ids[:-1]) + 1, len(records)]
+
+        tokens = records['token'].tolist()
+        prices = records['last_price'].tolist()
+        volumes = records['volume'].tolist()
+        quantities = records['last_quantity'].tolist()
+        recv_ns = records['recv_ns']
+
+        started = time.perf_counter()
+        first_ns = int(recv_ns[0])
+
+        for b in range(len(starts) - 1):
+            lo, hi = starts[b], starts[b + 1]
+
+            if speed:
+                due = (int(recv_ns[lo]) - first_ns) / 1e9 / speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            on_ticks([
+                {
+                    'instrument_token': tokens[i],
+                    'last_price': prices[i],
+                    'volume_traded': volumes[i],
+                    'last_traded_quantity': quantities[i],
+                }
+                for i in range(lo, hi)
+            ])
+
+        elapsed = time.perf_counter() - started
+        return {
+            'ticks': len(records),
+            'batches': len(starts) - 1,
+            'elapsed': elapsed,
+            'ticks_per_sec': len(records) / elapsed if elapsed > 0 else float('inf'),
+        }
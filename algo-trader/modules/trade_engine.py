@@ -0,0 +1,164 @@
+import numpy as np
+
+# Exit reason codes used by the vectorized engine
+TARGET_HIT = 0
+STOP_LOSS = 1
+EOD_CLOSE = 2
+EXIT_REASONS = np.array(['TARGET_HIT', 'STOP_LOSS', 'EOD_CLOSE'])
+
+
+def pad_sessions(values, lengths):
+    """Scatter a flat array of back-to-back sessions into a NaN-padded 2-D array"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    cols = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+
+    padded = np.full((len(lengths), int(lengths.max()) if len(lengths) else 0), np.nan)
+    padded[rows, cols] = values
+    return padded
+
+
+def session_lengths(session_keys):
+    """Bar count of each run of equal keys in a sorted key array (vectorized groupby)"""
+    keys = np.asarray(session_keys)
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    breaks = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    return np.diff(np.concatenate([[0], breaks, [len(keys)]]))
+
+
+def simulate_sessions(high, low, close, lengths, entry_prices, target_drop, trailing_delta):
+    """
+    Vectorized short trade with trailing stop loss over a batch of sessions
+
+    high/low/close are (sessions x bars) arrays, NaN-padded past each
+    session's length. Mirrors the bar-by-bar logic of
+    Backtester.simulate_trade: the stop trails the running low, the target
+    is checked before the stop, and an open trade is closed at the last
+    close of the session.
+    """
+    out = sweep_sessions(high, low, close, lengths, entry_prices, [target_drop], [trailing_delta])
+    return {key: value[0, 0] for key, value in out.items()}
+
+
+def sweep_sessions(high, low, close, lengths, entry_prices, target_drops, trailing_deltas,
+                   max_elements=8_000_000):
+    """
+    Run the trade simulation for a whole (target_drop x trailing_delta) grid
+
+    Target hits depend only on target_drop and stop hits only on
+    trailing_delta, so the first hit bar is found once per value on each
+    axis and the grid is formed by broadcasting the two. Results are
+    (len(target_drops), len(trailing_deltas), sessions) arrays.
+    max_elements bounds the size of intermediate (params x sessions x bars)
+    arrays by processing parameter values in chunks.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    entry = np.asarray(entry_prices, dtype=np.float64)
+    target_drops = np.atleast_1d(np.asarray(target_drops, dtype=np.float64))
+    trailing_deltas = np.atleast_1d(np.asarray(trailing_deltas, dtype=np.float64))
+
+    n_sessions, n_bars = low.shape
+    rows = np.arange(n_sessions)
+    chunk = max(1, max_elements // max(1, n_sessions * n_bars))
+
+    # Target side: (targets x sessions)
+    target_price = entry[None, :] * (1 - target_drops[:, None])
+    first_target = np.concatenate([
+        _first_hit(low[None, :, :] <= target_price[i:i + chunk, :, None], n_bars)
+        for i in range(0, len(target_drops), chunk)
+    ])
+
+    # Stop side: the stop trails a running low that starts at the entry
+    # price; fmin skips the NaN padding
+    running_low = np.fmin.accumulate(
+        np.concatenate([entry[:, None], low], axis=1), axis=1
+    )[:, 1:]
+    first_stop = []
+    stop_at_hit = []
+    for i in range(0, len(trailing_deltas), chunk):
+        stop_loss = running_low[None, :, :] * (1 + trailing_deltas[i:i + chunk, None, None])
+        hit = _first_hit(high[None, :, :] >= stop_loss, n_bars)
+        first_stop.append(hit)
+        stop_at_hit.append(np.take_along_axis(
+            stop_loss, np.minimum(hit, n_bars - 1)[:, :, None], axis=2
+        )[:, :, 0])
+    first_stop = np.concatenate(first_stop)
+    stop_at_hit = np.concatenate(stop_at_hit)
+
+    # Combine: (targets x stops x sessions); the target wins a same-bar tie
+    ft = first_target[:, None, :]
+    fs = first_stop[None, :, :]
+    is_target = (ft <= fs) & (ft < n_bars)
+    is_stop = fs < ft
+    has_exit = is_target | is_stop
+
+    exit_idx = np.where(is_target, ft, np.where(is_stop, fs, lengths - 1))
+    reason = np.where(is_target, TARGET_HIT, np.where(is_stop, STOP_LOSS, EOD_CLOSE)).astype(np.int8)
+
+    eod_price = close[rows, lengths - 1]
+    exit_price = np.where(
+        is_target, target_price[:, None, :],
+        np.where(is_stop, stop_at_hit[None, :, :], eod_price)
+    )
+    pnl_percent = ((entry - exit_price) / entry) * 100
+
+    # Max profit only counts bars before the exit bar (all bars at EOD)
+    profit = ((entry[:, None] - low) / entry[:, None]) * 100
+    best_so_far = np.fmax.accumulate(profit, axis=1)
+    last_counted = np.where(has_exit, exit_idx, lengths) - 1
+    max_profit_percent = np.fmax(
+        0.0,
+        np.where(last_counted >= 0, best_so_far[rows, np.maximum(last_counted, 0)], np.nan)
+    )
+
+    return {
+        'exit_idx': exit_idx,
+        'exit_reason': reason,
+        'exit_price': exit_price,
+        'pnl_percent': pnl_percent,
+        'max_profit_percent': max_profit_percent,
+    }
+
+
+def sweep_metrics(pnl_percent):
+    """
+    Backtester.calculate_metrics for many result sets at once
+
+    pnl_percent is (..., trades); returns a dict of arrays shaped (...).
+    """
+    pnl = np.asarray(pnl_percent, dtype=np.float64)
+    total_trades = pnl.shape[-1]
+
+    wins = pnl > 0
+    losses = pnl < 0
+    winning_trades = wins.sum(axis=-1)
+    losing_trades = losses.sum(axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_profit = np.where(winning_trades > 0, np.where(wins, pnl, 0).sum(axis=-1) / winning_trades, 0.0)
+        avg_loss = np.where(losing_trades > 0, np.where(losses, pnl, 0).sum(axis=-1) / losing_trades, 0.0)
+        profit_factor = np.where(avg_loss != 0, np.abs(avg_profit / avg_loss), 0.0)
+
+    return {
+        'total_trades': np.full(pnl.shape[:-1], total_trades),
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': winning_trades / total_trades * 100 if total_trades else np.zeros(pnl.shape[:-1]),
+        'avg_profit': avg_profit,
+        'avg_loss': avg_loss,
+        'total_pnl': pnl.sum(axis=-1),
+        'max_profit': pnl.max(axis=-1) if total_trades else np.zeros(pnl.shape[:-1]),
+        'max_loss': pnl.min(axis=-1) if total_trades else np.zeros(pnl.shape[:-1]),
+        'profit_factor': profit_factor,
+    }
+
+
+def _first_hit(hits, n_bars):
+    """Index of the first True along the last axis, n_bars if none"""
+    return np.where(hits.any(axis=-1), hits.argmax(axis=-1), n_bars)
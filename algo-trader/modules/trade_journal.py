@@ -0,0 +1,192 @@
+import os
+import time
+import queue
+import logging
+import threading
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import (create_engine, event, MetaData, Table, Column, Integer, Float,
+                        String, Date, DateTime, Index, select)
+from modules.metrics import metrics
+from config import DATABASE_URL, JOURNAL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+# Live/simulated entries, exits and broker fills
+trade_events = Table(
+    'trade_events', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('time', DateTime, nullable=False),
+    Column('trade_date', Date, nullable=False),
+    Column('symbol', String(32), nullable=False),
+    Column('event', String(8), nullable=False),  # ENTRY, EXIT, FILL
+    Column('mode', String(12), nullable=False),  # SIMULATION, LIVE
+    Column('side', String(4)),
+    Column('quantity', Integer),
+    Column('price', Float),
+    Column('order_id', String(64)),
+    Column('reason', String(16)),
+    Column('pnl_amount', Float),
+    Column('pnl_percent', Float),
+    Index('ix_trade_events_date_symbol', 'trade_date', 'symbol'),
+    Index('ix_trade_events_symbol', 'symbol'),
+)
+
+# Simulated trades from backtests, one row per session
+backtest_trades = Table(
+    'backtest_trades', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('run_id', String(32), nullable=False),
+    Column('trade_date', Date, nullable=False),
+    Column('symbol', String(32), nullable=False),
+    Column('entry_price', Float),
+    Column('exit_price', Float),
+    Column('exit_reason', String(16)),
+    Column('pnl_percent', Float),
+    Column('max_profit_percent', Float),
+    Index('ix_backtest_trades_date_symbol', 'trade_date', 'symbol'),
+    Index('ix_backtest_trades_run', 'run_id'),
+)
+
+
+class TradeJournal:
+    """
+    Write-behind trade journal on DATABASE_URL
+
+    record_* calls only queue a row; a background thread commits queued
+    rows in batches (SQLite runs in WAL mode), so journaling adds no
+    database latency to the trading path.
+    """
+
+    def __init__(self, url=DATABASE_URL, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or JOURNAL_CONFIG['batch_size']
+        self.flush_interval = flush_interval or JOURNAL_CONFIG['flush_interval']
+
+        self.engine = create_engine(url)
+        if self.engine.url.get_backend_name() == 'sqlite':
+            database = self.engine.url.database
+            if database and database != ':memory:':
+                os.makedirs(os.path.dirname(database) or '.', exist_ok=True)
+            event.listen(self.engine, 'connect', self._sqlite_pragmas)
+        metadata.create_all(self.engine)
+
+        self.queue = queue.Queue()
+        metrics.gauge('journal.queue_depth', self.queue.qsize)
+        self.thread = threading.Thread(target=self._writer, name="trade-journal", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    def record_entry(self, symbol, price, quantity, order_id=None, mode='SIMULATION'):
+        self._event(symbol, 'ENTRY', mode, side='SELL', quantity=quantity, price=price, order_id=order_id)
+
+    def record_exit(self, symbol, price, quantity, reason, pnl_amount, pnl_percent, mode='SIMULATION'):
+        self._event(symbol, 'EXIT', mode, side='BUY', quantity=quantity, price=price, reason=reason,
+                    pnl_amount=pnl_amount, pnl_percent=pnl_percent)
+
+    def record_fill(self, symbol, side, quantity, order_id, price=None, mode='LIVE'):
+        self._event(symbol, 'FILL', mode, side=side, quantity=quantity, price=price, order_id=order_id)
+
+    def record_backtest(self, trades, run_id=None):
+        """Queue a backtest results frame (needs date and symbol columns)"""
+        if len(trades) == 0:
+            return
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        columns = ['entry_price', 'exit_price', 'exit_reason', 'pnl_percent', 'max_profit_percent']
+        for row in trades.to_dict('records'):
+            self.queue.put((backtest_trades, {
+                'run_id': run_id,
+                'trade_date': pd.Timestamp(row['date']).date(),
+                'symbol': row['symbol'],
+                **{column: row.get(column) for column in columns}
+            }))
+
+    def flush(self, timeout=None):
+        """Wait until every queued row is committed; returns True if drained"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Commit what is queued and stop the writer"""
+        self.queue.put(None)
+        self.thread.join()
+        self.engine.dispose()
+
+    def trades(self, start_date=None, end_date=None, symbol=None):
+        """Journal events as a DataFrame (uses the date/symbol index)"""
+        return self._query(trade_events, start_date, end_date, symbol)
+
+    def backtests(self, start_date=None, end_date=None, symbol=None, run_id=None):
+        """Backtest trades as a DataFrame"""
+        return self._query(backtest_trades, start_date, end_date, symbol, run_id)
+
+    def _query(self, table, start_date, end_date, symbol, run_id=None):
+        query = select(table)
+        if start_date is not None:
+            query = query.where(table.c.trade_date >= start_date)
+        if end_date is not None:
+            query = query.where(table.c.trade_date <= end_date)
+        if symbol is not None:
+            query = query.where(table.c.symbol == symbol)
+        if run_id is not None:
+            query = query.where(table.c.run_id == run_id)
+        with self.engine.connect() as conn:
+            return pd.read_sql(query.order_by(table.c.id), conn)
+
+    def _event(self, symbol, event_type, mode, **fields):
+        now = datetime.now()
+        self.queue.put((trade_events, {
+            'time': now,
+            'trade_date': now.date(),
+            'symbol': symbol,
+            'event': event_type,
+            'mode': mode,
+            'side': None, 'quantity': None, 'price': None, 'order_id': None,
+            'reason': None, 'pnl_amount': None, 'pnl_percent': None,
+            **fields
+        }))
+
+    def _writer(self):
+        running = True
+        while running:
+            item = self.queue.get()
+            batch = [item]
+            # Gather whatever else arrives within one flush interval of the
+            # first row; a flush() or close() commits right away
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not (item is None or isinstance(item, threading.Event)):
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            rows = {}
+            waiters = []
+            for item in batch:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    table, row = item
+                    rows.setdefault(table, []).append(row)
+
+            if rows:
+                try:
+                    with self.engine.begin() as conn:
+                        for table, table_rows in rows.items():
+                            conn.execute(table.insert(), table_rows)
+                except Exception as e:
+                    logger.error(f"Trade journal write failed ({sum(map(len, rows.values()))} rows): {e}")
+
+            for waiter in waiters:
+                waiter.set()
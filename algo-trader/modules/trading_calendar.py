@@ -0,0 +1,74 @@
+import os
+import logging
+from datetime import date, datetime, timedelta
+from config import HOLIDAYS_FILE
+
+logger = logging.getLogger(__name__)
+
+# NSE equity trading holidays (weekday closures only); extend yearly or
+# list extra dates, one YYYY-MM-DD per line, in HOLIDAYS_FILE
+NSE_HOLIDAYS = {
+    # 2024
+    date(2024, 1, 22), date(2024, 1, 26), date(2024, 3, 8), date(2024, 3, 25),
+    date(2024, 3, 29), date(2024, 4, 11), date(2024, 4, 17), date(2024, 5, 1),
+    date(2024, 5, 20), date(2024, 6, 17), date(2024, 7, 17), date(2024, 8, 15),
+    date(2024, 10, 2), date(2024, 11, 1), date(2024, 11, 15), date(2024, 11, 20),
+    date(2024, 12, 25),
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10),
+    date(2025, 4, 14), date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15),
+    date(2025, 8, 27), date(2025, 10, 2), date(2025, 10, 21), date(2025, 10, 22),
+    date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 15), date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26),
+    date(2026, 3, 31), date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1),
+    date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14), date(2026, 10, 2),
+    date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+}
+
+
+class TradingCalendar:
+    """NSE trading calendar: weekends plus exchange holidays"""
+
+    def __init__(self, holidays=None, holidays_file=HOLIDAYS_FILE):
+        self.holidays = set(NSE_HOLIDAYS if holidays is None else holidays)
+
+        if holidays_file and os.path.exists(holidays_file):
+            with open(holidays_file) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        self.holidays.add(datetime.strptime(line, '%Y-%m-%d').date())
+
+        self.last_year = max((day.year for day in self.holidays), default=None)
+        self.warned_years = set()
+
+    def is_trading_day(self, day):
+        """Check whether the exchange is open on a given day"""
+        if isinstance(day, datetime):
+            day = day.date()
+        return day.weekday() < 5 and day not in self.holidays
+
+    def trading_days(self, start_date, end_date):
+        """All trading days between two dates (inclusive)"""
+        start = start_date.date() if isinstance(start_date, datetime) else start_date
+        end = end_date.date() if isinstance(end_date, datetime) else end_date
+        self._check_coverage(end)
+
+        days = []
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def _check_coverage(self, end):
+        """Warn (once per year) when a range runs past the listed holidays"""
+        if self.last_year is None or end.year <= self.last_year or end.year in self.warned_years:
+            return
+        self.warned_years.add(end.year)
+        logger.warning(
+            f"NSE holidays are only listed through {self.last_year}; days after that are treated "
+            f"as trading days unless added to NSE_HOLIDAYS or {HOLIDAYS_FILE}"
+        )
@@ -1,53 +1,153 @@
-from kiteconnect import KiteConnect, KiteTicker
+from kiteconnect import KiteConnect
+from kiteconnect import exceptions as kite_exceptions
 import logging
-from config import KITE_API_KEY, KITE_ACCESS_TOKEN
+import random
+import threading
+import time
+import requests
+from modules.rate_limiter import TokenBucket
+from modules.metrics import metrics
+from modules.subscription_manager import SubscriptionManager, MODE_LTP, MODE_FULL
+from config import KITE_API_KEY, KITE_ACCESS_TOKEN, KITE_RATE_LIMITS, KITE_RETRY_CONFIG, KITE_POOL_CONFIG, TICKER_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying: rate limits (429), gateway/5xx and network failures
+RETRYABLE_ERRORS = (
+    kite_exceptions.NetworkException,
+    kite_exceptions.DataException,
+    kite_exceptions.GeneralException,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# One token bucket per endpoint class, shared by every client and thread
+_rate_limiters = {endpoint: TokenBucket(rate) for endpoint, rate in KITE_RATE_LIMITS.items()}
+
+# One pooled KiteConnect session per process
+_shared_kite = None
+_shared_kite_lock = threading.Lock()
+
+
+def _get_shared_kite():
+    global _shared_kite
+    with _shared_kite_lock:
+        if _shared_kite is None:
+            _shared_kite = KiteConnect(api_key=KITE_API_KEY, pool=KITE_POOL_CONFIG)
+            _shared_kite.set_access_token(KITE_ACCESS_TOKEN)
+        return _shared_kite
+
+
+def reset_process_state(rate_share=1):
+    """
+    Start a worker process with its own Kite session and rate limiters
+    
+    Each of `rate_share` processes gets 1/rate_share of every endpoint's
+    rate, so together they stay within Kite's per-key limits.
+    """
+    global _shared_kite
+    with _shared_kite_lock:
+        _shared_kite = None
+    for endpoint, rate in KITE_RATE_LIMITS.items():
+        share = rate / rate_share
+        # At least one token of capacity, or a sub-1/s bucket could never fill
+        _rate_limiters[endpoint] = TokenBucket(share, capacity=max(share, 1))
+
+
+def _is_rate_limited(error):
+    return getattr(error, 'code', None) == 429 or 'too many requests' in str(error).lower()
+
+
+class ZerodhaAPIError(Exception):
+    """A Kite API call failed after retries (raised by strict clients)"""
+
+
 class ZerodhaClient:
-    """Wrapper for Zerodha Kite Connect API"""
+    """
+    Wrapper for Zerodha Kite Connect API
+    
+    Calls are throttled per endpoint class (quote, historical, orders)
+    with process-wide token buckets and retried with jittered exponential
+    backoff on retryable errors. On final failure methods log and return
+    an empty result, or raise ZerodhaAPIError when strict=True so callers
+    can tell a failure from "no data".
+    """
     
-    def __init__(self):
-        self.kite = KiteConnect(api_key=KITE_API_KEY)
-        self.kite.set_access_token(KITE_ACCESS_TOKEN)
+    def __init__(self, strict=False):
+        self.kite = _get_shared_kite()
+        self.strict = strict
         self.ticker = None
+    
+    def _call(self, endpoint, func, *args, retry_ambiguous=True, **kwargs):
+        """
+        Call a Kite API method under its endpoint's rate limit, with retries
+        
+        With retry_ambiguous=False only rate-limit rejections are retried
+        (used for orders, where a timeout may still have placed the order).
+        """
+        limiter = _rate_limiters.get(endpoint, _rate_limiters['default'])
+        name = getattr(func, '__name__', endpoint)
+        attempt = 0
+        
+        while True:
+            metrics.observe(f"ratelimit.{endpoint}.wait", limiter.acquire())
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                metrics.observe(f"api.{name}", time.perf_counter() - start)
+                return result
+            except RETRYABLE_ERRORS as e:
+                metrics.inc(f"api.{name}.errors")
+                if not (retry_ambiguous or _is_rate_limited(e)) or attempt >= KITE_RETRY_CONFIG['max_retries']:
+                    raise
+                metrics.inc(f"api.{name}.retries")
+                
+                delay = min(KITE_RETRY_CONFIG['backoff_max'], KITE_RETRY_CONFIG['backoff_base'] * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Kite {endpoint} call failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+    
+    def _failed(self, message, error, default):
+        """Log a failed call; raise in strict mode, else return the empty default"""
+        logger.error(f"{message}: {error}")
+        if self.strict:
+            raise ZerodhaAPIError(f"{message}: {error}") from error
+        return default
         
     def get_instruments(self, exchange='NSE'):
         """Fetch all instruments for given exchange"""
         try:
-            instruments = self.kite.instruments(exchange)
-            return instruments
+            return self._call('default', self.kite.instruments, exchange)
         except Exception as e:
-            logger.error(f"Error fetching instruments: {e}")
-            return []
+            return self._failed("Error fetching instruments", e, [])
     
     def get_quote(self, symbols):
         """Get live quotes for symbols"""
         try:
-            quotes = self.kite.quote(symbols)
-            return quotes
+            return self._call('quote', self.kite.quote, symbols)
         except Exception as e:
-            logger.error(f"Error fetching quotes: {e}")
-            return {}
+            return self._failed("Error fetching quotes", e, {})
     
     def get_historical_data(self, instrument_token, from_date, to_date, interval='day'):
         """Fetch historical data"""
         try:
-            data = self.kite.historical_data(
+            return self._call(
+                'historical', self.kite.historical_data,
                 instrument_token=instrument_token,
                 from_date=from_date,
                 to_date=to_date,
                 interval=interval
             )
-            return data
         except Exception as e:
-            logger.error(f"Error fetching historical data: {e}")
-            return []
+            return self._failed("Error fetching historical data", e, [])
     
     def place_order(self, tradingsymbol, transaction_type, quantity, order_type='MARKET', product='MIS'):
         """Place an order"""
         try:
-            order_id = self.kite.place_order(
+            order_id = self._call(
+                'orders', self.kite.place_order,
+                retry_ambiguous=False,
                 variety=self.kite.VARIETY_REGULAR,
                 exchange=self.kite.EXCHANGE_NSE,
                 tradingsymbol=tradingsymbol,
@@ -59,36 +159,53 @@ class ZerodhaClient:
             logger.info(f"Order placed: {order_id}")
             return order_id
         except Exception as e:
-            logger.error(f"Error placing order: {e}")
-            return None
+            return self._failed("Error placing order", e, None)
     
     def get_positions(self):
         """Get current positions"""
         try:
-            positions = self.kite.positions()
-            return positions
+            return self._call('default', self.kite.positions)
         except Exception as e:
-            logger.error(f"Error fetching positions: {e}")
-            return {}
+            return self._failed("Error fetching positions", e, {})
     
-    def start_ticker(self, tokens, on_ticks_callback, on_connect_callback=None):
-        """Start WebSocket ticker for live data"""
-        self.ticker = KiteTicker(KITE_API_KEY, KITE_ACCESS_TOKEN)
+    def start_ticker(self, tokens, on_ticks_callback, on_connect_callback=None, mode=MODE_FULL,
+                     recorder=None):
+        """
+        Start WebSocket ticker for live data
         
-        def on_ticks(ws, ticks):
-            on_ticks_callback(ticks)
+        Runs in the background; more tokens can be added or removed later
+        with subscribe()/unsubscribe(). With a TickRecorder every raw tick
+        batch is recorded before it reaches the callback.
+        """
+        if recorder is not None:
+            callback = on_ticks_callback
+            
+            def on_ticks_callback(ticks):
+                recorder.record(ticks)
+                callback(ticks)
         
-        def on_connect(ws, response):
-            ws.subscribe(tokens)
-            ws.set_mode(ws.MODE_FULL, tokens)
-            if on_connect_callback:
-                on_connect_callback(ws, response)
-        
-        self.ticker.on_ticks = on_ticks
-        self.ticker.on_connect = on_connect
-        self.ticker.connect()
+        self.ticker = SubscriptionManager(
+            KITE_API_KEY, KITE_ACCESS_TOKEN,
+            on_ticks=on_ticks_callback,
+            on_connect=on_connect_callback,
+            max_tokens_per_connection=TICKER_CONFIG['max_tokens_per_connection'],
+            max_connections=TICKER_CONFIG['max_connections']
+        )
+        self.ticker.subscribe(tokens, mode)
+        self.ticker.start()
+        return self.ticker
+    
+    def subscribe(self, tokens, mode=MODE_LTP, consumer='default'):
+        """Add tokens to the running ticker"""
+        if self.ticker:
+            self.ticker.subscribe(tokens, mode, consumer)
+    
+    def unsubscribe(self, tokens, consumer='default'):
+        """Remove tokens from the running ticker"""
+        if self.ticker:
+            self.ticker.unsubscribe(tokens, consumer)
     
     def stop_ticker(self):
         """Stop WebSocket ticker"""
         if self.ticker:
-            self.ticker.close()
+            self.ticker.stop()
@@ -0,0 +1,119 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from modules.bar_store import BarStore, MARKET_TZ
+from modules.trading_calendar import TradingCalendar
+
+TOKEN = 101
+HOLIDAY = date(2026, 3, 3)  # Tuesday
+
+
+class FakeZerodha:
+    """get_historical_data with three minute bars per open weekday, recording each call"""
+
+    def __init__(self, closed=(), fail=False):
+        self.closed = set(closed)
+        self.fail = fail
+        self.calls = []
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval='minute'):
+        self.calls.append((from_date.date(), to_date.date()))
+        if self.fail:
+            return []
+        bars = []
+        day = from_date.date()
+        while day <= to_date.date():
+            if day.weekday() < 5 and day not in self.closed:
+                for minute in range(3):
+                    stamp = pd.Timestamp(datetime.combine(day, datetime.min.time())
+                                         + timedelta(hours=9, minutes=15 + minute)).tz_localize(MARKET_TZ)
+                    bars.append({'date': stamp.to_pydatetime(), 'open': 100.0, 'high': 101.0,
+                                 'low': 99.0, 'close': 100.5, 'volume': 10})
+            day += timedelta(days=1)
+        return bars
+
+
+def make_store(tmp_path, zerodha, now=datetime(2026, 3, 20, 12, 0), calendar=None):
+    store = BarStore(zerodha, root=str(tmp_path), calendar=calendar)
+    store._market_now = lambda: now
+    return store
+
+
+def fetch(store, start, end):
+    return store.get_historical_data(TOKEN, datetime.combine(start, datetime.min.time()),
+                                     datetime.combine(end, datetime.max.time()))
+
+
+def test_partial_cache_hit_fetches_only_missing_days(tmp_path):
+    zerodha = FakeZerodha()
+    store = make_store(tmp_path, zerodha)
+
+    first = fetch(store, date(2026, 3, 9), date(2026, 3, 11))
+    second = fetch(store, date(2026, 3, 9), date(2026, 3, 13))
+
+    assert zerodha.calls == [(date(2026, 3, 9), date(2026, 3, 11)), (date(2026, 3, 12), date(2026, 3, 13))]
+    assert len(first) == 9 and len(second) == 15
+    assert second['date'].dt.date.nunique() == 5
+
+
+def test_empty_days_persist_only_when_the_window_had_bars(tmp_path):
+    # An unlisted closure inside a window that returned bars is stored as empty
+    zerodha = FakeZerodha(closed={date(2026, 3, 11)})
+    store = make_store(tmp_path, zerodha)
+    fetch(store, date(2026, 3, 9), date(2026, 3, 13))
+    assert store.has_day(TOKEN, 'minute', date(2026, 3, 11))
+    assert len(store.read_day(TOKEN, 'minute', date(2026, 3, 11))) == 0
+
+    fetch(store, date(2026, 3, 9), date(2026, 3, 13))
+    assert len(zerodha.calls) == 1
+
+    # A failed (empty) response is not mistaken for a run of holidays
+    failing = FakeZerodha(fail=True)
+    store = make_store(tmp_path / 'failing', failing)
+    assert len(fetch(store, date(2026, 3, 9), date(2026, 3, 13))) == 0
+    assert not store.has_day(TOKEN, 'minute', date(2026, 3, 9))
+    fetch(store, date(2026, 3, 9), date(2026, 3, 13))
+    assert len(failing.calls) == 2
+
+
+@pytest.mark.parametrize('now, persisted', [
+    (datetime(2026, 3, 13, 11, 0), False),  # session still forming
+    (datetime(2026, 3, 13, 16, 0), True),   # session closed
+])
+def test_today_persists_only_after_the_close(tmp_path, now, persisted):
+    zerodha = FakeZerodha()
+    store = make_store(tmp_path, zerodha, now=now)
+
+    bars = fetch(store, date(2026, 3, 12), date(2026, 3, 13))
+
+    assert len(bars) == 6
+    assert store.has_day(TOKEN, 'minute', date(2026, 3, 12))
+    assert store.has_day(TOKEN, 'minute', date(2026, 3, 13)) == persisted
+    fetch(store, date(2026, 3, 12), date(2026, 3, 13))
+    assert len(zerodha.calls) == (1 if persisted else 2)
+
+
+def test_windows_span_weekends_and_holidays(tmp_path):
+    calendar = TradingCalendar(holidays={HOLIDAY}, holidays_file=None)
+    zerodha = FakeZerodha(closed={HOLIDAY})
+    store = make_store(tmp_path, zerodha, calendar=calendar)
+
+    # Fri 27 Feb - Wed 4 Mar: weekend and the Tuesday holiday are never requested alone
+    bars = fetch(store, date(2026, 2, 27), date(2026, 3, 4))
+
+    assert zerodha.calls == [(date(2026, 2, 27), date(2026, 3, 4))]
+    assert sorted(bars['date'].dt.date.unique()) == [date(2026, 2, 27), date(2026, 3, 2), date(2026, 3, 4)]
+    fetch(store, date(2026, 2, 27), date(2026, 3, 4))
+    assert len(zerodha.calls) == 1
+
+
+def test_fetch_windows_split_on_stored_days_and_max_days():
+    days = [date(2026, 3, 2) + timedelta(days=i) for i in range(10)]
+    missing = days[:3] + days[4:]
+
+    assert BarStore._fetch_windows(days, missing, max_days=60) == [(days[0], days[2]), (days[4], days[9])]
+    assert BarStore._fetch_windows(days, missing, max_days=4) == [
+        (days[0], days[2]), (days[4], days[7]), (days[8], days[9])
+    ]
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.indicator_engine import IndicatorEngine
+
+PARAMS = dict(ema_fast=12, ema_slow=26, macd_signal=9, rsi_period=14, sma_fast=20, sma_slow=50, volume_window=20)
+
+
+def reference(closes, volumes):
+    """Indicators recomputed from the full bar history"""
+    close = pd.Series(closes)
+    ema_fast = close.ewm(span=PARAMS['ema_fast'], adjust=False).mean()
+    ema_slow = close.ewm(span=PARAMS['ema_slow'], adjust=False).mean()
+    macd = ema_fast - ema_slow
+    signal = macd.ewm(span=PARAMS['macd_signal'], adjust=False).mean()
+
+    # Wilder RSI: plain average of the first rsi_period deltas, then smoothed
+    period = PARAMS['rsi_period']
+    deltas = np.diff(closes)
+    gain = np.maximum(deltas[:period], 0).mean()
+    loss = np.maximum(-deltas[:period], 0).mean()
+    for delta in deltas[period:]:
+        gain = (gain * (period - 1) + max(delta, 0)) / period
+        loss = (loss * (period - 1) + max(-delta, 0)) / period
+
+    return {
+        'rsi': 100 - 100 / (1 + gain / loss),
+        'macd': macd.iloc[-1],
+        'macd_signal': signal.iloc[-1],
+        'sma_fast': close.iloc[-PARAMS['sma_fast']:].mean(),
+        'sma_slow': close.iloc[-PARAMS['sma_slow']:].mean(),
+        'avg_volume': np.mean(volumes[-PARAMS['volume_window']:]),
+        'prev_close': closes[-2],
+    }
+
+
+def histories(seed, count=6):
+    """Random close/volume histories of different lengths"""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(count):
+        length = int(rng.integers(80, 200))
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        volumes = rng.integers(10_000, 1_000_000, length).astype(np.float64)
+        out.append((closes, volumes))
+    return out
+
+
+def assert_matches(snapshot, expected, row):
+    for name, value in expected.items():
+        assert snapshot[name][row] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_incremental_updates_match_full_recompute(seed):
+    data = histories(seed)
+    symbols = [f"S{i}" for i in range(len(data))]
+    engine = IndicatorEngine(**PARAMS)
+
+    # Bar by bar, each symbol joining when its history starts
+    width = max(len(closes) for closes, _ in data)
+    day0 = np.datetime64('2026-01-01')
+    for t in range(width):
+        active = [i for i, (closes, _) in enumerate(data) if t >= width - len(closes)]
+        offset = [t - (width - len(data[i][0])) for i in active]
+        engine.update(
+            [symbols[i] for i in active],
+            [data[i][0][j] for i, j in zip(active, offset)],
+            [data[i][1][j] for i, j in zip(active, offset)],
+            date=day0 + t
+        )
+
+    snapshot = engine.snapshot(symbols)
+    for row, (closes, volumes) in enumerate(data):
+        assert_matches(snapshot, reference(closes, volumes), row)
+
+
+def test_seed_matches_full_recompute_and_forming_bar():
+    data = histories(3)
+    symbols = [f"S{i}" for i in range(len(data))]
+    width = max(len(closes) for closes, _ in data)
+    closes = np.full((len(data), width), np.nan)
+    volumes = np.full((len(data), width), np.nan)
+    for i, (c, v) in enumerate(data):
+        closes[i, width - len(c):] = c
+        volumes[i, width - len(v):] = v
+
+    engine = IndicatorEngine(**PARAMS)
+    engine.seed(symbols, closes, volumes, [np.datetime64('2026-06-01')] * len(data))
+
+    snapshot = engine.snapshot(symbols)
+    for row, (c, v) in enumerate(data):
+        assert_matches(snapshot, reference(c, v), row)
+
+    # A forming bar is scored as if committed, without changing the state
+    prices = np.array([c[-1] * 0.99 for c, _ in data])
+    forming = engine.snapshot(symbols, prices)
+    for row, (c, v) in enumerate(data):
+        expected = reference(np.append(c, prices[row]), v)
+        expected['prev_close'] = c[-1]
+        assert_matches(forming, expected, row)
+    assert_matches(engine.snapshot(symbols), reference(*data[0]), 0)
+
+
+def test_updates_without_volume_keep_the_volume_window():
+    closes, volumes = histories(4, count=1)[0]
+    engine = IndicatorEngine(**PARAMS)
+    engine.seed(['S0'], closes[None, :-5], volumes[None, :-5], [np.datetime64('2026-06-01')])
+
+    # Quote-driven closes carry no volume
+    for t, close in enumerate(closes[-5:]):
+        engine.update(['S0'], [close], date=np.datetime64('2026-06-02') + t)
+
+    snapshot = engine.snapshot(['S0'])
+    expected = reference(closes, volumes[:-5])
+    assert_matches(snapshot, expected, 0)
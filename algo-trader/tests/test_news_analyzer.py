@@ -0,0 +1,27 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from modules.news_analyzer import NewsAnalyzer
+
+
+@pytest.fixture
+def ist(monkeypatch):
+    if not hasattr(time, 'tzset'):
+        pytest.skip('time.tzset is not available on this platform')
+    monkeypatch.setenv('TZ', 'Asia/Kolkata')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_iso_converts_to_local_time(ist):
+    assert NewsAnalyzer._parse_iso('2026-01-05T03:30:00Z') == datetime(2026, 1, 5, 9, 0)
+    assert NewsAnalyzer._parse_iso('2026-01-05T09:00:00+05:30') == datetime(2026, 1, 5, 9, 0)
+
+
+def test_parse_iso_rejects_missing_or_bad_values():
+    assert NewsAnalyzer._parse_iso(None) is None
+    assert NewsAnalyzer._parse_iso('yesterday') is None
@@ -0,0 +1,93 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.news_fetcher import NewsFetcher
+
+ETAG = '"v1"'
+LAST_MODIFIED = 'Mon, 05 Jan 2026 09:00:00 GMT'
+
+
+class NewsHandler(BaseHTTPRequestHandler):
+    """Serves a fixed JSON body with an ETag; /slow holds each request open"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(dict(self.headers))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path.startswith('/slow'):
+                time.sleep(0.2)
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b'{"articles": []}'
+            self.send_response(200)
+            self.send_header('ETag', ETAG)
+            self.send_header('Last-Modified', LAST_MODIFIED)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), NewsHandler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.in_flight = 0
+    httpd.max_in_flight = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_fresh_cache_skips_the_request(server, tmp_path):
+    fetcher = NewsFetcher(cache_dir=str(tmp_path), max_age=60)
+    url = f"{base_url(server)}/news"
+
+    assert fetcher.get_json(url, {'q': 'INFY'}) == {'articles': []}
+    assert fetcher.get_json(url, {'q': 'INFY'}) == {'articles': []}
+    assert len(server.requests) == 1
+
+
+def test_stale_cache_revalidates_with_etag_and_last_modified(server, tmp_path):
+    fetcher = NewsFetcher(cache_dir=str(tmp_path), max_age=0)
+    url = f"{base_url(server)}/news"
+
+    first = fetcher.get(url, {'q': 'INFY'})
+    second = fetcher.get(url, {'q': 'INFY'})
+
+    assert second == first == '{"articles": []}'
+    assert len(server.requests) == 2
+    assert 'If-None-Match' not in server.requests[0]
+    assert server.requests[1]['If-None-Match'] == ETAG
+    assert server.requests[1]['If-Modified-Since'] == LAST_MODIFIED
+
+
+def test_per_host_limit_caps_concurrent_requests(server, tmp_path):
+    fetcher = NewsFetcher(cache_dir=str(tmp_path), workers=8, per_host_limit=2)
+    url = f"{base_url(server)}/slow"
+
+    results = fetcher.get_json_many({i: (url, {'q': i}) for i in range(8)})
+
+    assert all(result == {'articles': []} for result in results.values())
+    assert len(server.requests) == 8
+    assert server.max_in_flight == 2
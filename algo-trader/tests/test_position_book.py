@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from modules.position_book import PositionBook, OPEN, EXITING
+
+TARGET_DROP = 0.002
+TRAILING_DELTA = 0.001
+
+
+class ReferenceBook:
+    """The original per-tick LiveExecutor.update_position logic"""
+
+    def __init__(self):
+        self.positions = {}
+
+    def add(self, symbol, entry_price):
+        self.positions[symbol] = {
+            'lowest_price_seen': entry_price,
+            'stop_loss': entry_price * (1 + TRAILING_DELTA),
+            'target_price': entry_price * (1 - TARGET_DROP),
+            'status': 'OPEN',
+        }
+
+    def update_position(self, symbol, current_price):
+        position = self.positions[symbol]
+        if position['status'] != 'OPEN':
+            return None
+
+        if current_price < position['lowest_price_seen']:
+            position['lowest_price_seen'] = current_price
+            position['stop_loss'] = current_price * (1 + TRAILING_DELTA)
+
+        if current_price <= position['target_price']:
+            position['status'] = 'EXITING'
+            return (symbol, position['target_price'], 'TARGET_HIT')
+
+        if current_price >= position['stop_loss']:
+            position['status'] = 'EXITING'
+            return (symbol, position['stop_loss'], 'STOP_LOSS')
+        return None
+
+
+def random_batches(rng, tokens, count, batch_size):
+    """Tick batches of random-walk prices; tokens repeat within a batch and include unknown ones"""
+    prices = {token: 100.0 for token in tokens}
+    unknown = [999_001, 999_002]
+    batches = []
+    for _ in range(count):
+        picked = rng.choice(tokens + unknown, batch_size)
+        batch = []
+        for token in picked.tolist():
+            price = prices.get(token, 100.0) * (1 + rng.normal(0, 0.0008))
+            if token in prices:
+                prices[token] = price
+            batch.append((token, price))
+        batches.append(batch)
+    return batches
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_batched_update_matches_per_tick_logic(seed):
+    rng = np.random.default_rng(seed)
+    tokens = [int(token) for token in rng.choice(np.arange(1000, 5000), 40, replace=False)]
+    symbols = {token: f"SYM{token}" for token in tokens}
+
+    book = PositionBook(capacity=4)  # grows while positions are added
+    reference = ReferenceBook()
+    for token in tokens:
+        book.add(symbols[token], token, 100.0, TARGET_DROP, TRAILING_DELTA)
+        reference.add(symbols[token], 100.0)
+
+    reasons = set()
+    for batch in random_batches(rng, tokens, count=60, batch_size=80):
+        expected = []
+        for token, price in batch:
+            if token in symbols:
+                result = reference.update_position(symbols[token], price)
+                if result is not None:
+                    expected.append(result)
+
+        actual = book.update([token for token, _ in batch], [price for _, price in batch])
+        # Exits within a batch come back grouped by round, not in tick order
+        assert sorted(actual) == sorted(expected)
+        reasons.update(reason for _, _, reason in actual)
+
+    assert reasons == {'TARGET_HIT', 'STOP_LOSS'}
+    for token in tokens:
+        state = book.get(symbols[token])
+        position = reference.positions[symbols[token]]
+        assert state['lowest_price_seen'] == position['lowest_price_seen']
+        assert state['stop_loss'] == position['stop_loss']
+        assert state['status'] == (OPEN if position['status'] == 'OPEN' else EXITING)
+
+
+def test_repeated_token_ticks_apply_in_order():
+    book = PositionBook()
+    book.add('A', 1, 100.0, TARGET_DROP, TRAILING_DELTA)
+    book.add('B', 2, 100.0, TARGET_DROP, TRAILING_DELTA)
+
+    # A: new low (stop trails to 99.9999), then a bounce through the new stop;
+    # in the reverse order the bounce would not reach the original stop
+    exits = book.update([1, 3, 2, 1], [99.9, 50.0, 100.05, 100.0])
+
+    assert exits == [('A', pytest.approx(99.9 * (1 + TRAILING_DELTA)), 'STOP_LOSS')]
+    assert book.get('B')['status'] == OPEN
+    assert book.get('B')['lowest_price_seen'] == 100.0
+
+
+def test_unknown_tokens_only_batch():
+    book = PositionBook()
+    book.add('A', 1, 100.0, TARGET_DROP, TRAILING_DELTA)
+
+    assert book.update([7, 8], [1.0, 2.0]) == []
+    assert book.get('A')['status'] == OPEN
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.backtester import Backtester
+from modules.trade_engine import EXIT_REASONS, pad_sessions, sweep_sessions
+
+TARGET_DROP = 0.002
+TRAILING_DELTA = 0.001
+
+
+def reference_trade(df, entry_price, target_drop, trailing_delta):
+    """The original bar-by-bar Backtester.simulate_trade loop"""
+    target_price = entry_price * (1 - target_drop)
+    current_stop_loss = entry_price * (1 + trailing_delta)
+    lowest_price_seen = entry_price
+
+    trade_result = {
+        'entry_price': entry_price,
+        'exit_price': None,
+        'exit_time': None,
+        'exit_reason': None,
+        'pnl_percent': 0,
+        'max_profit_percent': 0
+    }
+
+    for idx, row in df.iterrows():
+        current_low = row['low']
+        current_high = row['high']
+        current_time = row['date']
+
+        if current_low < lowest_price_seen:
+            lowest_price_seen = current_low
+            current_stop_loss = lowest_price_seen * (1 + trailing_delta)
+
+        if current_low <= target_price:
+            trade_result['exit_price'] = target_price
+            trade_result['exit_time'] = current_time
+            trade_result['exit_reason'] = 'TARGET_HIT'
+            trade_result['pnl_percent'] = ((entry_price - target_price) / entry_price) * 100
+            break
+
+        if current_high >= current_stop_loss:
+            trade_result['exit_price'] = current_stop_loss
+            trade_result['exit_time'] = current_time
+            trade_result['exit_reason'] = 'STOP_LOSS'
+            trade_result['pnl_percent'] = ((entry_price - current_stop_loss) / entry_price) * 100
+            break
+
+        max_profit = ((entry_price - current_low) / entry_price) * 100
+        if max_profit > trade_result['max_profit_percent']:
+            trade_result['max_profit_percent'] = max_profit
+
+    if trade_result['exit_price'] is None:
+        last_row = df.iloc[-1]
+        trade_result['exit_price'] = last_row['close']
+        trade_result['exit_time'] = last_row['date']
+        trade_result['exit_reason'] = 'EOD_CLOSE'
+        trade_result['pnl_percent'] = ((entry_price - last_row['close']) / entry_price) * 100
+
+    return trade_result
+
+
+def session(opens, highs, lows, closes, day=0):
+    start = pd.Timestamp('2026-01-05 09:15') + pd.Timedelta(days=day)
+    return pd.DataFrame({
+        'date': pd.date_range(start, periods=len(opens), freq='min'),
+        'open': opens, 'high': highs, 'low': lows, 'close': closes,
+    })
+
+
+def random_sessions(seed, count=200):
+    """Random walks of ragged length; a few volatilities so every exit path occurs"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for day in range(count):
+        length = int(rng.integers(1, 80))
+        volatility = rng.choice([0.0001, 0.0005, 0.002])
+        close = 100 * np.exp(np.cumsum(rng.normal(0, volatility, length)))
+        open_ = np.concatenate([[100.0], close[:-1]])
+        wick = np.abs(rng.normal(0, volatility, (2, length))) * close
+        frames.append(session(open_, np.maximum(open_, close) + wick[0],
+                              np.minimum(open_, close) - wick[1], close, day))
+    return frames
+
+
+def edge_sessions():
+    return [
+        # Target and stop both inside the first bar: the target wins
+        session([100.0], [100.5], [99.5], [100.0]),
+        # Same tie after the stop has trailed down
+        session([99.95, 99.9, 99.9], [99.95, 99.9, 100.3], [99.9, 99.85, 99.7], [99.9, 99.9, 100.0], 1),
+        # Never hit: stays inside the band and closes at the last bar
+        session([100.0] * 5, [100.04] * 5, [99.97] * 5, [100.0, 100.02, 99.98, 100.01, 99.97], 2),
+        # Stop on the first bar, before any bar counts towards max profit
+        session([100.0, 99.0], [100.2, 99.0], [100.0, 99.0], [100.1, 99.0], 3),
+        # Single bar session, never hit
+        session([100.0], [100.01], [99.99], [100.0], 4),
+    ]
+
+
+@pytest.fixture
+def backtester():
+    # The simulation only needs the strategy parameters, not a Kite session
+    backtester = Backtester.__new__(Backtester)
+    backtester.target_drop = TARGET_DROP
+    backtester.trailing_delta = TRAILING_DELTA
+    return backtester
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_simulate_sessions_matches_bar_by_bar_loop(backtester, seed):
+    frames = random_sessions(seed) + edge_sessions()
+
+    trades = backtester.simulate_sessions(frames)
+
+    reasons = set()
+    for df, trade in zip(frames, trades):
+        expected = reference_trade(df, df['open'].iloc[0], TARGET_DROP, TRAILING_DELTA)
+        assert trade == expected
+        reasons.add(trade['exit_reason'])
+    assert reasons == {'TARGET_HIT', 'STOP_LOSS', 'EOD_CLOSE'}
+
+
+def test_edge_cases(backtester):
+    trades = backtester.simulate_sessions(edge_sessions())
+
+    assert [trade['exit_reason'] for trade in trades] == [
+        'TARGET_HIT', 'TARGET_HIT', 'EOD_CLOSE', 'STOP_LOSS', 'EOD_CLOSE'
+    ]
+    assert trades[3]['max_profit_percent'] == 0
+
+
+def test_sweep_sessions_matches_bar_by_bar_loop():
+    frames = random_sessions(4, count=60) + edge_sessions()
+    bars = pd.concat(frames, ignore_index=True)
+    lengths = np.array([len(df) for df in frames])
+    entries = np.array([df['open'].iloc[0] for df in frames])
+    target_drops = np.array([0.0005, 0.002, 0.01])
+    trailing_deltas = np.array([0.0002, 0.001, 0.005])
+
+    # Small max_elements so the parameter axes are processed in chunks
+    out = sweep_sessions(
+        pad_sessions(bars['high'].to_numpy(), lengths),
+        pad_sessions(bars['low'].to_numpy(), lengths),
+        pad_sessions(bars['close'].to_numpy(), lengths),
+        lengths, entries, target_drops, trailing_deltas, max_elements=5000
+    )
+
+    for i, target_drop in enumerate(target_drops):
+        for j, trailing_delta in enumerate(trailing_deltas):
+            for s, df in enumerate(frames):
+                expected = reference_trade(df, entries[s], target_drop, trailing_delta)
+                assert EXIT_REASONS[out['exit_reason'][i, j, s]] == expected['exit_reason']
+                assert out['exit_price'][i, j, s] == expected['exit_price']
+                assert out['pnl_percent'][i, j, s] == expected['pnl_percent']
+                assert out['max_profit_percent'][i, j, s] == expected['max_profit_percent']
+                assert df['date'].iloc[out['exit_idx'][i, j, s]] == expected['exit_time']
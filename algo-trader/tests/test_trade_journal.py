@@ -0,0 +1,35 @@
+import time
+
+from modules.trade_journal import TradeJournal
+
+
+def make_journal(tmp_path, **kwargs):
+    return TradeJournal(url=f"sqlite:///{tmp_path / 'trades.db'}", **kwargs)
+
+
+def test_steady_trickle_commits_within_flush_interval(tmp_path):
+    journal = make_journal(tmp_path, batch_size=500, flush_interval=0.5)
+    try:
+        # Records arrive faster than flush_interval, so a per-item timeout
+        # would keep gathering and never commit
+        start = time.monotonic()
+        while time.monotonic() - start < 1.2:
+            journal.record_entry('INFY', 1500.0, 10)
+            time.sleep(0.1)
+        assert len(journal.trades()) > 0
+    finally:
+        journal.close()
+
+
+def test_flush_commits_without_waiting_for_the_interval(tmp_path):
+    journal = make_journal(tmp_path, flush_interval=5)
+    try:
+        journal.record_entry('INFY', 1500.0, 10)
+        journal.record_exit('INFY', 1497.0, 10, 'TARGET_HIT', 30.0, 0.2)
+
+        start = time.monotonic()
+        assert journal.flush(timeout=10)
+        assert time.monotonic() - start < 1
+        assert journal.trades()['event'].tolist() == ['ENTRY', 'EXIT']
+    finally:
+        journal.close()